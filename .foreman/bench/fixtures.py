@@ -0,0 +1,268 @@
+import json
+import os
+import random
+import subprocess
+from typing import Any, Dict, List
+
+# Sizes at --scale 1.0.
+REPO_FILES = 3000
+BRANCH_COMMITS = 10
+MODIFIED_FILES = 300
+RENAMED_FILES = 100
+ADDED_FILES = 50
+DIRTY_FILES = 200
+UNTRACKED_FILES = 50
+LOCKFILE_LINES = 40000
+TODO_TASKS = 10000
+TODO_SECTION_SIZE = 100
+INSPECTOR_ISSUES = 500
+TRANSCRIPT_BYTES = 8 * 1024 * 1024
+SESSION_LOG_FILES = 20
+SESSION_LOG_BYTES = 6 * 1024 * 1024
+EVENTS = 50000
+
+TASK_DIR = "bench-task"
+BRANCH = "feature/bench"
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.invalid",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.invalid",
+    "GIT_CONFIG_NOSYSTEM": "1",
+}
+WORDS = (
+    "frame segment elbow tile pin dialog breadcrumb theme token button scroll "
+    "header sidebar focus arrow shell layout variant color spacing radius"
+).split()
+
+
+def scaled(count: int, scale: float) -> int:
+    return max(1, int(count * scale))
+
+
+def git(cwd: str, *args: str) -> str:
+    proc = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        env={**os.environ, **GIT_ENV},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def source_file(rng: random.Random, index: int, revision: int = 0) -> str:
+    lines = [f"// generated module {index} r{revision}"]
+    for n in range(rng.randint(20, 60)):
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{n}"
+        lines.append(f"export const {name} = {rng.randint(0, 10**6)}; // {rng.choice(WORDS)}")
+    return "\n".join(lines) + "\n"
+
+
+def source_path(index: int) -> str:
+    return f"components/src/lib/group{index % 60:02d}/module{index:05d}.ts"
+
+
+def lockfile(rng: random.Random, lines: int) -> str:
+    out = ["lockfileVersion: '9.0'", "packages:"]
+    for n in range(lines // 4):
+        out.append(f"  /pkg-{n}@{rng.randint(1, 9)}.{rng.randint(0, 20)}.0:")
+        out.append(f"    resolution: {{integrity: sha512-{rng.getrandbits(128):032x}}}")
+        out.append("    dev: false")
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+def todo_markdown(tasks: int, section_size: int) -> str:
+    overview = ["# Bench backlog", "", "## Overview", ""]
+    body: List[str] = []
+    for n in range(1, tasks + 1):
+        section, item = (n - 1) // section_size + 1, (n - 1) % section_size + 1
+        title = f"Task {n} {WORDS[n % len(WORDS)]} {WORDS[(n * 7) % len(WORDS)]}"
+        anchor = f"{section}{item}-ds9-{n}-task-{n}"
+        overview.append(f"  - [ ] [ds9-{n} · {section}.{item} {title}](#{anchor})  ")
+        if item == 1:
+            body += ["---", "", f"## {section}. Section {section}", ""]
+        body += [
+            f"### {section}.{item} [ds9-{n}] {title}",
+            "",
+            f"- **Title**: Implement `{title}`  ",
+            "- **Description**:  ",
+            f"  Rework the `{WORDS[n % len(WORDS)]}` primitive so it can be reused:  ",
+            "  - Extract the styles into the library stylesheet.  ",
+            "  - Keep the existing class names working.  ",
+            "- **Expectations**:  ",
+            "  - Visual parity with the current page.  ",
+            "",
+        ]
+    return "\n".join(overview + [""] + body) + "\n"
+
+
+def inspector_result(issues: int) -> Dict[str, Any]:
+    return {
+        "run": {"status": "ok", "failed_step": None, "error": None},
+        "work": {
+            "status": "changes_requested",
+            "issues": [
+                {
+                    "severity": ["blocker", "major", "minor"][n % 3],
+                    "description": f"Issue {n}: {' '.join(WORDS[(n + k) % len(WORDS)] for k in range(30))}",
+                    "paths": [source_path(n * 7 % REPO_FILES), source_path(n * 13 % REPO_FILES)],
+                }
+                for n in range(issues)
+            ],
+            "next_tasks": [f"Follow-up {n}" for n in range(10)],
+        },
+    }
+
+
+BUILDER_RESULT = {
+    "run": {"status": "ok", "failed_step": None, "error": None},
+    "work": {"summary": "Synthetic benchmark change.", "complexity": "medium"},
+}
+
+
+def make_repo(root: str, scale: float, rng: random.Random) -> Dict[str, str]:
+    """A task worktree on BRANCH: committed edits/renames/additions plus a dirty tree."""
+    repo = os.path.join(root, TASK_DIR)
+    remote = os.path.join(root, "remote.git")
+    files = scaled(REPO_FILES, scale)
+    os.makedirs(repo)
+    git(repo, "init", "-q", "-b", "main")
+    for index in range(files):
+        write(os.path.join(repo, source_path(index)), source_file(rng, index))
+    write(os.path.join(repo, "components/pnpm-lock.yaml"), lockfile(rng, scaled(LOCKFILE_LINES, scale)))
+    write(os.path.join(repo, "components/node_modules/.keep"), "")
+    write(os.path.join(repo, ".gitignore"), "node_modules/\n")
+    write(
+        os.path.join(repo, "docs/TODO.md"),
+        todo_markdown(scaled(TODO_TASKS, scale), TODO_SECTION_SIZE),
+    )
+    write(os.path.join(repo, "REVIEW_RULEBOOK.md"), "# Rulebook\n\n- Keep it tidy.\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "base")
+
+    os.makedirs(remote)
+    git(remote, "init", "-q", "--bare")
+    git(repo, "remote", "add", "origin", remote)
+    git(repo, "push", "-q", "origin", "main")
+
+    git(repo, "checkout", "-q", "-b", BRANCH)
+    indexes = rng.sample(range(files), scaled(MODIFIED_FILES, scale) + scaled(RENAMED_FILES, scale))
+    modified, renamed = indexes[: scaled(MODIFIED_FILES, scale)], indexes[scaled(MODIFIED_FILES, scale) :]
+    commits = scaled(BRANCH_COMMITS, scale)
+    for n in range(commits):
+        for index in modified[n::commits]:
+            write(os.path.join(repo, source_path(index)), source_file(rng, index, revision=1))
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "-m", f"change {n}")
+    for index in renamed:
+        git(repo, "mv", source_path(index), source_path(index).replace(".ts", ".renamed.ts"))
+    for n in range(scaled(ADDED_FILES, scale)):
+        write(os.path.join(repo, source_path(files + n)), source_file(rng, files + n))
+    with open(os.path.join(repo, "components/pnpm-lock.yaml"), "a", encoding="utf-8") as f:
+        f.write(lockfile(rng, 400))
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "renames and additions")
+
+    dirty_edits(repo, scale, rng)
+    write(os.path.join(repo, "builder_result.json"), json.dumps(BUILDER_RESULT))
+    write(
+        os.path.join(repo, "inspector_result.json"),
+        json.dumps(inspector_result(scaled(INSPECTOR_ISSUES, scale)), indent=2),
+    )
+    return {"repo": repo, "remote": remote}
+
+
+def dirty_edits(repo: str, scale: float, rng: random.Random) -> None:
+    files = scaled(REPO_FILES, scale)
+    for index in rng.sample(range(files), scaled(DIRTY_FILES, scale)):
+        path = os.path.join(repo, source_path(index))
+        if os.path.exists(path):
+            write(path, source_file(rng, index, revision=2))
+    for n in range(scaled(UNTRACKED_FILES, scale)):
+        write(os.path.join(repo, f"components/src/new/untracked{n:04d}.ts"), source_file(rng, n))
+
+
+def make_transcript(path: str, size: int, rng: random.Random) -> None:
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        n = 0
+        while written < size:
+            line = f"[{n:07d}] tool=read path={source_path(rng.randrange(REPO_FILES))} {' '.join(rng.choices(WORDS, k=8))}\n"
+            f.write(line)
+            written += len(line)
+            n += 1
+
+
+def make_session_logs(log_dir: str, files: int, size: int, rng: random.Random) -> None:
+    os.makedirs(log_dir)
+    per_file = size // files
+    tools = ["read", "grep", "glob", "edit", "bash", "list", "write"]
+    for s in range(files):
+        written = 0
+        ts = 1_700_000_000 + s * 10_000
+        with open(os.path.join(log_dir, f"ses_{s:04d}.jsonl"), "w", encoding="utf-8") as f:
+            while written < per_file:
+                ts += rng.choice([0.2, 0.8, 3, 12, 45, 200])
+                tool = rng.choice(tools)
+                event = {
+                    "type": "tool.execute.before",
+                    "ts": f"2023-11-14T{int(ts) % 86400 // 3600:02d}:{int(ts) % 3600 // 60:02d}:{ts % 60:06.3f}Z",
+                    "sessionId": f"ses_{s:04d}",
+                    "tool": tool,
+                    "argsPreview": {"filePath": source_path(rng.randrange(200)), "pattern": None},
+                }
+                line = json.dumps(event) + "\n"
+                f.write(line)
+                written += len(line)
+
+
+def make_events(path: str, count: int, rng: random.Random) -> None:
+    phases = ["agent.build", "agent.inspect", "preflight.lint", "diff.build", "handoff.builder", "pr.push"]
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(count):
+            f.write(
+                json.dumps(
+                    {
+                        "ts": 1_700_000_000 + n,
+                        "phase": rng.choice(phases),
+                        "task_id": f"ds9-{n % 300}",
+                        "pass": n % 4,
+                        "duration": round(rng.expovariate(0.05), 4),
+                        "status": "ok" if n % 17 else "failed",
+                        "child_utime": round(rng.random() * 5, 4),
+                        "child_stime": round(rng.random(), 4),
+                        "child_maxrss_kb": rng.randint(20_000, 900_000),
+                    },
+                    separators=(",", ":"),
+                )
+                + "\n"
+            )
+
+
+def build(root: str, scale: float, seed: int = 1) -> Dict[str, str]:
+    """Generate every fixture under `root`; returns their paths."""
+    rng = random.Random(seed)
+    fixtures = make_repo(root, scale, rng)
+    fixtures["todo"] = os.path.join(root, "TODO.md")
+    write(fixtures["todo"], todo_markdown(scaled(TODO_TASKS, scale), TODO_SECTION_SIZE))
+    fixtures["transcript"] = os.path.join(root, "transcript.log")
+    make_transcript(fixtures["transcript"], scaled(TRANSCRIPT_BYTES, scale), rng)
+    fixtures["session_logs"] = os.path.join(root, "session-log")
+    make_session_logs(
+        fixtures["session_logs"], SESSION_LOG_FILES, scaled(SESSION_LOG_BYTES, scale), rng
+    )
+    fixtures["events"] = os.path.join(root, "events.jsonl")
+    make_events(fixtures["events"], scaled(EVENTS, scale), rng)
+    fixtures["prompt"] = os.path.join(root, "inspector.prompt.txt")
+    write(fixtures["prompt"], "Review the change.\n" * 200)
+    return fixtures
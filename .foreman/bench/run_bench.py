@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+import fixtures
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TOOLS_DIR = os.path.join(os.path.dirname(BENCH_DIR), "tools")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+BASELINE_VERSION = 2
+DEFAULT_THRESHOLD = 0.25
+# Below these the difference is scheduler/page-cache noise, whatever the ratio.
+MIN_WALL_DELTA = 0.05
+MIN_RSS_DELTA_KB = 4096
+
+# Executables the tools resolve through PATH; each one gets a counting shim.
+SHIMMED = ["git", "gh", "pnpm", "opencode", "bash"]
+# Stand-in for pnpm so pre-flight measures its own overhead, not the JS toolchain.
+FAKE_PNPM = "exit 0"
+# The workflow starts a tool dozens of times per task. A `startup.*` bench whose
+# median wall time (interpreter + imports + argument parsing) exceeds this fails,
+# baseline or not.
+STARTUP_BUDGET = 0.15
+# Commands the workflow runs on every pass, timed through the foreman.py entry
+# point. The handoff checks take no arguments; in an empty directory they only
+# start up.
+STARTUP_COMMANDS = {
+    "runner": ["submit", "--help"],
+    "check-builder": [],
+    "check-inspector": [],
+    "review-diff": ["build", "--help"],
+    "preflight": ["--help"],
+    "create-pr": ["--help"],
+    "failure-summary": ["--help"],
+    "state": ["--help"],
+    "inspector-cache": ["--help"],
+    "pool": ["--help"],
+    "scope": ["check", "--help"],
+    "metrics": ["--help"],
+}
+
+# Fixed workload timed in every run. Wall times are compared as multiples of it,
+# so a baseline recorded on a faster or slower host still applies.
+REFERENCE = "reference"
+REFERENCE_WORKLOAD = """
+import json, subprocess
+subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.DEVNULL, check=True)
+doc = json.dumps([{"id": i, "title": "task %d" % i, "done": i % 3 == 0} for i in range(20000)])
+for _ in range(10):
+    json.loads(doc)
+"""
+# Peak RSS depends on the interpreter build and allocator, not on speed; it is only
+# compared against a baseline from the same platform and Python version.
+HOST_KEYS = ("platform", "python")
+
+Fixtures = Dict[str, str]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers the runner webhook and the GitHub pulls API."""
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = json.dumps({"html_url": "https://github.invalid/bench/bench/pull/1"}).encode("utf-8")
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def write_shims(shim_dir: str, spawn_log: str) -> None:
+    os.makedirs(shim_dir, exist_ok=True)
+    for name in SHIMMED:
+        real = shutil.which(name)
+        if name == "pnpm":
+            target = FAKE_PNPM
+        elif real is None:
+            continue
+        else:
+            target = f'exec {real} "$@"'
+        # Field 6 of /proc/self/stat is the session id: lets the runner ignore
+        # detached helpers (pool refill, background cleanup) that outlive the tool.
+        script = (
+            "#!/bin/sh\n"
+            f"read -r _ _ _ _ _ sid _ < /proc/$$/stat 2>/dev/null\n"
+            f'echo "$sid {name}" >> "{spawn_log}"\n'
+            f"{target}\n"
+        )
+        path = os.path.join(shim_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(script)
+        os.chmod(path, 0o755)
+
+
+def tool(name: str) -> str:
+    return os.path.join(TOOLS_DIR, name)
+
+
+def reset_dir(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def pr_worktree(fx: Fixtures, run: int) -> None:
+    path = os.path.join(fx["root"], f"pr-{run}")
+    branch = f"bench-pr-{run}"
+    fixtures.git(fx["repo"], "worktree", "add", "-q", "-b", branch, path, fixtures.BRANCH)
+    fixtures.dirty_edits(path, fx["scale"], random.Random(run))
+    shutil.copy(os.path.join(fx["repo"], "builder_result.json"), path)
+    shutil.copy(os.path.join(fx["repo"], "inspector_result.json"), path)
+
+
+# Each bench: `cmd`/`cwd` build the invocation from the fixture paths, `setup` runs
+# before every timed repeat, `warmup` runs the command once untimed first, `repeat`
+# overrides --repeat.
+BENCHES: Dict[str, Dict[str, Any]] = {
+    REFERENCE: {
+        "cmd": lambda fx, run: [sys.executable, "-c", REFERENCE_WORKLOAD],
+        "repeat": 7,
+    },
+    "diff.build_full": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("build_review_diff.py"), "build",
+            "--worktree", fx["repo"], "--mode", "full",
+        ],
+    },
+    "handoff.builder": {
+        "cmd": lambda fx, run: [sys.executable, tool("check_builder_handoff.py")],
+    },
+    "handoff.inspector": {
+        "cmd": lambda fx, run: [sys.executable, tool("check_inspector_handoff.py")],
+    },
+    "inspector_cache.key": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("inspector_cache.py"), "key",
+            "--worktree", fx["repo"], "--prompt-file", fx["prompt"],
+        ],
+    },
+    "preflight.cold": {
+        "cmd": lambda fx, run: [sys.executable, tool("preflight.py"), "--worktree", fx["repo"], "--no-cache"],
+    },
+    "preflight.cached": {
+        "cmd": lambda fx, run: [sys.executable, tool("preflight.py"), "--worktree", fx["repo"]],
+        "warmup": True,
+    },
+    "todo.list_cold": {
+        "cmd": lambda fx, run: [sys.executable, tool("todo_registry.py"), "--todo", fx["todo"], "list", "--pending"],
+        "setup": lambda fx, run: reset_dir(fx["todo_index"]),
+    },
+    "todo.list_warm": {
+        "cmd": lambda fx, run: [sys.executable, tool("todo_registry.py"), "--todo", fx["todo"], "list", "--pending"],
+        "warmup": True,
+    },
+    "todo.done": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("todo_registry.py"), "--todo", fx["todo_copy"],
+            "done", "ds9-1", f"ds9-{fx['tasks'] // 2}", f"ds9-{fx['tasks']}",
+        ],
+        "setup": lambda fx, run: shutil.copy(fx["todo"], fx["todo_copy"]),
+    },
+    "build_requests.range": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("build_requests.py"), "--todo", fx["todo"],
+            "--range", f"ds9-1..ds9-{fx['tasks']}",
+        ],
+    },
+    "agent_runner.transcript": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("agent_runner.py"),
+            "--webhook", f"{fx['stub_url']}/webhook",
+            "--agent", "build",
+            "--title", "BUILDER bench-task 0 b1-i0",
+            "--cmd", f"cat {fx['transcript']}",
+            "--cwd", fx["repo"],
+            "--log-file", os.path.join(fx["root"], "runner.log"),
+        ],
+        "setup": lambda fx, run: open(os.path.join(fx["root"], "runner.log"), "w").close(),
+    },
+    "session_log_stats.rebuild": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("session_log_stats.py"), "--rebuild", "--totals", fx["session_logs"],
+        ],
+    },
+    "instrument.report": {
+        "cmd": lambda fx, run: [sys.executable, tool("instrument.py"), "--events", fx["events"], "report"],
+    },
+    "create_pr": {
+        "cmd": lambda fx, run: [
+            sys.executable, tool("create_pr.py"),
+            "--task-id", f"ds9-{fx['tasks'] // 2}",
+            "--title", "feat: bench", "--body", "Benchmark PR",
+            "--worktree", os.path.join(fx["root"], f"pr-{run}"),
+            "--branch", f"bench-pr-{run}",
+            "--sync-cleanup",
+        ],
+        "cwd": lambda fx: fx["repo"],
+        "setup": pr_worktree,
+    },
+}
+for _command, _args in STARTUP_COMMANDS.items():
+    BENCHES[f"startup.{_command}"] = {
+        "cmd": lambda fx, run, argv=[_command, *_args]: [sys.executable, tool("foreman.py"), *argv],
+        "cwd": lambda fx: fx["empty_dir"],
+        "budget": STARTUP_BUDGET,
+    }
+
+
+def bench_env(fx: Fixtures, shim_dir: str, spawn_log: str) -> Dict[str, str]:
+    state = os.path.join(fx["root"], "state")
+    return {
+        **os.environ,
+        **fixtures.GIT_ENV,
+        "PATH": f"{shim_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "FOREMAN_REPO": fx["repo"],
+        "FOREMAN_STATE_DB": os.path.join(state, "foreman.db"),
+        "FOREMAN_EVENTS_FILE": os.path.join(state, "events.jsonl"),
+        "FOREMAN_INSPECTOR_CACHE": os.path.join(state, "inspector_cache"),
+        "FOREMAN_ARTIFACT_DIR": os.path.join(state, "artifacts"),
+        "FOREMAN_PREFLIGHT_CACHE": os.path.join(state, "preflight"),
+        "FOREMAN_SESSION_STATS_DIR": os.path.join(state, "session_stats"),
+        "FOREMAN_TODO_INDEX_DIR": fx["todo_index"],
+        "FOREMAN_POOL_DIR": os.path.join(state, "pool"),
+        "FOREMAN_POOL_SIZE": "0",
+        "GITHUB_API_URL": fx["stub_url"],
+        "GITHUB_TOKEN": "bench",
+        "GITHUB_REPOSITORY": "bench/bench",
+    }
+
+
+# Linux keeps a process's peak RSS across exec, so a tool forked straight from this
+# (fixture-laden) runner would report the runner's memory. A minimal interpreter
+# spawns the tool instead and reports its wait4() rusage, which also covers the
+# descendants the tool reaped.
+LAUNCHER = """
+import os, sys, time
+started = time.perf_counter()
+pid = os.posix_spawn(sys.argv[2], sys.argv[2:], os.environ, setsid=True)
+_, status, ru = os.wait4(pid, 0)
+wall = time.perf_counter() - started
+with open(sys.argv[1], "w") as f:
+    f.write(f"{pid} {wall} {ru.ru_utime + ru.ru_stime} {ru.ru_maxrss} {os.waitstatus_to_exitcode(status)}")
+"""
+
+
+def measure(cmd: List[str], cwd: str, env: Dict[str, str], spawn_log: str, out_path: str) -> Dict[str, Any]:
+    open(spawn_log, "w").close()
+    usage_path = out_path + ".rusage"
+    with open(out_path, "wb") as out:
+        subprocess.run(
+            [sys.executable, "-S", "-c", LAUNCHER, usage_path, *cmd],
+            cwd=cwd,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            check=True,
+        )
+    with open(usage_path, "r", encoding="utf-8") as f:
+        pid, wall, cpu, max_rss_kb, exit_code = f.read().split()
+
+    # The tool is its own session leader, so its session id is its pid.
+    with open(spawn_log, "r", encoding="utf-8") as f:
+        spawned = [line.split()[1] for line in f if line.split()[:1] == [pid]]
+    return {
+        "wall": float(wall),
+        "cpu": float(cpu),
+        "max_rss_kb": int(max_rss_kb),
+        "subprocesses": len(spawned),
+        "spawned": {name: spawned.count(name) for name in sorted(set(spawned))},
+        "exit_code": int(exit_code),
+    }
+
+
+def run_bench(name: str, fx: Fixtures, env: Dict[str, str], repeat: int, spawn_log: str) -> Dict[str, Any]:
+    spec = BENCHES[name]
+    cwd = spec["cwd"](fx) if "cwd" in spec else fx["repo"]
+    out_path = os.path.join(fx["root"], "last-output.txt")
+    setup: Optional[Callable[[Fixtures, int], Any]] = spec.get("setup")
+    runs = []
+    if spec.get("warmup"):
+        if setup:
+            setup(fx, 0)
+        measure(spec["cmd"](fx, 0), cwd, env, spawn_log, out_path)
+    for run in range(1, spec.get("repeat", repeat) + 1):
+        if setup:
+            setup(fx, run)
+        runs.append(measure(spec["cmd"](fx, run), cwd, env, spawn_log, out_path))
+
+    result = {
+        "wall": round(statistics.median(r["wall"] for r in runs), 4),
+        "cpu": round(statistics.median(r["cpu"] for r in runs), 4),
+        "max_rss_kb": max(r["max_rss_kb"] for r in runs),
+        "subprocesses": max(r["subprocesses"] for r in runs),
+        "spawned": runs[-1]["spawned"],
+        "runs": [round(r["wall"], 4) for r in runs],
+    }
+    failed = [r["exit_code"] for r in runs if r["exit_code"] != 0]
+    if failed:
+        with open(out_path, "r", encoding="utf-8", errors="replace") as f:
+            result["error"] = {"exit_codes": failed, "output": f.read()[-2000:]}
+    return result
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, same_host: bool
+) -> List[Dict[str, Any]]:
+    base_results = baseline.get("results") or {}
+    # How much slower this host is than the baseline's, measured on the reference workload.
+    # A faster host is held to the raw baseline: scaling down would only add the
+    # reference's own noise to every bench.
+    speed = max(1.0, results[REFERENCE]["wall"] / base_results[REFERENCE]["wall"])
+    metrics = [("wall", MIN_WALL_DELTA, speed)]
+    if same_host:
+        metrics.append(("max_rss_kb", MIN_RSS_DELTA_KB, 1.0))
+
+    regressions = []
+    for name, current in results.items():
+        base = base_results.get(name)
+        if not base or name == REFERENCE:
+            continue
+        for metric, slack, factor in metrics:
+            expected = base[metric] * factor
+            if current[metric] > expected * (1 + threshold) and current[metric] - expected > slack:
+                regressions.append(
+                    {
+                        "bench": name,
+                        "metric": metric,
+                        "baseline": base[metric],
+                        "expected": round(expected, 4),
+                        "current": current[metric],
+                    }
+                )
+        # Process counts are deterministic: any increase is a regression.
+        if current["subprocesses"] > base["subprocesses"]:
+            regressions.append(
+                {
+                    "bench": name,
+                    "metric": "subprocesses",
+                    "baseline": base["subprocesses"],
+                    "current": current["subprocesses"],
+                }
+            )
+    return regressions
+
+
+def over_budget(results: Dict[str, Any], budget: float) -> List[Dict[str, Any]]:
+    return [
+        {"bench": name, "metric": "wall", "budget": budget, "current": r["wall"]}
+        for name, r in results.items()
+        if "budget" in BENCHES[name] and r["wall"] > budget
+    ]
+
+
+def host_info() -> Dict[str, Any]:
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "git": git_version,
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return baseline if baseline.get("version") == BASELINE_VERSION else None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark .foreman/tools against synthetic large worktrees and logs."
+    )
+    parser.add_argument("--only", action="append", default=[], help="Bench name (repeatable)")
+    parser.add_argument("--list", action="store_true", help="List bench names and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per bench (median is kept)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Fixture size factor")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold", type=float, help=f"Allowed slowdown ratio (default: baseline's or {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        default=STARTUP_BUDGET,
+        help="Wall-time budget in seconds for the startup.* benches",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--workdir", help="Where to generate fixtures (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated fixtures")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHES))
+        return 0
+    unknown = [name for name in args.only if name not in BENCHES]
+    if unknown:
+        parser.error(f"unknown bench(es): {', '.join(unknown)}")
+    names = args.only or list(BENCHES)
+    if REFERENCE not in names:
+        names.insert(0, REFERENCE)
+
+    root = args.workdir or tempfile.mkdtemp(prefix="foreman-bench-")
+    os.makedirs(root, exist_ok=True)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        started = time.perf_counter()
+        print(f"[bench] generating fixtures in {root} (scale {args.scale})", file=sys.stderr)
+        fx: Any = fixtures.build(root, args.scale)
+        fx.update(
+            root=root,
+            scale=args.scale,
+            tasks=fixtures.scaled(fixtures.TODO_TASKS, args.scale),
+            todo_copy=os.path.join(root, "TODO.copy.md"),
+            todo_index=os.path.join(root, "state", "todo_index"),
+            empty_dir=os.path.join(root, "empty"),
+            stub_url=f"http://127.0.0.1:{server.server_address[1]}",
+        )
+        print(f"[bench] fixtures ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        os.makedirs(fx["empty_dir"], exist_ok=True)
+        shim_dir = os.path.join(root, "shims")
+        spawn_log = os.path.join(root, "spawns.log")
+        write_shims(shim_dir, spawn_log)
+        env = bench_env(fx, shim_dir, spawn_log)
+
+        results: Dict[str, Any] = {}
+        for name in names:
+            results[name] = run_bench(name, fx, env, args.repeat, spawn_log)
+            r = results[name]
+            print(
+                f"[bench] {name:28s} {r['wall']:8.3f}s  cpu {r['cpu']:7.3f}s  "
+                f"rss {r['max_rss_kb'] // 1024:5d} MiB  procs {r['subprocesses']}"
+                + ("  FAILED" if "error" in r else ""),
+                file=sys.stderr,
+            )
+    finally:
+        server.shutdown()
+        if not args.keep and not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    baseline = load_baseline(args.baseline)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = (baseline or {}).get("threshold", DEFAULT_THRESHOLD)
+    out: Dict[str, Any] = {"scale": args.scale, "repeat": args.repeat, "host": host_info(), "results": results}
+    failed = sorted(name for name, r in results.items() if "error" in r)
+
+    if baseline is None:
+        out["regressions"] = None
+    elif baseline.get("scale") != args.scale:
+        out["regressions"] = None
+        out["note"] = f"baseline was recorded at scale {baseline.get('scale')}; not compared"
+    elif "error" in results[REFERENCE] or REFERENCE not in (baseline.get("results") or {}):
+        out["regressions"] = None
+        out["note"] = "no reference timing to scale the baseline by; not compared"
+    else:
+        base_host = baseline.get("host") or {}
+        same_host = all(base_host.get(key) == out["host"][key] for key in HOST_KEYS)
+        out["speed_factor"] = round(results[REFERENCE]["wall"] / baseline["results"][REFERENCE]["wall"], 3)
+        if not same_host:
+            out["note"] = "baseline is from another platform or Python; max_rss_kb not compared"
+        out["regressions"] = compare(results, baseline, threshold, same_host)
+    out["threshold"] = threshold
+    out["over_budget"] = over_budget(results, args.startup_budget)
+    out["failed"] = failed
+
+    if args.update_baseline:
+        if failed:
+            print(f"[bench] not updating the baseline: {', '.join(failed)} failed", file=sys.stderr)
+        else:
+            # Keep older entries only if they were timed against a comparable reference run.
+            keep = (
+                baseline is not None
+                and baseline.get("scale") == args.scale
+                and all((baseline.get("host") or {}).get(key) == out["host"][key] for key in HOST_KEYS)
+            )
+            merged = dict(baseline.get("results") or {}) if keep else {}
+            merged.update({name: {k: v for k, v in r.items() if k != "runs"} for name, r in results.items()})
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": BASELINE_VERSION,
+                        "scale": args.scale,
+                        "repeat": args.repeat,
+                        "threshold": threshold,
+                        "host": out["host"],
+                        "results": dict(sorted(merged.items())),
+                    },
+                    f,
+                    indent=2,
+                )
+                f.write("\n")
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    if failed:
+        return 2
+    return 1 if out["regressions"] or out["over_budget"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
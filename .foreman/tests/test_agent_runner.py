@@ -0,0 +1,197 @@
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import agent_runner  # noqa: E402
+
+FAILED = {"exit_code": 1, "signal": None, "timed_out": None}
+EXITED_OK = {"exit_code": 0, "signal": None, "timed_out": None}
+CHATTER = [f"agent step {n}\n" for n in range(agent_runner.ENVELOPE_LINES + 5)]
+
+
+def classify(lines, run):
+    classifier = agent_runner.OutputClassifier(agent_runner.load_patterns(""))
+    for line in lines:
+        classifier.feed(line)
+    return classifier.outcome(run)[0]
+
+
+@pytest.mark.parametrize(
+    "lines, run, expected",
+    [
+        # OpenCode's own envelope on the way out of a failed run.
+        (["working\n", "Error: 429 Too Many Requests: rate limit reached\n"], FAILED, "transient"),
+        (["\x1b[91mError: \x1b[0mProviderModelNotFoundError: model x not found\n"], FAILED, "permanent"),
+        (["AI_APICallError: status 503 service unavailable\n"], FAILED, "transient"),
+        (["Error: Invalid API key provided\n"], FAILED, "permanent"),
+        (["Unknown argument: --agnet\n"], FAILED, "permanent"),
+        (["Error: something odd happened\n"], FAILED, "agent_failed"),
+        (["Error: fetch failed\n", "Error: Unauthorized (status 401)\n"], FAILED, "permanent"),
+        # Test output the Builder produced mid-task is not the envelope.
+        (["Error: expected 401 to equal 200\n", *CHATTER], FAILED, "agent_failed"),
+        (["Error: network timed out in test\n", *CHATTER], FAILED, "agent_failed"),
+        # A run that exits 0 is fine whatever it printed.
+        (["Error: expected 401 to equal 200\n", "all done\n"], EXITED_OK, "ok"),
+        # Ordinary log text never matches the transient patterns.
+        (["Error: the network module is not ready for 502 items\n"], FAILED, "agent_failed"),
+        (["plain output\n"], FAILED, "agent_failed"),
+        (["plain output\n"], EXITED_OK, "ok"),
+        # How the process ended: infra trouble is retried.
+        ([], {"exit_code": None, "signal": "SIGKILL", "timed_out": None}, "transient"),
+        ([], {"exit_code": None, "signal": "SIGTERM", "timed_out": "wall"}, "transient"),
+        ([], {"exit_code": None, "signal": "SIGTERM", "timed_out": "idle"}, "transient"),
+    ],
+)
+def test_outcome(lines, run, expected) -> None:
+    assert classify(lines, run) == expected
+
+
+def test_end_outcomes_are_configurable(monkeypatch) -> None:
+    monkeypatch.setenv("FOREMAN_RUNNER_SIGNAL_OUTCOME", "agent_failed")
+    monkeypatch.setenv("FOREMAN_RUNNER_TIMEOUT_OUTCOME", "bogus")
+    assert classify([], {"exit_code": None, "signal": "SIGKILL", "timed_out": None}) == "agent_failed"
+    assert classify([], {"exit_code": None, "signal": "SIGTERM", "timed_out": "wall"}) == "transient"
+
+
+def test_job_fields_cover_the_cli() -> None:
+    args = agent_runner.build_parser().parse_args(["--webhook", "u", "--agent", "a", "--title", "t"])
+    assert set(vars(args)) == set(agent_runner.JOB_FIELDS)
+    assert vars(agent_runner.job_from_fields({"webhook": "u", "agent": "a", "title": "t"})) == vars(args)
+
+    with pytest.raises(ValueError, match="unknown job fields: socket"):
+        agent_runner.job_from_fields({"webhook": "u", "agent": "a", "title": "t", "socket": "s"})
+    with pytest.raises(ValueError, match="missing required job fields: title"):
+        agent_runner.job_from_fields({"webhook": "u", "agent": "a"})
+
+
+def new_stream(tmp_path, tail_lines: int = 3) -> agent_runner.OutputStream:
+    classifier = agent_runner.OutputClassifier(agent_runner.load_patterns(""))
+    return agent_runner.OutputStream(str(tmp_path / "logs" / "run.log"), tail_lines, classifier)
+
+
+def test_stream_counts_log_bytes_and_keeps_a_bounded_tail(tmp_path) -> None:
+    stream = new_stream(tmp_path)
+    child = (
+        "import sys\n"
+        "for n in range(5):\n"
+        "    print(f'schritt {n}: grün ✓', flush=True)\n"
+        "print('fehler: ü', file=sys.stderr, flush=True)\n"
+        "sys.stdout.buffer.write(b'bad \\xff byte\\n')\n"
+    )
+    run = agent_runner.stream_process([sys.executable, "-c", child], None, stream)
+    stream.close()
+
+    assert (run["exit_code"], run["timed_out"]) == (0, None)
+    assert stream.lines == 7
+    # Multi-byte text (and the replacement for an undecodable byte) is counted
+    # in bytes, exactly as much as the log file holds.
+    assert stream.bytes == os.path.getsize(stream.log_path)
+    assert stream.bytes > sum(len(line) for line in open(stream.log_path, encoding="utf-8"))
+    assert len(stream.tail) == 3
+    assert "bad \ufffd byte\n" in stream.tail
+
+
+def test_idle_child_is_stopped_and_the_timeout_logged(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(agent_runner, "WATCH_INTERVAL", 0.1)
+    stream = new_stream(tmp_path)
+    child = "import time\nprint('started', flush=True)\ntime.sleep(30)\n"
+    started = time.monotonic()
+    run = agent_runner.stream_process(
+        [sys.executable, "-c", child], None, stream, idle_timeout=0.5, kill_grace=2.0
+    )
+    stream.close()
+
+    assert time.monotonic() - started < 10
+    assert (run["timed_out"], run["signal"]) == ("idle", "SIGTERM")
+    assert stream.tail_text() == (
+        "started\n[Runner] idle timeout after 0.5s; terminating process group\n"
+    )
+    assert stream.bytes == os.path.getsize(stream.log_path)
+
+
+def test_daemon_socket_is_private(tmp_path) -> None:
+    path = str(tmp_path / "runner.sock")
+    server = agent_runner.RunnerServer(path, agent_runner.Scheduler({"setup": 1}, 1, 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert agent_runner.send_request(path, {"op": "ping"})["ok"] is True
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            assert agent_runner.socket_peer_uid(sock) in (os.getuid(), None)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def n8n_resume():
+    """A Wait node's resume URL: the first POST resumes it (slowly), later ones get 404."""
+    posts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers["Content-Length"]))
+            posts.append(time.monotonic())
+            if len(posts) == 1 and server.slow_first:
+                time.sleep(1)
+                status = 200
+            else:
+                status = 404 if server.consumed else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.slow_first = True
+    server.consumed = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/", posts
+    server.shutdown()
+
+
+def test_read_timeout_then_404_counts_as_delivered(n8n_resume, monkeypatch) -> None:
+    _, url, posts = n8n_resume
+    monkeypatch.setattr(agent_runner, "POST_READ_TIMEOUT", 0.3)
+    assert agent_runner.deliver_with_backoff(url, {"success": True}, 5.0) == (
+        True,
+        "HTTP 404 (already delivered)",
+        True,
+    )
+    assert len(posts) == 2
+
+
+def test_404_before_any_send_is_retried_then_spooled(n8n_resume, tmp_path) -> None:
+    server, url, posts = n8n_resume
+    server.slow_first = False
+    delivered, detail, maybe_sent = agent_runner.deliver_with_backoff(url, {}, 0.6)
+    assert (delivered, detail, maybe_sent) == (False, "HTTP 404", False)
+    assert len(posts) > 1
+
+    spool = str(tmp_path / "spool")
+    agent_runner.spool_callback(url, {}, detail, spool, maybe_sent)
+    assert agent_runner.flush_spool(spool, 0.3) == {"delivered": 0, "pending": 1}
+    # Once the Wait node registers, the spooled callback goes through.
+    server.consumed = False
+    assert agent_runner.flush_spool(spool, 0.3) == {"delivered": 1, "pending": 0}
+
+
+def test_refused_connection_was_never_sent() -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+    delivered, _, sent = agent_runner.post_webhook(url, {})
+    assert (delivered, sent) == (False, False)
@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import artifacts  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(artifacts, "CODEC", "gzip")
+
+    def write(name: str, content: bytes) -> str:
+        path = tmp_path / name
+        path.write_bytes(content)
+        return str(path)
+
+    return write
+
+
+def fetched(name: str, tail_bytes: int = 0) -> bytes:
+    out = io.BytesIO()
+    artifacts.fetch(name, out, tail_bytes)
+    return out.getvalue()
+
+
+def test_same_label_in_one_second_gets_its_own_ref(store, monkeypatch) -> None:
+    monkeypatch.setattr(artifacts.time, "time", lambda: 1700000000.5)
+    first = artifacts.store_file(store("a.log", b"first run\n"), "ds9-1", "builder-b1-i0")
+    second = artifacts.store_file(store("b.log", b"retry\n"), "ds9-1", "builder-b1-i0")
+
+    assert first["ref"] == "ds9-1/builder-b1-i0.1700000000"
+    assert second["ref"] == "ds9-1/builder-b1-i0.1700000000-2"
+    assert fetched(first["ref"]) == b"first run\n"
+    assert fetched(second["ref"]) == b"retry\n"
+
+
+def test_identical_output_is_stored_once(store) -> None:
+    first = artifacts.store_file(store("a.log", b"x" * 10000), "t1", "run")
+    second = artifacts.store_file(store("b.log", b"x" * 10000), "t2", "run")
+
+    assert first["digest"] == second["digest"]
+    assert first["stored_bytes"] < first["size"]
+    assert len(artifacts.objects()) == 1
+    assert fetched(first["digest"][:15]) == b"x" * 10000
+    assert fetched(second["ref"], tail_bytes=3) == b"xxx"
+
+
+def test_zstd_without_zstandard_falls_back_to_gzip(store, monkeypatch, capsys) -> None:
+    monkeypatch.setattr(artifacts, "CODEC", "zstd")
+    monkeypatch.setattr(artifacts, "_zstd", lambda: None)
+
+    entry = artifacts.store_file(store("a.log", b"output\n"), "t1", "run")
+    assert entry["codec"] == "gzip"
+    assert "using gzip" in capsys.readouterr().err
+    assert artifacts.store_file(store("b.log", b"more\n"), "t1", "run", codec="zstd")["codec"] == "gzip"
+    assert fetched(entry["ref"]) == b"output\n"
+
+
+def test_prune_drops_oldest_refs_then_orphans(store, monkeypatch) -> None:
+    clock = iter(range(1700000000, 1700000010))
+    monkeypatch.setattr(artifacts.time, "time", lambda: float(next(clock)))
+    old = artifacts.store_file(store("a.log", os.urandom(4000)), "t1", "run")
+    new = artifacts.store_file(store("b.log", os.urandom(4000)), "t1", "run")
+
+    result = artifacts.prune(0, new["stored_bytes"])
+    assert (result["refs_removed"], result["objects_removed"], result["refs_kept"]) == (1, 1, 1)
+    with pytest.raises(KeyError):
+        artifacts.resolve(old["ref"])
+    assert [e["ref"] for e in artifacts.refs()] == [new["ref"]]
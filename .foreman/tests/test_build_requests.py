@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import build_requests  # noqa: E402
+
+BUILD_REQUESTS = os.path.join(FOREMAN_DIR, "tools", "build_requests.py")
+TODO = """# TODO
+
+  - [x] [ds9-1 · 5.1 First](#51-first)
+  - [ ] [ds9-2 · 5.2 Second](#52-second)
+  - [ ] [ds9-10 · 6.1 Third](#61-third)
+
+### 5.1 [ds9-1] First
+
+- **Title**: First task
+- **Description**:
+  - Do the first thing.
+
+### 5.2 [ds9-2] Second
+
+- **Title**: Second task
+- **Scope**: `components/src/two`
+- **Description**:
+  - Do the second thing.
+
+### 6.1 [ds9-10] Third
+
+- **Title**: Third task
+- **Description**:
+  - Do the third thing.
+"""
+
+
+def run(tmp_path, *args: str) -> subprocess.CompletedProcess:
+    todo = tmp_path / "TODO.md"
+    todo.write_text(TODO)
+    return subprocess.run(
+        [sys.executable, BUILD_REQUESTS, "--todo", str(todo), *args],
+        env={**os.environ, "FOREMAN_TODO_INDEX_DIR": str(tmp_path / "index")},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+
+
+def test_range_and_section_matching() -> None:
+    assert build_requests.in_range("ds9-10", "ds9-2..ds9-10")
+    assert not build_requests.in_range("ds9-1", "ds9-2..")
+    assert not build_requests.in_range("lcars-5", "ds9-1..ds9-9")
+    assert build_requests.in_section({"section": "5.2"}, "5")
+    assert not build_requests.in_section({"section": "51.2"}, "5")
+
+
+def test_jsonl_requests_for_a_selection(tmp_path) -> None:
+    proc = run(tmp_path, "--range", "ds9-1..ds9-10", "--pending")
+    assert proc.returncode == 0, proc.stderr
+    bodies = [json.loads(line) for line in proc.stdout.splitlines()]
+    assert bodies == [
+        {
+            "task_id": "ds9-2",
+            "prompt": "Second task. Do the second thing.",
+            "scope": ["components/src/two"],
+        },
+        {"task_id": "ds9-10", "prompt": "Third task. Do the third thing."},
+    ]
+
+    proc = run(tmp_path, "--section", "5")
+    assert [json.loads(line)["task_id"] for line in proc.stdout.splitlines()] == ["ds9-1", "ds9-2"]
+
+
+def test_unknown_task_id_fails(tmp_path) -> None:
+    proc = run(tmp_path, "ds9-2", "ds9-99")
+    assert proc.returncode == 1
+    assert "ds9-99" in proc.stderr and proc.stdout == ""
+
+
+def test_post_sends_every_request(tmp_path) -> None:
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            received.append(body["task_id"])
+            self.send_response(500 if body["task_id"] == "ds9-10" else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        proc = run(tmp_path, "--pending", "--post", f"http://127.0.0.1:{server.server_address[1]}/")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    results = {r["task_id"]: r for r in map(json.loads, proc.stdout.splitlines())}
+    assert proc.returncode == 1
+    assert sorted(received) == ["ds9-10", "ds9-2"]
+    assert (results["ds9-2"]["ok"], results["ds9-10"]["status"]) == (True, 500)
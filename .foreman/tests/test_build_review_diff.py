@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import build_review_diff  # noqa: E402
+import foreman_state  # noqa: E402
+
+BUILD_REVIEW_DIFF = os.path.join(FOREMAN_DIR, "tools", "build_review_diff.py")
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "foreman",
+    "GIT_AUTHOR_EMAIL": "foreman@example.com",
+    "GIT_COMMITTER_NAME": "foreman",
+    "GIT_COMMITTER_EMAIL": "foreman@example.com",
+}
+
+
+def git(*args: str, cwd) -> str:
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, env={**os.environ, **GIT_ENV}, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def commit_files(repo, message: str, files: dict) -> str:
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(repo / path), exist_ok=True)
+        (repo / path).write_text(content)
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", message, cwd=repo)
+    return git("rev-parse", "HEAD", cwd=repo).strip()
+
+
+def task_repo(tmp_path):
+    repo = tmp_path / "t1"
+    git("init", "-q", "-b", "main", str(repo), cwd=tmp_path)
+    commit_files(repo, "init", {"README.md": "hi\n"})
+    git("checkout", "-q", "-b", "feature/t1", cwd=repo)
+    return repo
+
+
+def test_budget_filters_and_hunk_summaries(tmp_path) -> None:
+    repo = task_repo(tmp_path)
+    head = commit_files(
+        repo,
+        "work",
+        {
+            "src/a.ts": "export const a = 1;\n",
+            "src/big.ts": "".join(f"export const v{i} = {i};\n" for i in range(200)),
+            "pnpm-lock.yaml": "lockfileVersion: 9\n" * 50,
+            "components/dist/x.js": "built\n",
+        },
+    )
+    base = git("merge-base", "main", "HEAD", cwd=repo).strip()
+
+    patch, files = build_review_diff.build(
+        str(repo), base, head, build_review_diff.DROP_PATTERNS, build_review_diff.SUMMARIZE_PATTERNS, 2000, 100
+    )
+    by_path = {entry["path"]: entry for entry in files}
+    assert "src/a.ts" in patch and "src/big.ts" not in patch and "lockfileVersion" not in patch
+    assert by_path["src/a.ts"]["included"] is True
+    assert (by_path["src/big.ts"]["reason"], by_path["src/big.ts"]["hunk_count"]) == ("over_budget", 1)
+    assert by_path["pnpm-lock.yaml"]["reason"] == "summarized"
+    assert by_path["components/dist/x.js"]["reason"] == "dropped"
+    assert "hunks" not in by_path["components/dist/x.js"]
+
+
+def test_second_pass_only_shows_commits_since_the_review(tmp_path) -> None:
+    repo = task_repo(tmp_path)
+    commit_files(repo, "first", {"src/a.ts": "export const a = 1;\n"})
+    db = str(tmp_path / "foreman.db")
+    env = {**os.environ, "FOREMAN_STATE_DB": db, "FOREMAN_EVENTS_FILE": ""}
+
+    def build() -> dict:
+        proc = subprocess.run(
+            [sys.executable, BUILD_REVIEW_DIFF, "build", "--worktree", str(repo)],
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        assert proc.returncode == 0, proc.stderr
+        return json.loads(proc.stdout)
+
+    first = build()
+    assert (first["mode"], first["note"]) == ("full", "no completed review yet")
+
+    conn = foreman_state.connect(db)
+    foreman_state.record_handoff(conn, "t1", "inspector", {"status": "valid", "data": {"run": {"status": "ok"}}})
+    conn.close()
+    commit_files(repo, "second", {"src/b.ts": "export const b = 2;\n"})
+
+    second = build()
+    assert (second["mode"], second["pass"]) == ("delta", 2)
+    patch = (repo / build_review_diff.PATCH_NAME).read_text()
+    assert "src/b.ts" in patch and "src/a.ts" not in patch
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import contracts  # noqa: E402
+from handoff import check_handoff  # noqa: E402
+
+OK_RUN = {"status": "ok", "failed_step": None, "error": None}
+FAILED_RUN = {"status": "failed", "failed_step": "lint", "error": "boom"}
+
+# (kind, result JSON, (path, code) of each error) as the hand-written validators
+# in check_builder_handoff.py / check_inspector_handoff.py reported them.
+CASES = [
+    ("builder", None, [("<root>", "type_error")]),
+    ("builder", [], [("<root>", "type_error")]),
+    ("builder", {}, [("run", "required")]),
+    ("builder", {"run": {"status": "bad"}}, [("run.status", "invalid_enum")]),
+    (
+        "builder",
+        {"run": {"status": "ok", "failed_step": 3, "error": []}},
+        [("run.failed_step", "type_error"), ("run.error", "type_error"), ("work", "required")],
+    ),
+    (
+        "builder",
+        {"run": OK_RUN, "work": {"summary": " ", "complexity": "huge"}},
+        [("work.summary", "required"), ("work.complexity", "invalid_enum")],
+    ),
+    ("builder", {"run": OK_RUN, "work": {"summary": "did it", "complexity": "low"}}, []),
+    ("builder", {"run": FAILED_RUN, "work": None}, []),
+    ("builder", {"run": FAILED_RUN, "work": {"summary": "x"}}, [("work", "invalid")]),
+    ("builder", {"run": {"status": "weird"}, "work": 5}, [("run.status", "invalid_enum")]),
+    ("inspector", {"run": OK_RUN, "work": None}, [("work", "required")]),
+    (
+        "inspector",
+        {"run": OK_RUN, "work": {"status": "approved"}},
+        [("work.issues", "type_error"), ("work.next_tasks", "type_error")],
+    ),
+    ("inspector", {"run": OK_RUN, "work": {"status": "approved", "issues": [], "next_tasks": []}}, []),
+    (
+        "inspector",
+        {"run": OK_RUN, "work": {"status": "changes_requested", "issues": [], "next_tasks": []}},
+        [("work.issues", "required")],
+    ),
+    (
+        "inspector",
+        {"run": OK_RUN, "work": {"status": "changes_requested", "issues": "x", "next_tasks": ["", 1]}},
+        [("work.issues", "type_error"), ("work.next_tasks", "type_error")],
+    ),
+    (
+        "inspector",
+        {
+            "run": OK_RUN,
+            "work": {
+                "status": "nope",
+                "issues": [
+                    5,
+                    {"severity": "huge", "description": "", "paths": ["a", ""]},
+                    {"severity": "minor", "description": "d", "paths": ["a"]},
+                ],
+                "next_tasks": ["t"],
+            },
+        },
+        [
+            ("work.status", "invalid_enum"),
+            ("work.issues[0]", "type_error"),
+            ("work.issues[1].severity", "invalid_enum"),
+            ("work.issues[1].description", "required"),
+            ("work.issues[1].paths", "type_error"),
+        ],
+    ),
+    ("inspector", {"run": FAILED_RUN, "work": {"status": "approved"}}, [("work", "invalid")]),
+]
+
+
+@pytest.mark.parametrize("kind,data,expected", CASES)
+def test_validate_matches_the_original_checkers(kind: str, data, expected) -> None:
+    result = contracts.validate(kind, data)
+    assert [(e["path"], e["code"]) for e in result["errors"]] == expected
+    assert result["ok"] is (not expected)
+
+
+def test_check_handoff_statuses(tmp_path) -> None:
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    assert check_handoff("builder", str(tmp_path))["status"] == "file_missing"
+
+    result_file = tmp_path / "builder_result.json"
+    result_file.write_text("{")
+    assert check_handoff("builder", str(tmp_path))["status"] == "invalid_json"
+
+    result_file.write_text(json.dumps({"run": OK_RUN, "work": {"summary": "s", "complexity": "high"}}))
+    output = check_handoff("builder", str(tmp_path))
+    assert (output["status"], output["data"]["work"]["complexity"]) == ("valid", "high")
+    assert output["changed_files"] == [{"path": "builder_result.json", "status": "??"}]
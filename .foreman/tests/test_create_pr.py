@@ -0,0 +1,229 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import scope  # noqa: E402
+
+CREATE_PR = os.path.join(FOREMAN_DIR, "tools", "create_pr.py")
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "foreman",
+    "GIT_AUTHOR_EMAIL": "foreman@example.com",
+    "GIT_COMMITTER_NAME": "foreman",
+    "GIT_COMMITTER_EMAIL": "foreman@example.com",
+}
+
+
+def git(*args: str, cwd) -> str:
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, env={**os.environ, **GIT_ENV}, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def test_scoped_worktree_without_docs_still_pushes(tmp_path) -> None:
+    origin = tmp_path / "origin.git"
+    repo = tmp_path / "repo"
+    git("init", "-q", "--bare", str(origin), cwd=tmp_path)
+    git("init", "-q", "-b", "main", str(repo), cwd=tmp_path)
+    (repo / "components").mkdir()
+    (repo / "components" / "app.ts").write_text("export {};\n")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", "init", cwd=repo)
+    git("remote", "add", "origin", str(origin), cwd=repo)
+
+    worktree = str(tmp_path / "wt" / "t1")
+    scope.create(str(repo), worktree, "feature/t1", ["components"])
+    with open(os.path.join(worktree, "components", "app.ts"), "a") as f:
+        f.write("export const x = 1;\n")
+
+    # No token: the PR is opened through `gh`, which fails for a local origin.
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("GITHUB_TOKEN", "GH_TOKEN", "GITHUB_REPOSITORY")
+    }
+    proc = subprocess.run(
+        [
+            sys.executable, CREATE_PR, "--task-id", "t1", "--title", "T1", "--body", "b",
+            "--worktree", worktree, "--branch", "feature/t1", "--sync-cleanup",
+        ],
+        cwd=repo,
+        env={
+            **env,
+            **GIT_ENV,
+            "FOREMAN_STATE_DB": str(tmp_path / "foreman.db"),
+            "FOREMAN_EVENTS_FILE": "",
+            "FOREMAN_POOL_SIZE": "0",
+        },
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert "docs/TODO.md is missing" in result["todo"]["error"]
+    assert "push" in result["timings"] and "create_pr" in result["timings"]
+    assert git("log", "-1", "--format=%s", "feature/t1", cwd=origin).strip() == "chore: finalize task"
+
+
+@pytest.fixture
+def github_api():
+    """A stand-in for the GitHub REST API (`GITHUB_API_URL`): records every
+    request and answers the PR creation with `answer["status"]`."""
+    requests_seen = []
+    answer = {"status": 201}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self) -> None:
+            requests_seen.append(("HEAD", self.path, dict(self.headers), None))
+            self.send_response(200)
+            self.end_headers()
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests_seen.append(("POST", self.path, dict(self.headers), body))
+            if answer["status"] == 201:
+                payload = {"html_url": "https://github.test/o/r/pull/7"}
+            else:
+                payload = {"message": "Validation Failed"}
+            data = json.dumps(payload).encode()
+            self.send_response(answer["status"])
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api", requests_seen, answer
+    server.shutdown()
+
+
+def make_task(tmp_path):
+    """A repo with a local origin and a task worktree with one uncommitted change."""
+    origin = tmp_path / "origin.git"
+    repo = tmp_path / "repo"
+    git("init", "-q", "--bare", str(origin), cwd=tmp_path)
+    git("init", "-q", "-b", "main", str(repo), cwd=tmp_path)
+    (repo / "app.ts").write_text("export {};\n")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", "init", cwd=repo)
+    git("remote", "add", "origin", str(origin), cwd=repo)
+    worktree = tmp_path / "wt" / "t1"
+    git("worktree", "add", "-q", "-b", "feature/t1", str(worktree), "main", cwd=repo)
+    (worktree / "app.ts").write_text("export const x = 1;\n")
+    return origin, repo, str(worktree)
+
+
+def fake_gh(tmp_path) -> str:
+    """A `gh` on PATH that logs its arguments and prints a PR URL."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "gh"
+    script.write_text(
+        "#!/bin/sh\n"
+        f"printf '%s\\n' \"$@\" > '{tmp_path / 'gh.args'}'\n"
+        "echo 'Creating draft pull request'\n"
+        "echo 'https://github.test/o/r/pull/8'\n"
+    )
+    script.chmod(0o755)
+    return str(bin_dir)
+
+
+def create_pr(tmp_path, repo, worktree: str, api_url: str) -> dict:
+    env = {key: value for key, value in os.environ.items() if key != "GH_TOKEN"}
+    proc = subprocess.run(
+        [
+            sys.executable, CREATE_PR, "--task-id", "t1", "--title", "T1", "--body", "b",
+            "--worktree", worktree, "--branch", "feature/t1", "--sync-cleanup",
+        ],
+        cwd=repo,
+        env={
+            **env,
+            **GIT_ENV,
+            "PATH": fake_gh(tmp_path) + os.pathsep + env.get("PATH", ""),
+            "GITHUB_TOKEN": "secret",
+            "GITHUB_REPOSITORY": "o/r",
+            "GITHUB_API_URL": api_url,
+            "FOREMAN_STATE_DB": str(tmp_path / "foreman.db"),
+            "FOREMAN_EVENTS_FILE": str(tmp_path / "events.jsonl"),
+            "FOREMAN_POOL_SIZE": "0",
+        },
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_api_opens_the_draft_pr_on_a_warmed_connection(github_api, tmp_path) -> None:
+    api_url, seen, _ = github_api
+    origin, repo, worktree = make_task(tmp_path)
+
+    result = create_pr(tmp_path, repo, worktree, api_url)
+
+    assert (result["ok"], result["pr_via"], result["pr_url"]) == (
+        True,
+        "api",
+        "https://github.test/o/r/pull/7",
+    )
+    # The HEAD warms the connection during the push; then one POST opens the PR.
+    assert [(method, path) for method, path, _, _ in seen] == [
+        ("HEAD", "/api"),
+        ("POST", "/api/repos/o/r/pulls"),
+    ]
+    _, _, headers, body = seen[1]
+    assert headers["Authorization"] == "Bearer secret"
+    assert headers["X-GitHub-Api-Version"] == "2022-11-28"
+    assert body == {"title": "T1", "body": "b", "head": "feature/t1", "base": "main", "draft": True}
+    assert not (tmp_path / "gh.args").exists()
+    assert git("log", "-1", "--format=%s", "feature/t1", cwd=origin).strip() == "chore: finalize task"
+
+    # Every step is timed, in the result and as a `pr.<step>` span.
+    steps = ["remove_artifacts", "update_todo", "stage", "commit", "push", "create_pr", "cleanup"]
+    timings = result["timings"]
+    assert list(timings) == [*steps, "total"]
+    assert all(value >= 0 for value in timings.values())
+    assert sum(timings[step] for step in steps) <= timings["total"] + 0.001
+    with open(tmp_path / "events.jsonl") as f:
+        spans = [json.loads(line) for line in f]
+    assert [e["phase"] for e in spans if e["phase"].startswith("pr.")] == [f"pr.{s}" for s in steps]
+    assert {e["task_id"] for e in spans if e["phase"].startswith("pr.")} == {"t1"}
+
+
+def test_api_error_falls_back_to_gh(github_api, tmp_path) -> None:
+    api_url, seen, answer = github_api
+    answer["status"] = 422
+    _, repo, worktree = make_task(tmp_path)
+
+    result = create_pr(tmp_path, repo, worktree, api_url)
+
+    assert (result["ok"], result["pr_via"], result["pr_url"]) == (
+        True,
+        "gh",
+        "https://github.test/o/r/pull/8",
+    )
+    assert [(method, path) for method, path, _, _ in seen] == [
+        ("HEAD", "/api"),
+        ("POST", "/api/repos/o/r/pulls"),
+    ]
+    assert result["stderr"].startswith("GitHub API returned 422")
+    assert (tmp_path / "gh.args").read_text().splitlines() == [
+        "pr", "create", "--title", "T1", "--body", "b", "--head", "feature/t1", "--base", "main",
+        "--draft",
+    ]
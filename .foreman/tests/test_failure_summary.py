@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import foreman_state  # noqa: E402
+
+SUMMARY = os.path.join(FOREMAN_DIR, "tools", "write_foreman_failure_summary.py")
+
+
+def run(tmp_path, *args: str, stdin: str = "{}") -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, SUMMARY, "--status", "invalid", "--reason", "result_invalid", *args],
+        input=stdin,
+        env={**os.environ, "FOREMAN_STATE_DB": str(tmp_path / "foreman.db"), "FOREMAN_EVENTS_FILE": ""},
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+
+
+def test_who_requires_task_id(tmp_path) -> None:
+    proc = run(tmp_path, "--who", "builder")
+    assert proc.returncode == 2
+    assert "--who requires --task-id" in proc.stderr
+
+
+def test_non_dict_data_is_ignored(tmp_path) -> None:
+    proc = run(tmp_path, "--task-id", "t1", "--who", "builder", stdin='{"data": ["run"]}')
+    assert proc.returncode == 0, proc.stderr
+    out = json.loads(proc.stdout)
+    assert out["data"] == {"run": None, "work": None}
+
+
+def test_every_review_cycle_is_recorded_and_reported_from_the_handoff_file(tmp_path) -> None:
+    worktree = tmp_path / "t1"
+    subprocess.run(["git", "init", "-q", str(worktree)], check=True)
+    env = {
+        **os.environ,
+        "FOREMAN_STATE_DB": str(tmp_path / "foreman.db"),
+        "FOREMAN_EVENTS_FILE": "",
+        "FOREMAN_HANDOFF_DIR": str(tmp_path / "handoffs"),
+        "FOREMAN_INSPECTOR_CACHE": str(tmp_path / "cache"),
+    }
+    for path in ("src/a.ts", "src/b.ts"):
+        (worktree / "inspector_result.json").write_text(
+            json.dumps(
+                {
+                    "run": {"status": "ok", "failed_step": None, "error": None},
+                    "work": {
+                        "status": "changes_requested",
+                        "issues": [{"severity": "major", "description": "Fix it", "paths": ["src/a.ts", path]}],
+                        "next_tasks": [],
+                    },
+                }
+            )
+        )
+        proc = subprocess.run(
+            [sys.executable, os.path.join(FOREMAN_DIR, "tools", "check_inspector_handoff.py")],
+            cwd=worktree,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        assert proc.returncode == 0, proc.stderr
+
+    # Retries exhausted: the report comes from the saved handoff, not from argv or the retry state.
+    proc = subprocess.run(
+        [
+            sys.executable, SUMMARY, "--reason", "changes_requested", "--task-id", "t1",
+            "--input", str(tmp_path / "handoffs" / "t1.inspector.json"), "--runner", "-",
+        ],
+        input='{"outcome": "ok"}',
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout)
+    assert report["data"]["work"]["issues"][0]["paths"] == ["src/a.ts", "src/b.ts"]
+    assert (report["status"], report["runner"]) == ("valid", {"outcome": "ok"})
+
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    tasks = foreman_state.top_rejections(conn, "tasks")
+    paths = foreman_state.top_rejections(conn, "paths")
+    conn.close()
+    assert (tasks[0]["task_id"], tasks[0]["changes_requested"], tasks[0]["rejections"]) == ("t1", 2, 2)
+    assert (paths[0]["path"], paths[0]["issues"]) == ("src/a.ts", 2)
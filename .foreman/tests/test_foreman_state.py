@@ -0,0 +1,115 @@
+import os
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import foreman_state  # noqa: E402
+
+
+def handoff(agent: str, **work) -> dict:
+    data = {"run": {"status": "ok"}}
+    if agent == "inspector":
+        data["work"] = work
+    return {"status": "valid", "data": data}
+
+
+def test_resume_after_changes_requested_keeps_the_feedback(tmp_path) -> None:
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    foreman_state.record_phase(conn, "t1", "setup", "ok")
+    foreman_state.record_handoff(conn, "t1", "builder", handoff("builder"))
+    foreman_state.record_handoff(
+        conn,
+        "t1",
+        "inspector",
+        handoff(
+            "inspector",
+            status="changes_requested",
+            issues=[{"severity": "major", "description": "Add tests", "paths": ["a.ts"]}],
+            next_tasks=["Run vitest"],
+        ),
+    )
+
+    point = foreman_state.resume_point(conn, "t1")
+    assert point["next_phase"] == "builder"
+    assert point["next_builder_pass"] == 2
+    assert (point["inspector_pass"], point["retry_count"]) == (1, 1)
+    assert point["change_requests"] == (
+        "ISSUES:\n1. [major] Add tests\n  Paths: a.ts\n\nNEXT TASKS:\n- Run vitest"
+    )
+    conn.close()
+
+
+def test_resume_after_preflight_failure_keeps_the_text(tmp_path) -> None:
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    foreman_state.record_handoff(conn, "t1", "builder", handoff("builder"))
+    foreman_state.record_preflight(conn, "t1", "failed", "lint: 2 errors")
+
+    point = foreman_state.resume_point(conn, "t1")
+    assert (point["next_phase"], point["change_requests"]) == ("builder", "lint: 2 errors")
+    conn.close()
+
+
+def test_preflight_error_is_not_recorded_as_passed(tmp_path) -> None:
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    foreman_state.record_handoff(conn, "t1", "builder", handoff("builder"))
+    foreman_state.record_preflight(conn, "t1", "error")
+
+    (row,) = conn.execute("SELECT status FROM phases WHERE task_id = 't1' AND phase = 'preflight'")
+    assert row["status"] == "error"
+    point = foreman_state.resume_point(conn, "t1")
+    assert (point["last_phase"], point["next_phase"], point["retry_count"]) == (
+        "builder_handoff",
+        "preflight",
+        0,
+    )
+
+    foreman_state.record_preflight(conn, "t1", "passed")
+    (row,) = conn.execute("SELECT status FROM phases WHERE task_id = 't1' AND phase = 'preflight'")
+    assert row["status"] == "ok"
+    assert foreman_state.resume_point(conn, "t1")["next_phase"] == "diff"
+    conn.close()
+
+
+def test_resume_of_finished_and_unknown_tasks(tmp_path) -> None:
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    foreman_state.finish_task(conn, "t1", "done", pr_url="https://example.test/pr/1")
+
+    assert foreman_state.resume_point(conn, "t1")["next_phase"] == "done"
+    assert not foreman_state.reopen_task(conn, "t1")
+    unknown = foreman_state.resume_point(conn, "t2")
+    assert (unknown["known"], unknown["next_phase"], unknown["next_builder_pass"]) == (
+        False,
+        "worktree",
+        1,
+    )
+    conn.close()
+
+
+def test_failed_task_is_reopened_for_a_rerun(tmp_path) -> None:
+    conn = foreman_state.connect(str(tmp_path / "foreman.db"))
+    foreman_state.record_phase(conn, "t1", "setup", "ok")
+    foreman_state.record_handoff(conn, "t1", "builder", handoff("builder"))
+    foreman_state.record_handoff(
+        conn, "t1", "inspector", handoff("inspector", status="changes_requested")
+    )
+    foreman_state.finish_task(conn, "t1", "failed", reason="max retries")
+
+    # A failed task is not final: it resumes where the failed run stopped.
+    assert foreman_state.resume_point(conn, "t1")["next_phase"] == "builder"
+
+    assert foreman_state.reopen_task(conn, "t1")
+    point = foreman_state.resume_point(conn, "t1")
+    assert (point["status"], point["next_phase"], point["next_builder_pass"]) == (
+        "running",
+        "builder",
+        2,
+    )
+    assert (point["retry_count"], point["inspector_pass"]) == (0, 1)
+    assert foreman_state.task_status(conn, "t1")[0]["reason"] is None
+    assert not foreman_state.reopen_task(conn, "t1")
+
+    # The rerun can finish normally.
+    foreman_state.finish_task(conn, "t1", "done")
+    assert foreman_state.resume_point(conn, "t1")["next_phase"] == "done"
+    conn.close()
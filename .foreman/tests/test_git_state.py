@@ -0,0 +1,71 @@
+import io
+import os
+import subprocess
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import git_state  # noqa: E402
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "foreman",
+    "GIT_AUTHOR_EMAIL": "foreman@example.com",
+    "GIT_COMMITTER_NAME": "foreman",
+    "GIT_COMMITTER_EMAIL": "foreman@example.com",
+}
+
+
+def git(*args: str, cwd) -> None:
+    subprocess.run(["git", *args], cwd=cwd, env={**os.environ, **GIT_ENV}, check=True, capture_output=True)
+
+
+def test_nul_records_survive_chunk_boundaries(monkeypatch) -> None:
+    monkeypatch.setattr(git_state, "CHUNK_SIZE", 3)
+    stream = io.BytesIO("? a b\0? new\nline\0? café".encode("utf-8"))
+    assert list(git_state.iter_nul_records(stream)) == ["? a b", "? new\nline", "? café"]
+
+
+def test_parse_porcelain_v2_records() -> None:
+    head = "100644 100644 100644 " + "a" * 40 + " " + "b" * 40
+    records = iter(
+        [
+            "# branch.oid " + "c" * 40,
+            f"1 .M N... {head} src/app file.ts",
+            f"2 R. N... {head} R100 src/new name.ts",
+            "src/old name.ts",
+            f"u UU N... 100644 100644 100644 100644 {'d' * 40} {'e' * 40} {'f' * 40} merge.ts",
+            "? untracked\nname.ts",
+            "! ignored.log",
+        ]
+    )
+    assert list(git_state.parse_porcelain_v2(records)) == [
+        {"path": "src/app file.ts", "status": "M"},
+        {"path": "src/new name.ts", "status": "R", "orig_path": "src/old name.ts"},
+        {"path": "merge.ts", "status": "UU"},
+        {"path": "untracked\nname.ts", "status": "??"},
+        {"path": "ignored.log", "status": "!!"},
+    ]
+
+
+def test_changed_files_reports_renames_and_odd_paths(tmp_path) -> None:
+    git("init", "-q", str(tmp_path), cwd=tmp_path)
+    (tmp_path / "old name.ts").write_text("export const value = 1;\n" * 20)
+    (tmp_path / "kept.ts").write_text("a\n")
+    git("add", "-A", cwd=tmp_path)
+    git("commit", "-q", "-m", "init", cwd=tmp_path)
+
+    git("mv", "old name.ts", "new name.ts", cwd=tmp_path)
+    (tmp_path / "kept.ts").write_text("b\n")
+    (tmp_path / "line\nbreak.ts").write_text("c\n")
+
+    files = sorted(git_state.changed_files(str(tmp_path)), key=lambda f: f["path"])
+    assert files == [
+        {"path": "kept.ts", "status": "M"},
+        {"path": "line\nbreak.ts", "status": "??"},
+        {"path": "new name.ts", "status": "R", "orig_path": "old name.ts"},
+    ]
+
+
+def test_changed_files_outside_a_repository_is_empty(tmp_path) -> None:
+    assert git_state.changed_files(str(tmp_path)) == []
@@ -0,0 +1,85 @@
+import os
+import sys
+from types import SimpleNamespace
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import instrument  # noqa: E402
+
+
+def fake_rusage(monkeypatch, *children_maxrss: int) -> None:
+    samples = iter(children_maxrss)
+
+    def getrusage(who: int) -> SimpleNamespace:
+        maxrss = next(samples) if who == instrument.resource.RUSAGE_CHILDREN else 0
+        return SimpleNamespace(ru_utime=0.0, ru_stime=0.0, ru_maxrss=maxrss)
+
+    monkeypatch.setattr(instrument.resource, "getrusage", getrusage)
+
+
+def test_span_reports_child_rss_only_when_it_grew(monkeypatch) -> None:
+    events = []
+    monkeypatch.setattr(instrument, "emit", events.append)
+
+    fake_rusage(monkeypatch, 50_000, 50_000)
+    with instrument.span("setup", "t1"):
+        pass
+    fake_rusage(monkeypatch, 50_000, 80_000)
+    with instrument.span("preflight", "t1", 2):
+        pass
+
+    assert events[0]["child_maxrss_kb"] is None
+    assert (events[1]["child_maxrss_kb"], events[1]["pass"]) == (80_000, 2)
+
+
+def test_span_marks_exceptions_as_errors(tmp_path, monkeypatch) -> None:
+    path = str(tmp_path / "events.jsonl")
+    monkeypatch.setattr(instrument, "EVENTS_PATH", path)
+    try:
+        with instrument.span("push", "t1") as s:
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    agg = instrument.Aggregate()
+    agg.refresh(path)
+    assert s.status == "error"
+    assert list(agg.series) == [("push", "error")]
+
+
+def test_aggregate_reads_incrementally_and_skips_partial_lines(tmp_path) -> None:
+    path = str(tmp_path / "events.jsonl")
+    instrument.emit({"phase": "diff", "status": "ok", "duration": 0.2, "child_maxrss_kb": 1000}, path)
+    instrument.emit({"phase": "diff", "status": "ok", "duration": 3.0, "child_maxrss_kb": None}, path)
+    with open(path, "a") as f:
+        f.write('{"phase": "diff", "status": "ok", "dur')
+
+    agg = instrument.Aggregate(keep_samples=True)
+    agg.refresh(path)
+    series = agg.series[("diff", "ok")]
+    assert (series["count"], series["child_maxrss_kb"]) == (2, 1000)
+    assert series["buckets"][instrument.BUCKETS.index(0.5)] == 1
+    assert series["buckets"][instrument.BUCKETS.index(5)] == 2
+
+    with open(path, "a") as f:
+        f.write('ation": 1.0}\n')
+    agg.refresh(path)
+    assert series["count"] == 3
+    row = instrument.report(agg)[0]
+    assert (row["p50"], row["max"]) == (1.0, 3.0)
+
+
+def test_render_prometheus() -> None:
+    agg = instrument.Aggregate()
+    agg.add({"phase": 'in"spector', "status": "ok", "duration": 2.0, "child_utime": 1.5, "child_maxrss_kb": 2})
+
+    text = instrument.render_prometheus(agg)
+    labels = 'phase="in\\"spector",status="ok"'
+    assert f'foreman_phase_duration_seconds_bucket{{{labels},le="1"}} 0' in text
+    assert f'foreman_phase_duration_seconds_bucket{{{labels},le="2.5"}} 1' in text
+    assert f'foreman_phase_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"foreman_phase_duration_seconds_sum{{{labels}}} 2.0000" in text
+    assert f"foreman_phase_child_cpu_seconds_total{{{labels}}} 1.5" in text
+    assert f"foreman_phase_child_max_rss_bytes{{{labels}}} 2048" in text
+    assert text.endswith("\n")
@@ -0,0 +1,145 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import instrument  # noqa: E402
+import preflight  # noqa: E402
+
+ROOT = "/work/components"
+# Stand-in for pnpm: lint fails while components/src/bad.ts exists; every call is logged.
+FAKE_PNPM = """#!/bin/sh
+echo "$1" >> "$PNPM_LOG"
+if [ "$1" = "lint" ] && [ -f src/bad.ts ]; then
+  echo "$PWD/src/bad.ts"
+  echo "  3:7  error  'x' is assigned a value but never used  no-unused-vars"
+  exit 1
+fi
+exit 0
+"""
+
+
+def test_parse_lint_eslint_and_prettier() -> None:
+    output = "\n".join(
+        [
+            "[warn] src/lib/Button.svelte",
+            "[warn] Code style issues found in the above file. Run Prettier to fix.",
+            f"{ROOT}/src/lib/Tile.svelte",
+            "  12:5  error  Unexpected any  @typescript-eslint/no-explicit-any",
+            "  14:1  warning  Unused directive",
+        ]
+    )
+    assert preflight.parse_lint(output, ROOT, None) == [
+        {
+            "path": "components/src/lib/Button.svelte",
+            "code": "lint.prettier",
+            "message": "file is not formatted; run `pnpm format` in components/",
+        },
+        {
+            "path": "components/src/lib/Tile.svelte:12:5",
+            "code": "lint.eslint.@typescript-eslint/no-explicit-any",
+            "message": "Unexpected any",
+        },
+    ]
+
+
+def test_parse_check_machine_output() -> None:
+    output = (
+        "1700000000000 START \"/work/components\"\n"
+        '1700000000001 ERROR "src/lib/Tile.svelte" 4:10 "Type \\"string\\" is not assignable"\n'
+        "1700000000002 COMPLETED 10 FILES 1 ERRORS 0 WARNINGS\n"
+    )
+    assert preflight.parse_check(output, ROOT, None) == [
+        {
+            "path": "components/src/lib/Tile.svelte:4:10",
+            "code": "check.svelte_check",
+            "message": 'Type "string" is not assignable',
+        }
+    ]
+
+
+def test_parse_test_report(tmp_path) -> None:
+    report = tmp_path / "report.json"
+    report.write_text(
+        json.dumps(
+            {
+                "testResults": [
+                    {
+                        "name": f"{ROOT}/src/a.test.ts",
+                        "status": "failed",
+                        "assertionResults": [
+                            {"status": "passed", "fullName": "ok"},
+                            {"status": "failed", "fullName": "adds", "failureMessages": ["expected 2\n  at a.ts"]},
+                        ],
+                    },
+                    {"name": f"{ROOT}/src/b.test.ts", "status": "failed", "message": "SyntaxError"},
+                ]
+            }
+        )
+    )
+    assert preflight.parse_test("", ROOT, str(report)) == [
+        {"path": "components/src/a.test.ts", "code": "test.failed", "message": "adds: expected 2"},
+        {"path": "components/src/b.test.ts", "code": "test.suite_failed", "message": "SyntaxError"},
+    ]
+
+
+@pytest.fixture
+def worktree(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "pnpm").write_text(FAKE_PNPM)
+    (bin_dir / "pnpm").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("PNPM_LOG", str(tmp_path / "pnpm.log"))
+    monkeypatch.setattr(preflight, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(instrument, "EVENTS_PATH", "")
+
+    repo = tmp_path / "wt"
+    (repo / "components" / "node_modules").mkdir(parents=True)
+    (repo / "components" / "src").mkdir()
+    (repo / ".gitignore").write_text("node_modules\n")
+    (repo / "components" / "src" / "a.ts").write_text("export {};\n")
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    return repo
+
+
+def pnpm_calls(tmp_path) -> list:
+    log = tmp_path / "pnpm.log"
+    return sorted(log.read_text().split()) if log.exists() else []
+
+
+def test_results_are_cached_on_the_tree_hash(worktree, tmp_path) -> None:
+    checks = list(preflight.CHECKS)
+    first = preflight.preflight(str(worktree), checks)
+    assert (first["status"], first["cached"]) == ("passed", False)
+    assert pnpm_calls(tmp_path) == ["check", "lint", "test:unit"]
+
+    # Handoff files are excluded from the tree hash: still a cache hit.
+    (worktree / "builder_result.json").write_text("{}")
+    second = preflight.preflight(str(worktree), checks)
+    assert (second["cached"], second["tree"]) == (True, first["tree"])
+    assert len(pnpm_calls(tmp_path)) == 3
+
+    (worktree / "components" / "src" / "bad.ts").write_text("const x = 1;\n")
+    third = preflight.preflight(str(worktree), checks)
+    assert (third["status"], third["cached"]) == ("failed", False)
+    assert third["errors"] == [
+        {
+            "path": "components/src/bad.ts:3:7",
+            "code": "lint.eslint.no-unused-vars",
+            "message": "'x' is assigned a value but never used",
+        }
+    ]
+    assert third["change_requests"].startswith("PRE-FLIGHT FAILURES:\n1. [lint.eslint.no-unused-vars]")
+
+
+def test_missing_dependencies_are_not_cached(worktree, tmp_path) -> None:
+    (worktree / "components" / "node_modules").rmdir()
+    result = preflight.preflight(str(worktree), ["lint"])
+    assert (result["status"], result["errors"][0]["code"]) == ("error", "missing")
+    assert not os.path.isdir(tmp_path / "cache")
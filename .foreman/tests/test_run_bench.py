@@ -0,0 +1,38 @@
+import os
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "bench"))
+
+import run_bench  # noqa: E402
+
+
+def result(wall: float, rss: int = 20000, procs: int = 1) -> dict:
+    return {"wall": wall, "max_rss_kb": rss, "subprocesses": procs}
+
+
+def baseline() -> dict:
+    return {"results": {"reference": result(0.2), "diff": result(1.0)}}
+
+
+def test_slower_host_scales_expected_wall_time() -> None:
+    # Twice as slow on the reference: 2.2s is within 25% of the expected 2.0s.
+    results = {"reference": result(0.4), "diff": result(2.2)}
+    assert run_bench.compare(results, baseline(), 0.25, same_host=True) == []
+
+    results["diff"] = result(2.6)
+    [regression] = run_bench.compare(results, baseline(), 0.25, same_host=True)
+    assert (regression["metric"], regression["expected"]) == ("wall", 2.0)
+
+
+def test_faster_host_is_held_to_the_raw_baseline() -> None:
+    results = {"reference": result(0.1), "diff": result(1.2)}
+    assert run_bench.compare(results, baseline(), 0.25, same_host=True) == []
+
+
+def test_rss_only_compared_on_the_same_host() -> None:
+    results = {"reference": result(0.2), "diff": result(1.0, rss=90000, procs=2)}
+    other = run_bench.compare(results, baseline(), 0.25, same_host=False)
+    same = run_bench.compare(results, baseline(), 0.25, same_host=True)
+    assert [r["metric"] for r in other] == ["subprocesses"]
+    assert [r["metric"] for r in same] == ["max_rss_kb", "subprocesses"]
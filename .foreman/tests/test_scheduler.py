@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import scheduler  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def quiet_host(monkeypatch):
+    monkeypatch.setattr(scheduler, "RECHECK_INTERVAL", 0.01)
+    monkeypatch.setattr(scheduler, "load_per_cpu", lambda: 0.1)
+    monkeypatch.setattr(scheduler, "mem_available_mb", lambda: 64 * 1024)
+
+
+def start(sched: scheduler.Scheduler, started: list, pool: str, label: str, **kwargs) -> threading.Thread:
+    def run() -> None:
+        started.append(sched.acquire(pool, label=label, **kwargs))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_pool_slots_and_priority_order() -> None:
+    sched = scheduler.Scheduler({"builder": 1, "inspector": 1}, workers=4)
+    holder = sched.acquire("builder", label="holder")
+    started: list = []
+    start(sched, started, "builder", "low", priority=0)
+    wait_for(lambda: len(sched.waiting) == 1)
+    start(sched, started, "builder", "later-pass", priority=0, rank=2)
+    start(sched, started, "builder", "high", priority=5)
+    start(sched, started, "inspector", "other-pool")
+    wait_for(lambda: len(sched.waiting) == 3 and len(started) == 1)
+
+    # A free inspector slot is not blocked by the queued builders.
+    assert [t.label for t in started] == ["other-pool"]
+
+    for expected in ("high", "later-pass", "low"):
+        sched.release(holder)
+        wait_for(lambda: len(started) == 2)
+        holder = started.pop()
+        assert holder.label == expected
+    assert sched.stats()["pools"]["builder"]["completed"] == 3
+
+
+def test_worker_limit_spans_pools() -> None:
+    sched = scheduler.Scheduler({"builder": 2, "inspector": 2}, workers=2)
+    first = sched.acquire("builder")
+    sched.acquire("inspector")
+    started: list = []
+    start(sched, started, "inspector", "third")
+    wait_for(lambda: len(sched.waiting) == 1)
+    time.sleep(0.05)
+    assert started == []
+
+    sched.release(first)
+    wait_for(lambda: len(started) == 1)
+
+
+def test_load_holds_runs_but_never_an_idle_runner(monkeypatch) -> None:
+    monkeypatch.setattr(scheduler, "load_per_cpu", lambda: 4.0)
+    sched = scheduler.Scheduler({"builder": 3}, workers=3)
+    first = sched.acquire("builder")
+    started: list = []
+    start(sched, started, "builder", "second")
+    wait_for(lambda: sched.resource_holds == 1)
+    assert started == []
+
+    monkeypatch.setattr(scheduler, "load_per_cpu", lambda: 0.5)
+    wait_for(lambda: len(started) == 1)
+    sched.release(first)
+    sched.release(started[0])
+    assert sched.stats()["system"]["resource_holds"] == 1
+
+
+def test_memory_of_ramping_runs_is_reserved(monkeypatch) -> None:
+    monkeypatch.setattr(scheduler, "mem_available_mb", lambda: 2000)
+    sched = scheduler.Scheduler({"builder": 3}, workers=3, memory_mb={"builder": 1500})
+    first = sched.acquire("builder")
+
+    # 2000 MB free, but the run that just started will still claim 1500 MB.
+    assert not sched.resources_ok("builder")
+    first.started -= scheduler.RAMP_SECONDS
+    assert sched.resources_ok("builder")
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import scope  # noqa: E402
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "foreman",
+    "GIT_AUTHOR_EMAIL": "foreman@example.com",
+    "GIT_COMMITTER_NAME": "foreman",
+    "GIT_COMMITTER_EMAIL": "foreman@example.com",
+}
+FILES = {
+    ".opencode/agent/builder.md": "builder\n",
+    "components/package.json": "{}\n",
+    "components/e2e/demo.test.ts": "test\n",
+    "components/static/favicon.png": "png\n",
+    "components/src/app.html": "<html></html>\n",
+    "components/src/routes/+page.svelte": "<p></p>\n",
+    "components/src/lib/index.ts": "export * from './buttons';\nexport * from \"./layout\";\n",
+    "components/src/lib/buttons/index.ts": "export {};\n",
+    "components/src/lib/layout/index.ts": "export {};\n",
+    "components/src/lib/drafts/index.ts": "export {};\n",
+    "components/src/lib/styles/lcars.css": "body {}\n",
+    "docs/TODO.md": "- [ ] t1\n",
+}
+
+
+def git(*args: str, cwd) -> str:
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, env={**os.environ, **GIT_ENV}, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def make_repo(tmp_path):
+    repo = tmp_path / "repo"
+    git("init", "-q", "-b", "main", str(repo), cwd=tmp_path)
+    for path, content in FILES.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(content)
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", "init", cwd=repo)
+    return repo
+
+
+def test_base_cones_are_the_shared_roots_and_the_exported_packages(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+
+    assert scope.cone_dirs(str(repo), ["components/src/routes/+page.svelte"]) == [
+        ".opencode",
+        "components/src/lib/buttons",
+        "components/src/lib/layout",
+        "components/src/lib/styles",
+        "components/src/routes",
+    ]
+    # A package the entry does not export only comes with a scope that names it.
+    assert "components/src/lib/drafts" in scope.cone_dirs(str(repo), ["components/src/lib/drafts"])
+
+
+def test_base_without_lib_cones_skips_the_exports(tmp_path, monkeypatch) -> None:
+    repo = make_repo(tmp_path)
+    monkeypatch.setattr(scope, "BASE_CONES", [".opencode"])
+
+    assert scope.cone_dirs(str(repo), ["docs"]) == [".opencode", "docs"]
+
+
+def test_scoped_worktree_leaves_unneeded_component_dirs_out(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    worktree = tmp_path / "wt" / "t1"
+
+    state = scope.create(str(repo), str(worktree), "feature/t1", ["components/src/lib/buttons"])
+
+    assert "components/src/routes" not in state["cones"]
+    assert (worktree / "components" / "package.json").exists()
+    assert (worktree / "components" / "src" / "lib" / "index.ts").exists()
+    assert (worktree / "components" / "src" / "lib" / "layout" / "index.ts").exists()
+    for path in (
+        "components/e2e",
+        "components/static",
+        "components/src/routes",
+        "components/src/lib/drafts",
+        "docs",
+    ):
+        assert not (worktree / path).exists(), path
@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import session_log_stats  # noqa: E402
+
+
+def event(second: int, tool: str = "read", path: str = "a.ts") -> str:
+    return json.dumps(
+        {
+            "type": "tool.execute.before",
+            "ts": f"2026-01-01T00:00:{second:02d}Z",
+            "tool": tool,
+            "sessionId": "s1",
+            "argsPreview": {"filePath": path},
+        }
+    )
+
+
+def new_index(log_dir) -> dict:
+    return {"version": session_log_stats.INDEX_VERSION, "log_dir": str(log_dir), "files": {}}
+
+
+def test_incremental_offsets_append_rerun_and_truncate(tmp_path) -> None:
+    log = tmp_path / "s1.jsonl"
+    log.write_text(event(0) + "\n" + event(1) + "\n" + event(2)[:20])
+    index = new_index(tmp_path)
+
+    # The unterminated third line is left for the next run.
+    first = session_log_stats.update(str(tmp_path), index)
+    assert first == len(event(0)) + len(event(1)) + 2
+    assert index["files"]["s1.jsonl"]["session"]["calls"] == 2
+
+    # Finishing the line and appending reads only the new bytes.
+    log.write_text(event(0) + "\n" + event(1) + "\n" + event(2) + "\n" + event(3, "grep") + "\n")
+    second = session_log_stats.update(str(tmp_path), index)
+    assert second == len(event(2)) + len(event(3, "grep")) + 2
+    assert session_log_stats.update(str(tmp_path), index) == 0
+    report = session_log_stats.report(index, None, 10)
+    assert (report["totals"]["calls"], report["totals"]["wasted_calls"]) == (4, 2)
+
+    # A truncated file starts over.
+    log.write_text(event(5) + "\n")
+    assert session_log_stats.update(str(tmp_path), index) == len(event(5)) + 1
+    assert index["files"]["s1.jsonl"]["session"]["calls"] == 1
+
+
+def test_oversized_line_is_skipped_not_buffered(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(session_log_stats, "MAX_LINE_BYTES", 64)
+    monkeypatch.setattr(session_log_stats, "CHUNK_SIZE", 16)
+    log = tmp_path / "s1.jsonl"
+    long_line = "x" * 500
+    log.write_text(long_line + "\n" + "{}\n")
+    index = new_index(tmp_path)
+
+    assert session_log_stats.update(str(tmp_path), index) == len(long_line) + 4
+    assert index["files"]["s1.jsonl"]["session"]["bad_lines"] == 1
+
+
+def test_read_signatures_are_bounded(monkeypatch) -> None:
+    monkeypatch.setattr(session_log_stats, "MAX_READ_SIGNATURES", 3)
+    session = session_log_stats.new_session()
+    for second, path in enumerate(["a", "a", "b", "c", "d", "e"]):
+        session_log_stats.apply_event(session, json.loads(event(second, path=path)))
+
+    assert len(session["reads"]) == 3
+    report = session_log_stats.session_report("s1.jsonl", session, 10)
+    # "a" was repeated once before it was evicted.
+    assert report["wasted_calls"] == 1
@@ -0,0 +1,37 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "bench"))
+
+from run_bench import STARTUP_BUDGET, STARTUP_COMMANDS  # noqa: E402
+
+FOREMAN = os.path.join(FOREMAN_DIR, "tools", "foreman.py")
+RUNS = 5
+
+
+@pytest.mark.parametrize("command", sorted(STARTUP_COMMANDS))
+def test_startup_within_budget(command: str, tmp_path) -> None:
+    env = {
+        **os.environ,
+        "FOREMAN_REPO": str(tmp_path),
+        "FOREMAN_STATE_DB": str(tmp_path / "foreman.db"),
+        "FOREMAN_EVENTS_FILE": "",
+    }
+    argv = [sys.executable, FOREMAN, command, *STARTUP_COMMANDS[command]]
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        proc = subprocess.run(argv, cwd=tmp_path, env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        assert proc.returncode == 0, proc.stderr
+    # Same rule as the `startup.*` benches: the median must fit the budget.
+    assert statistics.median(times) <= STARTUP_BUDGET, (
+        f"foreman.py {command} starts in {statistics.median(times):.3f}s "
+        f"(budget {STARTUP_BUDGET}s); keep heavy imports out of module scope"
+    )
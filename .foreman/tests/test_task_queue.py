@@ -0,0 +1,259 @@
+import collections
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import foreman_state  # noqa: E402
+import task_queue  # noqa: E402
+
+FOREMAN = os.path.join(FOREMAN_DIR, "tools", "foreman.py")
+
+
+@pytest.fixture
+def slow_webhook(tmp_path):
+    """Stands in for n8n's run-foreman webhook (`responseMode: lastNode`): the
+    task finishes in the state store after a moment, but the response only
+    comes once the whole "workflow" is over, long after the worker stops waiting."""
+    state_db = str(tmp_path / "foreman.db")
+    posts = collections.Counter()
+
+    def finish(task_id: str) -> None:
+        time.sleep(0.5)
+        conn = foreman_state.connect(state_db)
+        try:
+            foreman_state.finish_task(conn, task_id, "done")
+        finally:
+            conn.close()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            posts[body["task_id"]] += 1
+            threading.Thread(target=finish, args=(body["task_id"],), daemon=True).start()
+            time.sleep(3)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", state_db, posts
+    server.shutdown()
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+
+def test_slow_webhook_starts_each_task_once(slow_webhook, tmp_path) -> None:
+    url, state_db, posts = slow_webhook
+    queue_db = str(tmp_path / "queue.db")
+    conn = task_queue.connect(queue_db)
+    for n in range(3):
+        task_queue.enqueue(conn, {"task_id": f"t{n}", "prompt": "p"})
+
+    subprocess.run(
+        [
+            sys.executable, FOREMAN, "queue", "--queue-db", queue_db, "work",
+            "--webhook", url, "--owner", "host-a", "--slots", "2",
+            "--interval", "0.2", "--lease", "5", "--start-wait", "0.3",
+            "--state-db", state_db, "--drain",
+        ],
+        env={**os.environ, "FOREMAN_EVENTS_FILE": ""},
+        check=True,
+        timeout=60,
+    )
+
+    assert dict(posts) == {"t0": 1, "t1": 1, "t2": 1}
+    entries = task_queue.queue_status(conn)
+    assert [(e["status"], e["attempts"]) for e in entries] == [("done", 1)] * 3
+    conn.close()
+
+
+def test_refused_start_refunds_the_attempt(slow_webhook, tmp_path) -> None:
+    url, _, _ = slow_webhook
+    conn = task_queue.connect(str(tmp_path / "queue.db"))
+    task_queue.enqueue(conn, {"task_id": "t1", "prompt": "p"})
+
+    started = time.monotonic()
+    error, run = task_queue.start_run(url, {"task_id": "t0"}, 2.0, 0.3)
+    assert error is None and not run.ended.is_set()
+    assert time.monotonic() - started < 2
+    # The request stays open until the "workflow" ends.
+    assert run.ended.wait(10) and run.error is None
+
+    task = task_queue.claim(conn, "host-a")
+    error, _ = task_queue.start_run(closed_port_url(), task["body"], 2.0, 0.3)
+    assert error is not None
+    assert task_queue.release(conn, "t1", "host-a", error, refund=True)
+    (entry,) = task_queue.queue_status(conn, "t1")
+    assert (entry["status"], entry["attempts"]) == ("queued", 0)
+    conn.close()
+
+
+def test_expired_lease_is_requeued_and_the_old_owner_loses_it(tmp_path) -> None:
+    conn = task_queue.connect(str(tmp_path / "queue.db"))
+    task_queue.enqueue(conn, {"task_id": "t1", "prompt": "p"})
+    assert task_queue.claim(conn, "host-a", lease_seconds=0.05)["task_id"] == "t1"
+    assert task_queue.claim(conn, "host-b") is None
+
+    time.sleep(0.1)
+    task = task_queue.claim(conn, "host-b")
+    assert (task["task_id"], task["owner"], task["attempts"]) == ("t1", "host-b", 2)
+    assert "lease expired on host-a" in task["last_error"]
+
+    # host-a's heartbeat and completion no longer count.
+    assert not task_queue.heartbeat(conn, "t1", "host-a")
+    assert not task_queue.complete(conn, "t1", "host-a", "done")
+    assert task_queue.heartbeat(conn, "t1", "host-b")
+    assert task_queue.complete(conn, "t1", "host-b", "done")
+    conn.close()
+
+
+def test_exhausted_attempts_fail_the_task(tmp_path) -> None:
+    conn = task_queue.connect(str(tmp_path / "queue.db"))
+    task_queue.enqueue(conn, {"task_id": "t1", "prompt": "p"}, max_attempts=2)
+    for _ in range(2):
+        assert task_queue.claim(conn, "host-a", lease_seconds=0.05) is not None
+        time.sleep(0.1)
+
+    assert task_queue.requeue_expired(conn) == ["t1"]
+    (entry,) = task_queue.queue_status(conn, "t1")
+    assert (entry["status"], entry["attempts"]) == ("failed", 2)
+    assert task_queue.claim(conn, "host-a") is None
+    conn.close()
+
+
+@pytest.fixture
+def failing_webhook():
+    """A workflow that errors out (e.g. create-pr could not push) without finishing the task."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(1)
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b"Workflow execution failed")
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def test_ended_execution_fails_an_unfinished_task(failing_webhook, tmp_path) -> None:
+    queue_db = str(tmp_path / "queue.db")
+    conn = task_queue.connect(queue_db)
+    task_queue.enqueue(conn, {"task_id": "t1", "prompt": "p"})
+
+    subprocess.run(
+        [
+            sys.executable, FOREMAN, "queue", "--queue-db", queue_db, "work",
+            "--webhook", failing_webhook, "--owner", "host-a", "--interval", "0.2",
+            "--lease", "5", "--start-wait", "0.3", "--state-db", str(tmp_path / "foreman.db"),
+            "--drain",
+        ],
+        env={**os.environ, "FOREMAN_EVENTS_FILE": ""},
+        check=True,
+        timeout=60,
+    )
+
+    (entry,) = task_queue.queue_status(conn, "t1")
+    assert (entry["status"], entry["attempts"]) == ("failed", 1)
+    assert entry["last_error"].startswith("workflow ended without finishing the task: HTTP 500")
+    conn.close()
+
+
+def test_stale_local_rows_do_not_finish_a_new_run(tmp_path) -> None:
+    """A re-run after an earlier failure: the queue host's clock is an hour
+    behind, so the old `failed` row looks newer than the claim."""
+    state_db = str(tmp_path / "foreman.db")
+    state = foreman_state.connect(state_db)
+    foreman_state.finish_task(state, "t1", "failed", reason="max retries")
+    foreman_state.finish_task(state, "t2", "done")
+    queue = task_queue.LocalQueue(str(tmp_path / "queue.db"))
+    args = types.SimpleNamespace(owner="host-a", lease=60.0, state_db=state_db, max_run_seconds=600.0)
+    active, runs = {}, {}
+    for task_id in ("t1", "t2"):
+        task_queue.enqueue(queue.conn, {"task_id": task_id, "prompt": "p"})
+        task = queue.call("claim", owner="host-a", lease_seconds=60.0)
+        task["claimed_at"] -= 3600
+        run = types.SimpleNamespace(started_at=time.time(), ended=threading.Event(), error=None)
+        task["local_started_at"] = run.started_at
+        active[task_id], runs[task_id] = task, run
+
+    # Still running: neither old row finishes its task.
+    task_queue.poll(queue, args, active, runs)
+    assert set(active) == {"t1", "t2"}
+
+    # The t1 run reopens the task and finishes it; the t2 run stops at Task
+    # Already Finished without writing anything.
+    assert foreman_state.reopen_task(state, "t1")
+    foreman_state.finish_task(state, "t1", "done")
+    runs["t2"].ended.set()
+    task_queue.poll(queue, args, active, runs)
+    assert not active
+    assert [(e["task_id"], e["status"]) for e in task_queue.queue_status(queue.conn)] == [
+        ("t1", "done"),
+        ("t2", "done"),
+    ]
+    queue.close()
+    state.close()
+
+
+def test_remote_queue_through_serve(tmp_path) -> None:
+    port = int(closed_port_url().rsplit(":", 1)[1].rstrip("/"))
+    server = subprocess.Popen(
+        [
+            sys.executable, FOREMAN, "queue", "--queue-db", str(tmp_path / "queue.db"),
+            "serve", "--host", "127.0.0.1", "--port", str(port),
+        ],
+        env={**os.environ, "FOREMAN_QUEUE_TOKEN": "secret"},
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/"
+        queue = task_queue.RemoteQueue(url, "secret")
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                queue.call("stats")
+                break
+            except OSError:
+                assert time.monotonic() < deadline
+                time.sleep(0.1)
+
+        assert queue.call("enqueue", body={"task_id": "t1", "prompt": "p"}) == "queued"
+        task = queue.call("claim", owner="host-a", lease_seconds=60)
+        assert (task["task_id"], task["body"]) == ("t1", {"task_id": "t1", "prompt": "p"})
+        assert queue.call("complete", task_id="t1", owner="host-a", status="done") is True
+        assert queue.call("stats")["done"] == 1
+
+        with pytest.raises(RuntimeError, match="unauthorized"):
+            task_queue.RemoteQueue(url, "wrong").call("stats")
+        with pytest.raises(RuntimeError, match="unknown op"):
+            queue.call("drop_everything")
+    finally:
+        server.terminate()
+        server.wait(10)
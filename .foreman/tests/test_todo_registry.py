@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOREMAN_DIR, "tools"))
+
+import todo_registry  # noqa: E402
+
+TODO_REGISTRY = os.path.join(FOREMAN_DIR, "tools", "todo_registry.py")
+TASKS = 8
+
+
+def todo_markdown(count: int) -> str:
+    overview = "".join(f"  - [ ] [ds9-{i} · 1.{i} Task {i}](#1{i}-task-{i})\n" for i in range(1, count + 1))
+    blocks = "".join(
+        f"### 1.{i} [ds9-{i}] Task {i}\n\n"
+        f"- **Title**: Build `widget` {i}\n"
+        f"- **Scope**: `components/src/w{i}`, `docs`\n"
+        f"- **Description**:\n"
+        f"  - Create the `widget`.\n"
+        f"  - Add   tests.\n\n"
+        "---\n\n"
+        for i in range(1, count + 1)
+    )
+    return f"# TODO\n\n## Overview\n\n{overview}\n## Tasks\n\n{blocks}"
+
+
+@pytest.fixture
+def todo(tmp_path, monkeypatch):
+    monkeypatch.setattr(todo_registry, "CACHE_DIR", str(tmp_path / "index"))
+    path = tmp_path / "TODO.md"
+    path.write_text(todo_markdown(TASKS))
+    return path
+
+
+def test_parse_task_blocks(todo) -> None:
+    task = todo_registry.get_task("ds9-2", str(todo))
+    assert task["title"] == "Build widget 2"
+    assert task["scope"] == ["components/src/w2", "docs"]
+    assert task["description"] == "Create the widget. Add tests."
+    assert task["done"] is False
+    assert todo_registry.task_prompt(task) == "Build widget 2. Create the widget. Add tests."
+
+
+def test_mark_done_flips_only_the_checkbox(todo) -> None:
+    before = todo.read_bytes()
+    todo_registry.load_index(str(todo))
+
+    result = todo_registry.mark_done(["ds9-3", "ds9-3", "nope"], str(todo))
+    assert result == {"marked": ["ds9-3"], "already_done": [], "missing": ["nope"]}
+    after = todo.read_bytes()
+    assert after == before.replace(b"- [ ] [ds9-3 ", b"- [x] [ds9-3 ")
+
+    assert todo_registry.mark_done(["ds9-3"], str(todo))["already_done"] == ["ds9-3"]
+    assert todo_registry.get_task("ds9-3", str(todo))["done"] is True
+
+
+def test_mark_done_reparses_a_stale_index(todo) -> None:
+    todo_registry.load_index(str(todo))
+    # Same size and mtime as the cached index, but the checkbox moved.
+    stat = os.stat(todo)
+    content = todo.read_text().replace("# TODO\n\n", "# TO\n\n\n\n")
+    todo.write_text(content)
+    os.utime(todo, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert todo_registry.mark_done(["ds9-1"], str(todo))["marked"] == ["ds9-1"]
+    assert "- [x] [ds9-1 " in todo.read_text()
+
+
+def test_concurrent_mark_done_keeps_every_update(todo, tmp_path) -> None:
+    env = {**os.environ, "FOREMAN_TODO_INDEX_DIR": str(tmp_path / "index")}
+    procs = [
+        subprocess.Popen(
+            [sys.executable, TODO_REGISTRY, "--todo", str(todo), "done", f"ds9-{i}"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        for i in range(1, TASKS + 1)
+    ]
+    assert [proc.wait(timeout=30) for proc in procs] == [0] * TASKS
+
+    content = todo.read_text()
+    assert content.count("- [x] [ds9-") == TASKS
+    assert content == todo_markdown(TASKS).replace("- [ ] [ds9-", "- [x] [ds9-")
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOREMAN = os.path.join(FOREMAN_DIR, "tools", "foreman.py")
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "foreman",
+    "GIT_AUTHOR_EMAIL": "foreman@example.com",
+    "GIT_COMMITTER_NAME": "foreman",
+    "GIT_COMMITTER_EMAIL": "foreman@example.com",
+}
+
+
+def git(*args: str, cwd) -> str:
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, env={**os.environ, **GIT_ENV}, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout.strip()
+
+
+def pool(repo, *args: str) -> subprocess.CompletedProcess:
+    env = {
+        **os.environ,
+        **GIT_ENV,
+        "FOREMAN_REPO": str(repo),
+        "FOREMAN_EVENTS_FILE": "",
+    }
+    env.pop("FOREMAN_POOL_SIZE", None)
+    return subprocess.run(
+        [sys.executable, FOREMAN, "pool", *args], cwd=repo, env=env, capture_output=True, text=True
+    )
+
+
+def make_repo(tmp_path):
+    repo = tmp_path / "repo"
+    git("init", "-q", "-b", "main", str(repo), cwd=tmp_path)
+    (repo / "components").mkdir()
+    (repo / "components" / "pnpm-lock.yaml").write_text("lockfileVersion: '9.0'\n")
+    git("add", "-A", cwd=repo)
+    git("commit", "-q", "-m", "init", cwd=repo)
+    return repo
+
+
+def add_ready_slot(repo, name: str = "slot-1") -> None:
+    """A filled slot without running pnpm: what `fill` leaves behind."""
+    pool_dir = repo / ".oc_worktrees" / ".pool"
+    git("worktree", "add", "-q", "--detach", str(pool_dir / name), "main", cwd=repo)
+    lockfile = git("rev-parse", "main:components/pnpm-lock.yaml", cwd=repo)
+    (pool_dir / f"{name}.json").write_text(json.dumps({"state": "ready", "lockfile": lockfile}))
+
+
+def test_pool_is_off_by_default(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    proc = pool(repo, "fill")
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout) == {"prepared": [], "failed": {}}
+    assert json.loads(pool(repo, "status").stdout) == []
+
+
+def test_acquire_creates_the_branch_at_main(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    add_ready_slot(repo)
+    worktree = repo / ".oc_worktrees" / "t1"
+
+    proc = pool(repo, "acquire", "--worktree", str(worktree), "--branch", "feature/t1")
+    assert proc.returncode == 0, proc.stderr
+    assert git("rev-parse", "HEAD", cwd=worktree) == git("rev-parse", "main", cwd=repo)
+    assert git("branch", "--show-current", cwd=worktree) == "feature/t1"
+
+
+def test_acquire_keeps_the_commits_of_an_existing_branch(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    git("branch", "feature/t1", cwd=repo)
+    scratch = tmp_path / "scratch"
+    git("worktree", "add", "-q", str(scratch), "feature/t1", cwd=repo)
+    (scratch / "work.txt").write_text("done\n")
+    git("add", "-A", cwd=scratch)
+    git("commit", "-q", "-m", "builder work", cwd=scratch)
+    head = git("rev-parse", "HEAD", cwd=scratch)
+
+    # Checked out elsewhere: the pool leaves it alone.
+    add_ready_slot(repo)
+    worktree = repo / ".oc_worktrees" / "t1"
+    proc = pool(repo, "acquire", "--worktree", str(worktree), "--branch", "feature/t1", "--no-refill")
+    assert proc.returncode == 3
+    assert not worktree.exists()
+
+    git("worktree", "remove", str(scratch), cwd=repo)
+    proc = pool(repo, "acquire", "--worktree", str(worktree), "--branch", "feature/t1", "--no-refill")
+    assert proc.returncode == 0, proc.stderr
+    assert git("rev-parse", "HEAD", cwd=worktree) == head
+    assert (worktree / "work.txt").exists()
+
+
+def test_failed_checkout_returns_the_slot(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    # A branch named `feature` blocks every `feature/<task>` ref.
+    git("branch", "feature", cwd=repo)
+    add_ready_slot(repo)
+    worktree = repo / ".oc_worktrees" / "t1"
+
+    proc = pool(repo, "acquire", "--worktree", str(worktree), "--branch", "feature/t1", "--no-refill")
+    assert proc.returncode == 3, proc.stderr
+    assert json.loads(proc.stdout)["ok"] is False
+    assert not worktree.exists()
+    (slot,) = json.loads(pool(repo, "status").stdout)
+    assert (slot["slot"], slot["state"]) == ("slot-1", "broken")
+    assert "feature/t1" in slot["error"]
+    assert (repo / ".oc_worktrees" / ".pool" / "slot-1").is_dir()
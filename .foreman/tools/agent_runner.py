@@ -1,13 +1,554 @@
 import argparse
 import base64
+import collections
+import contextlib
+import json
+import os
+import re
+import resource
+import signal
+import socket
+import socketserver
+import struct
 import subprocess
 import sys
+import threading
 import time
 
-import requests
+from artifacts import store_file
+from instrument import record, span
+from scheduler import DEFAULT_MAX_LOAD, DEFAULT_SLOTS, Scheduler
 
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DIR = os.path.join(FOREMAN_DIR, ".tmp", "logs")
+SPOOL_DIR = os.path.join(FOREMAN_DIR, ".tmp", "spool")
+SOCKET_PATH = os.environ.get(
+    "FOREMAN_RUNNER_SOCKET", os.path.join(FOREMAN_DIR, ".tmp", "agent_runner.sock")
+)
 
-def run_agent():
+# n8n answers these while the Wait node has not registered its resume
+# webhook yet (or while it is restarting); they are worth retrying.
+NOT_READY_STATUSES = {404, 409, 502, 503, 504}
+# Seconds to wait for n8n's answer once the callback is sent.
+POST_READ_TIMEOUT = 30.0
+BACKOFF_INITIAL = 0.25
+BACKOFF_MAX = 5.0
+# Per-agent (wall clock, idle output) limits in seconds; 0 disables a limit.
+# FOREMAN_<AGENT>_TIMEOUT / FOREMAN_<AGENT>_IDLE_TIMEOUT override these and
+# --timeout / --idle-timeout override both.
+AGENT_TIMEOUTS = {"builder": (7200.0, 1200.0), "inspector": (3600.0, 900.0)}
+KILL_GRACE = 15.0
+WATCH_INTERVAL = 1.0
+# Titles end in e.g. `b2-i1` (builder pass 2, inspector pass 1).
+PASS_RE = re.compile(r"\bb(\d+)-i(\d+)\b")
+# Outcome classification. Only lines in OpenCode's own error formats count:
+# `Error: <message>` (UI.error), named provider/SDK errors at column 0 and
+# yargs argument errors. Agent chatter or test output quoting "Error:" mid-line
+# does not fail a run. FOREMAN_RUNNER_PATTERNS may name a JSON file whose
+# "error_lines" / "transient" / "permanent" lists extend these.
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+ERROR_LINE_PATTERNS = [
+    r"^Error:\s*(?P<message>.*)$",
+    r"^(?P<message>(?:AI_\w+|\w*Provider\w*Error|APIError|\w+NotFoundError)\b.*)$",
+    r"^(?P<message>(?:Unknown arguments?|Not enough non-option arguments|Missing required argument|Invalid values?):.*)$",
+]
+# Matched against the message of an error line only, never the whole output.
+TRANSIENT_PATTERNS = [
+    r"rate.?limit",
+    r"too many requests",
+    r"overloaded",
+    r"\b(?:status|code|http)\W{0,3}(?:429|50[0234])\b",
+    r"service unavailable|bad gateway|gateway time-?out",
+    r"\b(?:ECONNREFUSED|ECONNRESET|ETIMEDOUT|EAI_AGAIN|ENOTFOUND|EPIPE)\b",
+    r"socket hang up|fetch failed|unable to connect",
+    r"(?:request|connection|socket|stream) timed? ?out",
+    r"server (?:is )?(?:not ready|starting)",
+]
+PERMANENT_PATTERNS = [
+    r"\b(?:status|code|http)\W{0,3}40[13]\b",
+    r"unauthori[sz]ed|forbidden|authentication (?:failed|error)",
+    r"invalid.?api.?key|missing api key",
+    r"insufficient.?quota|billing|credit balance",
+    r"model\b.*not found|ModelNotFound|agent\b.*not found",
+    r"context.?length|prompt is too long|maximum context",
+    r"Unknown arguments?|Not enough non-option|Missing required argument|Invalid values?",
+]
+# An error line decides the outcome only if the run failed and it is among
+# the last lines the run printed: OpenCode's error envelope is what it prints
+# on the way out, while an `Error:` from a test the Builder ran mid-task is
+# followed by more agent output.
+ENVELOPE_LINES = 20
+# How a run that never got to report an error ended. Wall timeouts and signal
+# deaths (OOM killer, a restarted host) are infrastructure trouble and worth a
+# retry by default; FOREMAN_RUNNER_TIMEOUT_OUTCOME / FOREMAN_RUNNER_SIGNAL_OUTCOME
+# may set them to `agent_failed` or `permanent` instead.
+END_OUTCOMES = {"idle": "transient", "wall": "transient", "signal": "transient"}
+# When several error lines disagree, the most decisive one wins.
+OUTCOME_RANK = {"ok": 0, "agent_failed": 1, "transient": 2, "permanent": 3}
+# The webhook carries only this much of the output; the rest goes to the
+# artifact store (see artifacts.py) so n8n does not keep it per execution.
+TAIL_BYTES = 4096
+
+
+def _requests():
+    # Imported lazily so the thin `submit` client never pays for it.
+    import requests
+
+    return requests
+
+
+def connect_failed(error: Exception) -> bool:
+    """True if the request never reached the listener (refused, DNS, connect timeout)."""
+    requests = _requests()
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def post_webhook(url: str, payload: dict, maybe_sent: bool = False) -> tuple[bool, str, bool]:
+    """POST once; returns (delivered, detail, sent).
+
+    `sent` means the listener may have received the payload even though we got
+    no answer (e.g. a read timeout). Once that happened (`maybe_sent`), a 404 or
+    409 means the Wait node already consumed its resume URL: it got our payload.
+    """
+    requests = _requests()
+    try:
+        resp = requests.post(url, json=payload, timeout=(10, POST_READ_TIMEOUT))
+    except requests.RequestException as e:
+        return False, f"connection error: {e}", not connect_failed(e)
+    if maybe_sent and resp.status_code in (404, 409):
+        return True, f"HTTP {resp.status_code} (already delivered)", True
+    if resp.status_code in NOT_READY_STATUSES or resp.status_code >= 500:
+        return False, f"HTTP {resp.status_code}", False
+    if resp.status_code >= 400:
+        # The listener is up but rejected the payload; retrying will not help.
+        return True, f"HTTP {resp.status_code} (rejected)", True
+    return True, f"HTTP {resp.status_code}", True
+
+
+def deliver_with_backoff(
+    url: str, payload: dict, ready_timeout: float, maybe_sent: bool = False
+) -> tuple[bool, str, bool]:
+    """POST until the listener accepts the payload or ready_timeout elapses.
+
+    Returns (delivered, detail, maybe_sent) so a spooled callback remembers that
+    an earlier attempt may already have resumed the workflow.
+    """
+    deadline = time.monotonic() + ready_timeout
+    delay = BACKOFF_INITIAL
+    while True:
+        delivered, detail, sent = post_webhook(url, payload, maybe_sent)
+        maybe_sent = maybe_sent or sent
+        if delivered:
+            return True, detail, maybe_sent
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, detail, maybe_sent
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, BACKOFF_MAX)
+
+
+def spool_callback(
+    url: str, payload: dict, error: str, spool_dir: str = SPOOL_DIR, maybe_sent: bool = False
+) -> str:
+    os.makedirs(spool_dir, exist_ok=True)
+    entry = {
+        "url": url,
+        "payload": payload,
+        "created": time.time(),
+        "attempts": 1,
+        "last_error": error,
+        "maybe_sent": maybe_sent,
+    }
+    path = os.path.join(spool_dir, f"{time.time_ns()}-{os.getpid()}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+    return path
+
+
+def deliver(url: str, payload: dict, ready_timeout: float) -> bool:
+    delivered, detail, maybe_sent = deliver_with_backoff(url, payload, ready_timeout)
+    if delivered:
+        return True
+    path = spool_callback(url, payload, detail, maybe_sent=maybe_sent)
+    print(f"Failed to call webhook ({detail}); spooled to {path}")
+    return False
+
+
+def flush_spool(spool_dir: str, ready_timeout: float) -> dict:
+    delivered = 0
+    pending = 0
+    if os.path.isdir(spool_dir):
+        for name in sorted(os.listdir(spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(spool_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[Runner] Skipping unreadable spool entry {name}: {e}", file=sys.stderr)
+                pending += 1
+                continue
+
+            ok, detail, maybe_sent = deliver_with_backoff(
+                entry["url"], entry["payload"], ready_timeout, bool(entry.get("maybe_sent"))
+            )
+            if ok:
+                os.remove(path)
+                delivered += 1
+                continue
+
+            entry["attempts"] = int(entry.get("attempts", 0)) + 1
+            entry["last_error"] = detail
+            entry["maybe_sent"] = maybe_sent
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(path + ".tmp", path)
+            pending += 1
+    return {"delivered": delivered, "pending": pending}
+
+
+def flush_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="agent_runner.py flush",
+        description="Re-deliver spooled webhook callbacks (e.g. after an n8n restart).",
+    )
+    parser.add_argument("--spool-dir", default=SPOOL_DIR)
+    parser.add_argument("--ready-timeout", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    result = flush_spool(args.spool_dir, args.ready_timeout)
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+    sys.exit(0 if result["pending"] == 0 else 1)
+
+
+def load_patterns(path: str | None = None) -> dict[str, list[re.Pattern]]:
+    patterns = {
+        "error_lines": list(ERROR_LINE_PATTERNS),
+        "transient": list(TRANSIENT_PATTERNS),
+        "permanent": list(PERMANENT_PATTERNS),
+    }
+    path = path if path is not None else os.environ.get("FOREMAN_RUNNER_PATTERNS", "")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            extra = json.load(f)
+        for key in patterns:
+            patterns[key] += extra.get(key) or []
+    flags = {"error_lines": 0, "transient": re.IGNORECASE, "permanent": re.IGNORECASE}
+    return {key: [re.compile(p, flags[key]) for p in values] for key, values in patterns.items()}
+
+
+class OutputClassifier:
+    """Classify a run line by line as its output streams.
+
+    Error lines are `transient` (worth retrying: network, rate limits, server
+    not ready), `permanent` (auth, quota, bad model/agent/arguments) or
+    `agent_failed` (anything else). `outcome()` folds in how the process ended
+    and only trusts an error line that closed a failed run.
+    """
+
+    def __init__(self, patterns: dict[str, list[re.Pattern]]) -> None:
+        self.patterns = patterns
+        self.lines = 0
+        self.category = "ok"
+        self.reason: str | None = None
+        self.error_line = 0
+
+    def classify(self, line: str) -> tuple[str, str] | None:
+        """(category, text) for an error line, or None for any other line."""
+        text = ANSI_RE.sub("", line).rstrip()
+        for pattern in self.patterns["error_lines"]:
+            match = pattern.match(text)
+            if match:
+                break
+        else:
+            return None
+        message = match.groupdict().get("message") or text
+        for name in ("permanent", "transient"):
+            if any(p.search(message) for p in self.patterns[name]):
+                return name, text[:300]
+        return "agent_failed", text[:300]
+
+    def feed(self, line: str) -> None:
+        self.lines += 1
+        classified = self.classify(line)
+        if classified is None:
+            return
+        category, text = classified
+        if self.lines - self.error_line > ENVELOPE_LINES:
+            # Earlier error lines were followed by more output; start over.
+            self.category = "ok"
+        # Within one envelope the most decisive line wins.
+        if OUTCOME_RANK[category] >= OUTCOME_RANK[self.category]:
+            self.category = category
+            self.reason = text
+        self.error_line = self.lines
+
+    def outcome(self, run: dict) -> tuple[str, str | None]:
+        if run.get("timed_out"):
+            return end_outcome(run["timed_out"], "TIMEOUT"), f"{run['timed_out']} timeout"
+        if run.get("signal"):
+            return end_outcome("signal", "SIGNAL"), f"killed by {run['signal']}"
+        if run.get("exit_code") == 0:
+            return "ok", None
+        if self.category != "ok" and self.lines - self.error_line < ENVELOPE_LINES:
+            return self.category, self.reason
+        return "agent_failed", f"exit code {run.get('exit_code')}"
+
+
+def end_outcome(kind: str, setting: str) -> str:
+    """Outcome of a timeout (`idle`/`wall`) or signal death; see END_OUTCOMES."""
+    if kind == "idle":
+        # No output for the idle limit: almost always a stalled provider stream.
+        return END_OUTCOMES["idle"]
+    value = os.environ.get(f"FOREMAN_RUNNER_{setting}_OUTCOME", END_OUTCOMES[kind])
+    return value if value in OUTCOME_RANK and value != "ok" else END_OUTCOMES[kind]
+
+
+def default_log_path(title: str) -> str:
+    name = re.sub(r"[^a-zA-Z0-9_.-]", "_", title).strip("_") or "run"
+    return os.path.join(LOG_DIR, f"{name}.{int(time.time())}.log")
+
+
+class OutputStream:
+    """Tee child output to a log file while keeping only a bounded tail in memory."""
+
+    def __init__(self, log_path: str, tail_lines: int, classifier: OutputClassifier) -> None:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self.log_path = log_path
+        self.tail: collections.deque[str] = collections.deque(maxlen=tail_lines)
+        self.lines = 0
+        self.bytes = 0
+        self.classifier = classifier
+        self.last_output = time.monotonic()
+        self._log = open(log_path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def feed(self, line: str) -> None:
+        with self._lock:
+            self._log.write(line)
+            self._log.flush()
+            self.tail.append(line)
+            self.lines += 1
+            # Bytes as written to the (UTF-8) log, not characters.
+            self.bytes += len(line.encode("utf-8"))
+            self.last_output = time.monotonic()
+            self.classifier.feed(line)
+
+    def pump(self, pipe) -> None:
+        for line in iter(pipe.readline, ""):
+            self.feed(line)
+        pipe.close()
+
+    def tail_text(self) -> str:
+        with self._lock:
+            return "".join(self.tail)
+
+    def close(self) -> None:
+        with self._lock:
+            self._log.close()
+
+
+def heartbeat_loop(
+    url: str,
+    interval: float,
+    stream: OutputStream,
+    title: str,
+    agent: str,
+    started: float,
+    stop: threading.Event,
+) -> None:
+    while not stop.wait(interval):
+        payload = {
+            "event": "heartbeat",
+            "title": title,
+            "agent": agent,
+            "elapsed": round(time.time() - started, 1),
+            "lines": stream.lines,
+            "bytes": stream.bytes,
+            "log_file": stream.log_path,
+        }
+        try:
+            _requests().post(url, json=payload, timeout=5)
+        except Exception as e:
+            print(f"[Runner] Heartbeat failed: {e}")
+
+
+def agent_setting(args: argparse.Namespace, name: str, default: float) -> float:
+    """Resolve a limit: CLI/job field, then FOREMAN_<AGENT>_<NAME>, then the default."""
+    value = getattr(args, name, None)
+    if value is not None:
+        return float(value)
+    agent = re.sub(r"\W", "_", args.agent).upper()
+    return float(os.environ.get(f"FOREMAN_{agent}_{name.upper()}", default))
+
+
+def set_rlimits(pid: int, max_memory_mb: float, max_cpu_seconds: float) -> None:
+    # prlimit() on the running child instead of a preexec_fn, which is unsafe in
+    # the threaded daemon. Descendants inherit the limits.
+    prlimit = getattr(resource, "prlimit", None)
+    if not (max_memory_mb or max_cpu_seconds):
+        return
+    if prlimit is None:
+        print("[Runner] Resource limits need prlimit() (Linux); not applied")
+        return
+    try:
+        if max_memory_mb:
+            limit = int(max_memory_mb * 1024 * 1024)
+            prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+        if max_cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL at the hard one.
+            cpu = int(max_cpu_seconds)
+            prlimit(pid, resource.RLIMIT_CPU, (cpu, cpu + int(KILL_GRACE)))
+    except OSError as e:
+        print(f"[Runner] Could not apply resource limits: {e}")
+
+
+def kill_group(pgid: int, sig: int) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def stream_process(
+    cmd: list[str],
+    cwd: str | None,
+    stream: OutputStream,
+    timeout: float = 0.0,
+    idle_timeout: float = 0.0,
+    kill_grace: float = KILL_GRACE,
+    max_memory_mb: float = 0.0,
+    max_cpu_seconds: float = 0.0,
+) -> dict:
+    """Run `cmd` in its own process group, enforcing the timeouts.
+
+    Returns exit_code/signal/timed_out plus the wait4() resource usage of the
+    child and the descendants it reaped.
+    """
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        bufsize=1,
+        start_new_session=True,
+    )
+    set_rlimits(proc.pid, max_memory_mb, max_cpu_seconds)
+    readers = [
+        threading.Thread(target=stream.pump, args=(proc.stdout,), daemon=True),
+        threading.Thread(target=stream.pump, args=(proc.stderr,), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    reaped: dict = {}
+    exited = threading.Event()
+
+    def reap() -> None:
+        _, reaped["status"], reaped["usage"] = os.wait4(proc.pid, 0)
+        exited.set()
+
+    threading.Thread(target=reap, daemon=True).start()
+
+    timed_out = None
+    while not exited.wait(WATCH_INTERVAL):
+        now = time.monotonic()
+        if timeout and now - started > timeout:
+            timed_out = "wall"
+            limit = timeout
+        elif idle_timeout and now - stream.last_output > idle_timeout:
+            timed_out = "idle"
+            limit = idle_timeout
+        else:
+            continue
+        stream.feed(f"[Runner] {timed_out} timeout after {limit:g}s; terminating process group\n")
+        kill_group(proc.pid, signal.SIGTERM)
+        if not exited.wait(kill_grace):
+            kill_group(proc.pid, signal.SIGKILL)
+            exited.wait()
+        break
+    duration = time.monotonic() - started
+
+    status, usage = reaped["status"], reaped["usage"]
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # Whatever the agent left running in its group (servers, watchers) goes too;
+    # it would otherwise hold the output pipes open.
+    kill_group(proc.pid, signal.SIGKILL)
+    for reader in readers:
+        reader.join(timeout=5)
+
+    signal_name = None
+    if os.WIFSIGNALED(status):
+        try:
+            signal_name = signal.Signals(os.WTERMSIG(status)).name
+        except ValueError:
+            signal_name = str(os.WTERMSIG(status))
+    return {
+        "exit_code": os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+        "signal": signal_name,
+        "timed_out": timed_out,
+        "duration": round(duration, 3),
+        "max_rss_kb": usage.ru_maxrss,
+        "user_cpu": round(usage.ru_utime, 3),
+        "sys_cpu": round(usage.ru_stime, 3),
+    }
+
+
+def job_labels(args: argparse.Namespace) -> tuple[str | None, int | None]:
+    """Task id and pass number of a job, for span events."""
+    if args.cwd:
+        task_id: str | None = os.path.basename(os.path.normpath(args.cwd))
+    else:
+        words = args.title.split()
+        task_id = words[1] if len(words) > 1 else None
+    match = PASS_RE.search(args.title)
+    pass_no = None
+    if match:
+        pass_no = int(match.group(2) if args.title.startswith("INSPECTOR") else match.group(1))
+    return task_id, pass_no
+
+
+def archive_output(args: argparse.Namespace, stream: OutputStream, task_id: str | None) -> dict | None:
+    """Move the run's log into the artifact store; returns its reference."""
+    match = PASS_RE.search(args.title)
+    label = f"{args.agent}-{match.group(0)}" if match else args.agent
+    try:
+        entry = store_file(stream.log_path, task_id, label, title=args.title, agent=args.agent)
+    except Exception as e:
+        print(f"[Runner] Could not archive {stream.log_path}: {e}")
+        return None
+    if not args.log_file:
+        with contextlib.suppress(OSError):
+            os.remove(stream.log_path)
+    return {key: entry[key] for key in ("ref", "digest", "size", "stored_bytes", "codec")}
+
+
+def pass_rank(title: str) -> int:
+    """Builder + Inspector passes so far; higher means the task is further along."""
+    match = PASS_RE.search(title)
+    return int(match.group(1)) + int(match.group(2)) if match else 0
+
+
+def job_pool(job: argparse.Namespace) -> str:
+    pool = job.pool or (job.agent if job.agent in DEFAULT_SLOTS else "setup")
+    if pool not in DEFAULT_SLOTS:
+        raise ValueError(f"unknown pool: {pool}")
+    return pool
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument("--webhook", required=True)
     parser.add_argument("--agent", required=True)
@@ -17,31 +558,133 @@ def run_agent():
     parser.add_argument("--prompt-file", required=False)
     parser.add_argument("--cwd", required=False)
     parser.add_argument("--base64", action="store_true", help="Decode prompt/cmd from base64")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--log-file",
+        required=False,
+        help="Where to tee the full agent output; kept after the run when given "
+        "(default: .foreman/.tmp/logs/<title>.<ts>.log, removed once archived)",
+    )
+    parser.add_argument(
+        "--tail-lines",
+        type=int,
+        default=40,
+        help=f"Trailing output lines sent in the final webhook payload (at most {TAIL_BYTES} bytes)",
+    )
+    parser.add_argument(
+        "--heartbeat-url",
+        required=False,
+        help="URL that receives periodic progress heartbeats (must not be the resume URL)",
+    )
+    parser.add_argument("--heartbeat-interval", type=float, default=30.0)
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=120.0,
+        help="How long to keep retrying the webhook before spooling the callback",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Wall-clock limit in seconds (default: per agent, FOREMAN_<AGENT>_TIMEOUT; 0 = none)",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Kill the run after this many seconds without output (FOREMAN_<AGENT>_IDLE_TIMEOUT)",
+    )
+    parser.add_argument(
+        "--kill-grace",
+        type=float,
+        default=KILL_GRACE,
+        help="Seconds between SIGTERM and SIGKILL of the process group on timeout",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=float,
+        help="RLIMIT_AS per process in MiB (FOREMAN_<AGENT>_MAX_MEMORY_MB)",
+    )
+    parser.add_argument(
+        "--max-cpu-seconds",
+        type=float,
+        help="RLIMIT_CPU per process in seconds (FOREMAN_<AGENT>_MAX_CPU_SECONDS)",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=sorted(DEFAULT_SLOTS),
+        help="Daemon slot pool (default: the agent name, or setup for other agents)",
+    )
+    parser.add_argument(
+        "--priority",
+        type=int,
+        default=0,
+        help="Higher runs first; within a priority, later passes run before fresh tasks",
+    )
+    return parser
+
+
+# What a submitted job may set; build_parser() supplies the defaults.
+JOB_FIELDS = (
+    "webhook",
+    "agent",
+    "title",
+    "cmd",
+    "prompt",
+    "prompt_file",
+    "cwd",
+    "base64",
+    "log_file",
+    "tail_lines",
+    "heartbeat_url",
+    "heartbeat_interval",
+    "ready_timeout",
+    "timeout",
+    "idle_timeout",
+    "kill_grace",
+    "max_memory_mb",
+    "max_cpu_seconds",
+    "pool",
+    "priority",
+)
+REQUIRED_JOB_FIELDS = ("webhook", "agent", "title")
+
 
-    # Wait for n8n Listener
-    time.sleep(5)
+def job_from_fields(fields: dict) -> argparse.Namespace:
+    """Build a job namespace from JSON fields, using the CLI defaults for the rest."""
+    unknown = sorted(set(fields) - set(JOB_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown job fields: {', '.join(unknown)}")
+    missing = [name for name in REQUIRED_JOB_FIELDS if fields.get(name) in (None, "")]
+    if missing:
+        raise ValueError(f"missing required job fields: {', '.join(missing)}")
+    parser = build_parser()
+    defaults = {name: parser.get_default(name) for name in JOB_FIELDS}
+    return argparse.Namespace(**{**defaults, **fields})
 
+
+def execute_job(args: argparse.Namespace) -> int:
     if args.cmd and (args.prompt or args.prompt_file):
         print("[Runner] Error: use either --cmd or --prompt/--prompt-file")
-        requests.post(
+        deliver(
             args.webhook,
-            json={"success": False, "output": "Conflicting args: --cmd with --prompt/--prompt-file"},
+            {"success": False, "outcome": "permanent", "output": "Conflicting args: --cmd with --prompt/--prompt-file"},
+            args.ready_timeout,
         )
-        sys.exit(2)
+        return 2
 
     prompt_text: str | None = None
+    shell_cmd: str | None = args.cmd
 
     if args.prompt_file:
         try:
             with open(args.prompt_file, "r", encoding="utf-8") as f:
                 prompt_text = f.read()
         except Exception as e:
-            requests.post(
+            deliver(
                 args.webhook,
-                json={"success": False, "output": f"Prompt file read error: {e}"},
+                {"success": False, "outcome": "permanent", "output": f"Prompt file read error: {e}"},
+                args.ready_timeout,
             )
-            sys.exit(1)
+            return 1
     elif args.prompt is not None:
         prompt_text = args.prompt
 
@@ -50,19 +693,17 @@ def run_agent():
             if prompt_text is not None:
                 print("[Runner] Decoding Base64 prompt...")
                 prompt_text = base64.b64decode(prompt_text).decode("utf-8")
-            elif args.cmd is not None:
+            elif shell_cmd is not None:
                 print("[Runner] Decoding Base64 cmd...")
-                args.cmd = base64.b64decode(args.cmd).decode("utf-8")
+                shell_cmd = base64.b64decode(shell_cmd).decode("utf-8")
         except Exception as e:
             print(f"[Runner] Base64 decode failed: {e}")
-            try:
-                requests.post(
-                    args.webhook,
-                    json={"success": False, "output": f"Base64 Error: {e}"},
-                )
-            except Exception as e:
-                print(f"Failed to hit the webhook. Error: {e}")
-            sys.exit(1)
+            deliver(
+                args.webhook,
+                {"success": False, "outcome": "permanent", "output": f"Base64 Error: {e}"},
+                args.ready_timeout,
+            )
+            return 1
 
     if prompt_text is not None:
         cmd = [
@@ -74,43 +715,389 @@ def run_agent():
             args.title,
             prompt_text,
         ]
-    elif args.cmd is not None:
-        cmd = ["bash", "-lc", args.cmd]
+    elif shell_cmd is not None:
+        cmd = ["bash", "-lc", shell_cmd]
     else:
-        requests.post(
+        deliver(
             args.webhook,
-            json={"success": False, "output": "Missing prompt/cmd"},
+            {"success": False, "outcome": "permanent", "output": "Missing prompt/cmd"},
+            args.ready_timeout,
         )
-        sys.exit(2)
+        return 2
 
     print(f"[Runner] Executing: {cmd!r}")
     if args.cwd:
         print(f"[Runner] CWD: {args.cwd}")
 
     try:
-        result = subprocess.run(cmd, cwd=args.cwd, capture_output=True, text=True)
+        patterns = load_patterns()
+    except (OSError, ValueError, re.error) as e:
+        print(f"[Runner] Ignoring FOREMAN_RUNNER_PATTERNS: {e}")
+        patterns = load_patterns("")
+    stream = OutputStream(
+        args.log_file or default_log_path(args.title),
+        max(args.tail_lines, 1),
+        OutputClassifier(patterns),
+    )
+    print(f"[Runner] Log: {stream.log_path}")
+
+    started = time.time()
+    stop = threading.Event()
+    if args.heartbeat_url:
+        threading.Thread(
+            target=heartbeat_loop,
+            args=(
+                args.heartbeat_url,
+                args.heartbeat_interval,
+                stream,
+                args.title,
+                args.agent,
+                started,
+                stop,
+            ),
+            daemon=True,
+        ).start()
 
-        output = result.stdout + "\n" + result.stderr
+    wall_limit, idle_limit = AGENT_TIMEOUTS.get(args.agent, (0.0, 0.0))
+    run: dict = {
+        "exit_code": None,
+        "signal": None,
+        "timed_out": None,
+        "duration": None,
+        "max_rss_kb": None,
+        "user_cpu": None,
+        "sys_cpu": None,
+    }
+    task_id, pass_no = job_labels(args)
+    with span(f"agent.{args.agent}", task_id, pass_no, title=args.title) as job_span:
+        try:
+            run = stream_process(
+                cmd,
+                args.cwd,
+                stream,
+                timeout=agent_setting(args, "timeout", wall_limit),
+                idle_timeout=agent_setting(args, "idle_timeout", idle_limit),
+                kill_grace=args.kill_grace,
+                max_memory_mb=agent_setting(args, "max_memory_mb", 0.0),
+                max_cpu_seconds=agent_setting(args, "max_cpu_seconds", 0.0),
+            )
+            job_span.exit_code = run["exit_code"]
+            outcome, reason = stream.classifier.outcome(run)
+            success = outcome == "ok"
 
-        # BASIC CONTRACT CHECK:
-        # Did the process crash?
-        success = result.returncode == 0
+            output = stream.tail_text()
+            if len(output) > TAIL_BYTES:
+                # Cut at a line boundary so the tail does not start mid-line.
+                output = output[-TAIL_BYTES:].partition("\n")[2]
+            if run["timed_out"]:
+                output += f"\n[Runner Timeout: {run['timed_out']}]"
+            elif run["signal"]:
+                output += f"\n[Runner Detected Crash: {run['signal']}]"
+            elif outcome != "ok":
+                output += f"\n[Runner Outcome: {outcome}: {reason}]"
 
-        # Did it print a CLI error?
-        if "Error:" in output or "usage:" in output:
+        except Exception as e:
             success = False
-            output += "\n[Runner Detected CLI Error]"
-
-    except Exception as e:
-        success = False
-        output = str(e)
+            outcome, reason = "agent_failed", f"runner error: {e}"
+            output = str(e)
+        finally:
+            stop.set()
+            stream.close()
+        artifact = archive_output(args, stream, task_id)
+        job_span.status = "timeout" if run["timed_out"] else ("ok" if success else outcome)
 
     # Callback
+    deliver(
+        args.webhook,
+        {
+            "success": success,
+            "outcome": outcome,
+            "outcome_reason": reason,
+            "output": output,
+            "artifact": artifact,
+            "log_file": stream.log_path if os.path.exists(stream.log_path) else None,
+            "output_lines": stream.lines,
+            "output_bytes": stream.bytes,
+            **run,
+            "duration": round(job_span.duration, 3),
+        },
+        args.ready_timeout,
+    )
+    return 0
+
+
+def run_agent():
+    args = build_parser().parse_args()
+    sys.exit(execute_job(args))
+
+
+def socket_peer_uid(sock: socket.socket) -> int | None:
+    """uid of the process on the other end (Linux SO_PEERCRED); None where unsupported."""
+    peercred = getattr(socket, "SO_PEERCRED", None)
+    if peercred is None:
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, peercred, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid
+
+
+class RunnerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, scheduler: Scheduler) -> None:
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self.jobs: list[threading.Thread] = []
+        super().__init__(path, RunnerRequestHandler)
+
+    def server_bind(self) -> None:
+        # Jobs run arbitrary commands as this user: only this user may connect.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+    def verify_request(self, request, client_address) -> bool:
+        peer_uid = socket_peer_uid(request)
+        if peer_uid is None or peer_uid == os.getuid():
+            return True
+        print(f"[Runner] Refused a connection from uid {peer_uid}")
+        return False
+
+    def run_job(self, job: argparse.Namespace, pool: str) -> None:
+        task_id, pass_no = job_labels(job)
+        ticket = self.scheduler.acquire(pool, job.priority, pass_rank(job.title), job.title)
+        record("runner.queue_wait", ticket.waited, task_id, pass_no, agent=job.agent, pool=pool)
+        try:
+            execute_job(job)
+        except Exception as e:
+            print(f"[Runner] Job {job.title!r} crashed: {e}")
+            deliver(job.webhook, {"success": False, "outcome": "agent_failed", "output": f"Runner error: {e}"}, job.ready_timeout)
+        finally:
+            self.scheduler.release(ticket)
+
+    def submit(self, job: argparse.Namespace) -> None:
+        # One thread per job; it waits in the scheduler until its pool admits it.
+        pool = job_pool(job)
+        thread = threading.Thread(target=self.run_job, args=(job, pool), daemon=True)
+        with self.lock:
+            self.jobs = [t for t in self.jobs if t.is_alive()]
+            self.jobs.append(thread)
+        thread.start()
+
+    def drain(self) -> None:
+        with self.lock:
+            jobs = list(self.jobs)
+        for thread in jobs:
+            thread.join()
+
+    def stats(self) -> dict:
+        return self.scheduler.stats()
+
+
+class RunnerRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per connection, answered with one JSON line."""
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+            op = request.get("op", "submit")
+            if op == "ping":
+                response = {"ok": True, **self.server.stats()}
+            elif op == "submit":
+                job = job_from_fields(request.get("job") or {})
+                self.server.submit(job)
+                response = {"ok": True, "title": job.title}
+            elif op == "lease":
+                self.lease(request)
+                return
+            else:
+                response = {"ok": False, "error": f"unknown op: {op}"}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+    def lease(self, request: dict) -> None:
+        """Hold a pool slot for a command the client runs itself (e.g. `pnpm i`).
+
+        The slot is released when the client closes the connection, so a client
+        that dies cannot leak it.
+        """
+        pool = request.get("pool") or "setup"
+        if pool not in DEFAULT_SLOTS:
+            self.wfile.write((json.dumps({"ok": False, "error": f"unknown pool: {pool}"}) + "\n").encode("utf-8"))
+            return
+        scheduler = self.server.scheduler
+        ticket = scheduler.acquire(pool, int(request.get("priority") or 0), 0, request.get("task_id") or "")
+        record("runner.queue_wait", ticket.waited, request.get("task_id"), None, pool=pool)
+        try:
+            response = {"ok": True, "pool": pool, "waited": round(ticket.waited, 3)}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            self.rfile.read()
+        except OSError:
+            pass
+        finally:
+            scheduler.release(ticket)
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+def serve_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="agent_runner.py serve",
+        description="Run a long-lived runner that accepts jobs on a Unix socket.",
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("FOREMAN_RUNNER_WORKERS", "4")),
+        help="Maximum number of runs executing concurrently across all pools",
+    )
+    for pool, slots in DEFAULT_SLOTS.items():
+        parser.add_argument(
+            f"--{pool}-slots",
+            type=int,
+            default=env_int(f"FOREMAN_{pool.upper()}_SLOTS", slots),
+            help=f"Concurrent {pool} runs (FOREMAN_{pool.upper()}_SLOTS)",
+        )
+    parser.add_argument(
+        "--max-load",
+        type=float,
+        default=float(os.environ.get("FOREMAN_RUNNER_MAX_LOAD", DEFAULT_MAX_LOAD)),
+        help="Only start runs while the 1-minute load average per CPU is below this",
+    )
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.socket)), exist_ok=True)
+    if os.path.exists(args.socket):
+        if send_request(args.socket, {"op": "ping"}) is not None:
+            print(f"[Runner] Another runner is already listening on {args.socket}")
+            sys.exit(1)
+        os.remove(args.socket)
+
+    _requests()  # pay the import once, up front
+    slots = {pool: max(getattr(args, f"{pool}_slots"), 1) for pool in DEFAULT_SLOTS}
+    scheduler = Scheduler(slots, max(args.workers, 1), args.max_load)
+    server = RunnerServer(args.socket, scheduler)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"[Runner] Serving on {args.socket} with {scheduler.workers} workers, slots {slots}")
     try:
-        requests.post(args.webhook, json={"success": success, "output": output})
-    except Exception as e:
-        print(f"Failed to call webhook: {e}")
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        server.drain()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+def send_request(path: str, request: dict, timeout: float = 5.0) -> dict | None:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as f:
+                line = f.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def submit_main(argv: list[str]) -> None:
+    parser = build_parser()
+    parser.prog = "agent_runner.py submit"
+    parser.description = (
+        "Hand a job to the runner daemon; runs it in-process if no daemon is listening."
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args(argv)
+
+    fields = vars(args).copy()
+    sock_path = fields.pop("socket")
+    response = send_request(sock_path, {"op": "submit", "job": fields})
+    if response is not None and response.get("ok"):
+        print(f"[Runner] Submitted {args.title!r} to {sock_path}")
+        sys.exit(0)
+    if response is not None:
+        print(f"[Runner] Daemon rejected job: {response.get('error')}")
+        sys.exit(2)
+
+    print(f"[Runner] No daemon on {sock_path}; running in-process")
+    sys.exit(execute_job(job_from_fields(fields)))
+
+
+def lease_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="agent_runner.py lease",
+        description="Run a command while holding a daemon pool slot (runs at once if no daemon).",
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--pool", choices=sorted(DEFAULT_SLOTS), default="setup")
+    parser.add_argument("--priority", type=int, default=0)
+    parser.add_argument("--task-id")
+    parser.add_argument("cmd", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+    if not cmd:
+        parser.error("missing command after --")
+
+    request = {"op": "lease", "pool": args.pool, "priority": args.priority, "task_id": args.task_id}
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(args.socket)
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        # Blocks until the pool admits us; no timeout on purpose.
+        response = json.loads(sock.makefile("r", encoding="utf-8").readline() or "null")
+    except (OSError, json.JSONDecodeError):
+        response = None
+    if response is None:
+        print(f"[Runner] No daemon on {args.socket}; running without a slot", file=sys.stderr)
+    elif not response.get("ok"):
+        print(f"[Runner] Lease rejected: {response.get('error')}", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        returncode = subprocess.call(cmd)
+    except OSError as e:
+        print(f"[Runner] {e}", file=sys.stderr)
+        returncode = 127
+    finally:
+        sock.close()
+    sys.exit(returncode)
+
+
+def stats_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="agent_runner.py stats",
+        description="Print the daemon's pool occupancy, queue depth and wait times.",
+    )
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args(argv)
+    response = send_request(args.socket, {"op": "ping"})
+    if response is None:
+        print(f"[Runner] No daemon on {args.socket}", file=sys.stderr)
+        sys.exit(1)
+    json.dump(response, sys.stdout)
+    sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
-    run_agent()
+    commands = {
+        "flush": flush_main,
+        "lease": lease_main,
+        "serve": serve_main,
+        "stats": stats_main,
+        "submit": submit_main,
+    }
+    if len(sys.argv) > 1 and sys.argv[1] in commands:
+        commands[sys.argv[1]](sys.argv[2:])
+    else:
+        run_agent()
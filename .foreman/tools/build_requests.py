@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+import shlex
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from todo_registry import TODO_PATH, load_index, task_prompt
+
+WEBHOOK_URL = os.environ.get("FOREMAN_WEBHOOK_URL")
+ID_RE = re.compile(r"^(.*?)(\d+)$")
+
+
+def split_id(task_id: str) -> tuple[str, int]:
+    match = ID_RE.match(task_id)
+    if not match:
+        raise ValueError(f"task id has no numeric suffix: {task_id}")
+    return match.group(1), int(match.group(2))
+
+
+def in_range(task_id: str, spec: str) -> bool:
+    """`ds9-18..ds9-25` (inclusive); either end may be omitted."""
+    start, _, end = spec.partition("..")
+    try:
+        prefix, number = split_id(task_id)
+    except ValueError:
+        return False
+    for bound, keep in ((start, lambda n, b: n >= b), (end, lambda n, b: n <= b)):
+        if not bound:
+            continue
+        bound_prefix, bound_number = split_id(bound)
+        if prefix != bound_prefix or not keep(number, bound_number):
+            return False
+    return True
+
+
+def in_section(task: Dict[str, Any], section: str) -> bool:
+    # `5` selects 5.1, 5.2, ...; `5.3` selects just that task.
+    return task["section"] == section or task["section"].startswith(section.rstrip(".") + ".")
+
+
+def select(
+    index: Dict[str, Dict[str, Any]],
+    task_ids: List[str],
+    id_range: Optional[str],
+    section: Optional[str],
+    pending: bool,
+) -> List[Dict[str, Any]]:
+    missing = [task_id for task_id in task_ids if task_id not in index]
+    if missing:
+        raise KeyError(", ".join(missing))
+
+    selected = []
+    for task_id, task in index.items():
+        if task_ids and task_id not in task_ids:
+            continue
+        if id_range and not in_range(task_id, id_range):
+            continue
+        if section and not in_section(task, section):
+            continue
+        if pending and task["done"]:
+            continue
+        selected.append({"task_id": task_id, **task})
+    return selected
+
+
+def request_body(task: Dict[str, Any]) -> Dict[str, Any]:
+    if not task.get("title") or not task.get("description"):
+        raise ValueError(f"Could not extract Title/Description for '{task['task_id']}'")
+    body: Dict[str, Any] = {"task_id": task["task_id"], "prompt": task_prompt(task)}
+    if task.get("scope"):
+        body["scope"] = task["scope"]
+    return body
+
+
+def curl_command(body: Dict[str, Any], url: str) -> str:
+    data = json.dumps(body, indent=2, ensure_ascii=False)
+    return (
+        "curl -X POST \\\n"
+        '  -H "Content-Type: application/json" \\\n'
+        f"  -d {shlex.quote(data)} \\\n"
+        f"  {shlex.quote(url)}"
+    )
+
+
+def post_all(
+    bodies: List[Dict[str, Any]], url: str, concurrency: int, timeout: float
+) -> List[Dict[str, Any]]:
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def post(body: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            resp = session.post(url, json=body, timeout=timeout)
+        except requests.RequestException as e:
+            return {"task_id": body["task_id"], "ok": False, "status": None, "error": str(e)}
+        return {
+            "task_id": body["task_id"],
+            "ok": resp.ok,
+            "status": resp.status_code,
+            "error": None if resp.ok else resp.text[:500],
+        }
+
+    with session, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(post, bodies))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Build run-foreman webhook requests for TODO.md tasks (JSONL on stdout)."
+    )
+    parser.add_argument("task_ids", nargs="*", help="Explicit task ids, e.g. ds9-18 ds9-19")
+    parser.add_argument("--todo", default=TODO_PATH, help="Path to TODO.md")
+    parser.add_argument("--range", dest="id_range", help="Inclusive id range, e.g. ds9-18..ds9-25")
+    parser.add_argument("--section", help="Backlog section, e.g. 5 or 5.3")
+    parser.add_argument("--pending", action="store_true", help="Skip tasks already checked off")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--post",
+        nargs="?",
+        const="",
+        metavar="WEBHOOK_URL",
+        help="POST each request (default URL: $FOREMAN_WEBHOOK_URL)",
+    )
+    output.add_argument(
+        "--curl",
+        metavar="WEBHOOK_URL",
+        help="Print one curl command per request instead of JSONL",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel POSTs (default 4)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    if not (args.task_ids or args.id_range or args.section or args.pending):
+        parser.error("select tasks by id, --range, --section or --pending")
+    post_url = (args.post or WEBHOOK_URL) if args.post is not None else None
+    if args.post is not None and not post_url:
+        parser.error("--post needs a URL or FOREMAN_WEBHOOK_URL")
+
+    try:
+        index = load_index(args.todo)
+    except FileNotFoundError:
+        print(f"Error: {args.todo} not found", file=sys.stderr)
+        return 1
+    try:
+        tasks = select(index, args.task_ids, args.id_range, args.section, args.pending)
+    except KeyError as e:
+        print(f"Error: Task ID(s) {e.args[0]} not found in {args.todo}", file=sys.stderr)
+        return 1
+    try:
+        bodies = [request_body(task) for task in tasks]
+    except ValueError as e:
+        print(f"Error: {e} from {args.todo}", file=sys.stderr)
+        return 1
+
+    if args.curl:
+        sys.stdout.write("\n\n".join(curl_command(body, args.curl) for body in bodies) + "\n")
+        return 0
+    if post_url:
+        results = post_all(bodies, post_url, max(1, args.concurrency), args.timeout)
+        for result in results:
+            sys.stdout.write(json.dumps(result) + "\n")
+        return 0 if all(result["ok"] for result in results) else 1
+
+    for body in bodies:
+        sys.stdout.write(json.dumps(body, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from foreman_state import (
+    last_reviewed_commit,
+    record_review,
+    safe_update,
+    task_id_for_worktree,
+)
+from instrument import span
+
+PATCH_NAME = "inspector_diff.patch"
+MANIFEST_NAME = "inspector_diff.manifest.json"
+BASE_REF = "main"
+
+# Patterns without a `/` match the file name anywhere; others match the path
+# or any trailing part of it (`dist/*` also matches `components/dist/x.js`).
+SUMMARIZE_PATTERNS = [
+    "pnpm-lock.yaml",
+    "package-lock.json",
+    "yarn.lock",
+    "bun.lock",
+    "bun.lockb",
+]
+DROP_PATTERNS = [
+    # Foreman's own artifacts and agent session logs
+    "builder_result.json",
+    "inspector_result.json",
+    PATCH_NAME,
+    MANIFEST_NAME,
+    "session-log/*",
+    # Build output and generated assets
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "dist/*",
+    "build/*",
+    ".svelte-kit/*",
+    "test-results/*",
+]
+
+MAX_BYTES = int(os.environ.get("FOREMAN_DIFF_MAX_BYTES", "200000"))
+MAX_LINES = int(os.environ.get("FOREMAN_DIFF_MAX_LINES", "4000"))
+MAX_HUNK_HEADERS = 20
+
+
+def git(cwd: str, *args: str, check: bool = True) -> str:
+    # Not every text file is UTF-8 (e.g. Latin-1 that git does not treat as binary);
+    # a replacement character in the review patch beats no patch at all.
+    proc = subprocess.run(
+        ["git", *args], cwd=cwd, capture_output=True, encoding="utf-8", errors="replace"
+    )
+    if check and proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def matches(path: str, patterns: List[str]) -> bool:
+    name = path.rsplit("/", 1)[-1]
+    parts = path.split("/")
+    for pattern in patterns:
+        if "/" not in pattern:
+            if fnmatch.fnmatchcase(name, pattern):
+                return True
+            continue
+        if any(fnmatch.fnmatchcase("/".join(parts[i:]), pattern) for i in range(len(parts))):
+            return True
+    return False
+
+
+def classify(path: str, drop: List[str], summarize: List[str]) -> Optional[str]:
+    if matches(path, drop):
+        return "dropped"
+    if matches(path, summarize):
+        return "summarized"
+    return None
+
+
+def numstat(cwd: str, base: str, head: str) -> List[Dict[str, Any]]:
+    """Per-file line counts, in the same order `git diff` emits the patches."""
+    out = git(cwd, "diff", "--numstat", "-z", "-M", base, head)
+    records = out.split("\0")
+    files: List[Dict[str, Any]] = []
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        added, deleted, path = record.split("\t", 2)
+        entry: Dict[str, Any] = {
+            "added": None if added == "-" else int(added),
+            "deleted": None if deleted == "-" else int(deleted),
+        }
+        if path == "":
+            # Rename/copy: the two paths follow as separate records.
+            entry["orig_path"], path = records[i], records[i + 1]
+            i += 2
+        entry["path"] = path
+        files.append(entry)
+    return files
+
+
+def split_patch(patch: str) -> List[str]:
+    chunks: List[str] = []
+    for line in patch.splitlines(keepends=True):
+        if line.startswith("diff --git ") or not chunks:
+            chunks.append(line)
+        else:
+            chunks[-1] += line
+    return chunks
+
+
+def hunk_headers(chunk: str) -> List[str]:
+    return [line.rstrip("\n") for line in chunk.splitlines() if line.startswith("@@")]
+
+
+def choose_range(
+    cwd: str, task_id: str, mode: str, base_ref: str
+) -> Tuple[str, str, str, Optional[str]]:
+    """Return (mode, base, head, note) for the diff to build."""
+    head = git(cwd, "rev-parse", "HEAD").strip()
+    merge_base = git(cwd, "merge-base", base_ref, "HEAD").strip()
+    if mode == "full":
+        return "full", merge_base, head, None
+
+    reviewed = safe_update(last_reviewed_commit, task_id)
+    if reviewed is None:
+        note = "no completed review yet"
+    elif reviewed["head_commit"] == head:
+        note = "no commits since the last review"
+    elif subprocess.run(
+        ["git", "merge-base", "--is-ancestor", reviewed["head_commit"], "HEAD"],
+        cwd=cwd,
+        capture_output=True,
+    ).returncode != 0:
+        note = "last reviewed commit is no longer an ancestor of HEAD"
+    else:
+        return "delta", reviewed["head_commit"], head, f"changes since review pass {reviewed['pass']}"
+
+    if mode == "delta":
+        raise RuntimeError(f"cannot build a delta diff: {note}")
+    return "full", merge_base, head, note
+
+
+def build(
+    cwd: str,
+    base: str,
+    head: str,
+    drop: List[str],
+    summarize: List[str],
+    max_bytes: int,
+    max_lines: int,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    files = numstat(cwd, base, head)
+    chunks = split_patch(git(cwd, "diff", "-M", base, head))
+    if len(chunks) != len(files):
+        raise RuntimeError(
+            f"numstat/patch mismatch: {len(files)} files vs {len(chunks)} patch chunks"
+        )
+
+    kept: List[str] = []
+    used_bytes = used_lines = 0
+    for entry, chunk in zip(files, chunks):
+        reason = classify(entry["path"], drop, summarize)
+        lines = chunk.count("\n")
+        if reason is None and (used_bytes + len(chunk) > max_bytes or used_lines + lines > max_lines):
+            reason = "over_budget"
+        entry["included"] = reason is None
+        entry["reason"] = reason
+        if reason is None:
+            kept.append(chunk)
+            used_bytes += len(chunk)
+            used_lines += lines
+        elif reason != "dropped":
+            headers = hunk_headers(chunk)
+            entry["hunks"] = headers[:MAX_HUNK_HEADERS]
+            entry["hunk_count"] = len(headers)
+    return "".join(kept), files
+
+
+def describe(manifest: Dict[str, Any]) -> str:
+    """Short markdown note for the Inspector prompt about what the patch leaves out."""
+    lines = [f"Review diff: {manifest['mode']} `{manifest['base'][:12]}..{manifest['head'][:12]}`"]
+    if manifest.get("note"):
+        lines[0] += f" ({manifest['note']})"
+    if manifest["mode"] == "delta":
+        lines.append(
+            "Only commits since your previous review are in `inspector_diff.patch`; "
+            f"run `git diff {manifest['merge_base'][:12]}...HEAD` for the whole change."
+        )
+    elided = [entry for entry in manifest["files"] if not entry["included"]]
+    if elided:
+        lines.append(f"Not shown in `{PATCH_NAME}` (see `{MANIFEST_NAME}`):")
+        for entry in elided:
+            counts = (
+                "binary"
+                if entry["added"] is None
+                else f"+{entry['added']} -{entry['deleted']}"
+            )
+            hunks = f", {entry['hunk_count']} hunks" if entry.get("hunk_count") else ""
+            lines.append(f"- `{entry['path']}` ({entry['reason']}, {counts}{hunks})")
+    return "\n".join(lines) + "\n"
+
+
+def build_main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="build_review_diff.py build",
+        description="Write inspector_diff.patch plus a manifest of what was elided.",
+    )
+    parser.add_argument("--worktree", default=os.getcwd())
+    parser.add_argument("--task-id", help="Default: the worktree directory name")
+    parser.add_argument("--mode", choices=["auto", "full", "delta"], default="auto")
+    parser.add_argument("--base", default=BASE_REF, help="Branch the task started from")
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    parser.add_argument("--max-lines", type=int, default=MAX_LINES)
+    parser.add_argument("--drop", action="append", default=[], help="Extra pattern to omit")
+    parser.add_argument(
+        "--summarize", action="append", default=[], help="Extra pattern to list with stats only"
+    )
+    parser.add_argument(
+        "--no-default-filters", action="store_true", help="Only use --drop/--summarize patterns"
+    )
+    args = parser.parse_args(argv)
+
+    cwd = args.worktree
+    task_id = args.task_id or task_id_for_worktree(cwd)
+    drop = args.drop + ([] if args.no_default_filters else DROP_PATTERNS)
+    summarize = args.summarize + ([] if args.no_default_filters else SUMMARIZE_PATTERNS)
+
+    with span("diff.build", task_id) as s:
+        mode, base, head, note = choose_range(cwd, task_id, args.mode, args.base)
+        patch, files = build(cwd, base, head, drop, summarize, args.max_bytes, args.max_lines)
+        s.attrs.update(mode=mode, patch_bytes=len(patch), files=len(files))
+
+    review_pass = safe_update(record_review, task_id, base, head, mode)
+    manifest = {
+        "task_id": task_id,
+        "pass": review_pass,
+        "mode": mode,
+        "note": note,
+        "base": base,
+        "head": head,
+        "merge_base": git(cwd, "merge-base", args.base, "HEAD").strip(),
+        "patch_bytes": len(patch),
+        "patch_lines": patch.count("\n"),
+        "budget": {"max_bytes": args.max_bytes, "max_lines": args.max_lines},
+        "files": files,
+    }
+    manifest["summary"] = describe(manifest)
+
+    with open(os.path.join(cwd, PATCH_NAME), "w", encoding="utf-8") as f:
+        f.write(patch)
+    with open(os.path.join(cwd, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+    json.dump(
+        {key: manifest[key] for key in ("task_id", "pass", "mode", "note", "patch_bytes", "patch_lines")}
+        | {"elided": sum(1 for entry in files if not entry["included"])},
+        sys.stdout,
+    )
+    sys.stdout.write("\n")
+    return 0
+
+
+def describe_main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="build_review_diff.py describe")
+    parser.add_argument("--worktree", default=os.getcwd())
+    args = parser.parse_args(argv)
+    try:
+        with open(os.path.join(args.worktree, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return 0
+    sys.stdout.write(manifest.get("summary") or describe(manifest))
+    return 0
+
+
+def main() -> int:
+    commands = {"build": build_main, "describe": describe_main}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("usage: build_review_diff.py {build,describe} ...", file=sys.stderr)
+        return 2
+    return commands[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+# Declarative contract schemas. Each node describes one value:
+#   type      object | enum | text | optional_text | text_list | list | null
+#   code/message   error reported when the value does not have that type
+#   fields    (object) ordered child nodes, keyed by field name
+#   values    (enum) allowed values
+#   items     (list) node applied to every element
+#   required_when  (list) {"field", "equals", "code", "message"}: sibling
+#             condition under which the list must be non-empty
+#   switch    (object field) {"on": <path from root>, "cases": {value: node}}
+#             picks the node by another value; no matching case = no checks
+# An `object` that fails its type check stops validation of its children.
+
+RUN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "code": "required",
+    "message": "run must be an object",
+    "fields": {
+        "status": {
+            "type": "enum",
+            "values": ["ok", "failed"],
+            "code": "invalid_enum",
+            "message": "run.status must be 'ok' or 'failed'",
+        },
+        "failed_step": {
+            "type": "optional_text",
+            "code": "type_error",
+            "message": "run.failed_step must be a string or null",
+        },
+        "error": {
+            "type": "optional_text",
+            "code": "type_error",
+            "message": "run.error must be a string or null",
+        },
+    },
+}
+
+FAILED_WORK_SCHEMA: Dict[str, Any] = {
+    "type": "null",
+    "code": "invalid",
+    "message": "work must be null when run.status is 'failed'",
+}
+
+BUILDER_RESULT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "code": "type_error",
+    "message": "builder_result must be a JSON object",
+    "fields": {
+        "run": RUN_SCHEMA,
+        "work": {
+            "switch": {
+                "on": "run.status",
+                "cases": {
+                    "failed": FAILED_WORK_SCHEMA,
+                    "ok": {
+                        "type": "object",
+                        "code": "required",
+                        "message": "work must be an object when run.status is 'ok'",
+                        "fields": {
+                            "summary": {
+                                "type": "text",
+                                "code": "required",
+                                "message": "work.summary must be a non-empty string",
+                            },
+                            "complexity": {
+                                "type": "enum",
+                                "values": ["low", "medium", "high"],
+                                "code": "invalid_enum",
+                                "message": "work.complexity must be one of 'low', 'medium', 'high'",
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+INSPECTOR_RESULT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "code": "type_error",
+    "message": "inspector_result must be a JSON object",
+    "fields": {
+        "run": RUN_SCHEMA,
+        "work": {
+            "switch": {
+                "on": "run.status",
+                "cases": {
+                    "failed": FAILED_WORK_SCHEMA,
+                    "ok": {
+                        "type": "object",
+                        "code": "required",
+                        "message": "work must be an object when run.status is 'ok'",
+                        "fields": {
+                            "status": {
+                                "type": "enum",
+                                "values": ["approved", "changes_requested"],
+                                "code": "invalid_enum",
+                                "message": "work.status must be 'approved' or 'changes_requested'",
+                            },
+                            "issues": {
+                                "type": "list",
+                                "code": "type_error",
+                                "message": "work.issues must be an array",
+                                "required_when": {
+                                    "field": "status",
+                                    "equals": "changes_requested",
+                                    "code": "required",
+                                    "message": "work.issues must be non-empty when work.status is 'changes_requested'",
+                                },
+                                "items": {
+                                    "type": "object",
+                                    "code": "type_error",
+                                    "message": "each issue must be an object",
+                                    "fields": {
+                                        "severity": {
+                                            "type": "enum",
+                                            "values": ["blocker", "major", "minor"],
+                                            "code": "invalid_enum",
+                                            "message": "severity must be 'blocker', 'major', or 'minor'",
+                                        },
+                                        "description": {
+                                            "type": "text",
+                                            "code": "required",
+                                            "message": "description must be a non-empty string",
+                                        },
+                                        "paths": {
+                                            "type": "text_list",
+                                            "code": "type_error",
+                                            "message": "paths must be an array of non-empty strings",
+                                        },
+                                    },
+                                },
+                            },
+                            "next_tasks": {
+                                "type": "text_list",
+                                "code": "type_error",
+                                "message": "work.next_tasks must be an array of non-empty strings",
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "builder": BUILDER_RESULT_SCHEMA,
+    "inspector": INSPECTOR_RESULT_SCHEMA,
+}
+
+Errors = List[Dict[str, str]]
+# A compiled node: (value, parent object, root document, path, errors) -> None
+Check = Callable[[Any, Dict[str, Any], Any, str, Errors], None]
+
+TYPE_TESTS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "list": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+    "text": lambda v: isinstance(v, str) and bool(v.strip()),
+    "optional_text": lambda v: v is None or isinstance(v, str),
+    "text_list": lambda v: isinstance(v, list)
+    and all(isinstance(item, str) and item.strip() for item in v),
+}
+
+
+def lookup(root: Any, dotted: str) -> Any:
+    value = root
+    for part in dotted.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def error(path: str, node: Dict[str, Any]) -> Dict[str, str]:
+    return {"path": path or "<root>", "code": node["code"], "message": node["message"]}
+
+
+def compile_schema(node: Dict[str, Any]) -> Check:
+    if "switch" in node:
+        on = node["switch"]["on"]
+        cases = {value: compile_schema(case) for value, case in node["switch"]["cases"].items()}
+
+        def check_switch(value: Any, parent: Dict[str, Any], root: Any, path: str, errors: Errors) -> None:
+            selected = lookup(root, on)
+            case = cases.get(selected) if isinstance(selected, str) else None
+            if case is not None:
+                case(value, parent, root, path, errors)
+
+        return check_switch
+
+    kind = node["type"]
+    if kind == "enum":
+        allowed = frozenset(node["values"])
+
+        def check_enum(value: Any, parent: Dict[str, Any], root: Any, path: str, errors: Errors) -> None:
+            if not isinstance(value, str) or value not in allowed:
+                errors.append(error(path, node))
+
+        return check_enum
+
+    test = TYPE_TESTS[kind]
+    children = [(name, compile_schema(child)) for name, child in node.get("fields", {}).items()]
+    items = compile_schema(node["items"]) if "items" in node else None
+    required_when = node.get("required_when")
+
+    def check(value: Any, parent: Dict[str, Any], root: Any, path: str, errors: Errors) -> None:
+        if not test(value):
+            errors.append(error(path, node))
+            return
+        if required_when is not None and not value:
+            if parent.get(required_when["field"]) == required_when["equals"]:
+                errors.append(error(path, required_when))
+        if items is not None:
+            for idx, item in enumerate(value):
+                items(item, value, root, f"{path}[{idx}]", errors)
+        for name, child in children:
+            child(value.get(name), value, root, f"{path}.{name}" if path else name, errors)
+
+    return check
+
+
+VALIDATORS: Dict[str, Check] = {kind: compile_schema(schema) for kind, schema in SCHEMAS.items()}
+
+
+def validate(kind: str, data: Any) -> Dict[str, Any]:
+    errors: Errors = []
+    VALIDATORS[kind](data, {}, data, "", errors)
+    return {"ok": not errors, "errors": errors}
+
+
+def validate_main(argv: List[str]) -> int:
+    """Tool contract from FOREMAN.md: `{data}` or `{path}` on stdin, `{ok, errors}` out."""
+    parser = argparse.ArgumentParser(prog="contracts.py validate")
+    parser.add_argument("kind", choices=sorted(SCHEMAS))
+    args = parser.parse_args(argv)
+
+    request = json.load(sys.stdin)
+    if "data" in request:
+        data = request["data"]
+    else:
+        with open(request.get("path") or f"{args.kind}_result.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    json.dump(validate(args.kind, data), sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+def batch_main(argv: List[str]) -> int:
+    from handoff import check_handoff
+
+    parser = argparse.ArgumentParser(
+        prog="contracts.py batch",
+        description="Check the handoff of many worktrees in one process; one JSON line each.",
+    )
+    parser.add_argument("kind", choices=[*sorted(SCHEMAS), "auto"])
+    parser.add_argument("worktrees", nargs="+")
+    args = parser.parse_args(argv)
+
+    for worktree in args.worktrees:
+        kind = args.kind
+        if kind == "auto":
+            # The Inspector writes its result after the Builder, so prefer it when present.
+            has_inspector = os.path.exists(os.path.join(worktree, "inspector_result.json"))
+            kind = "inspector" if has_inspector else "builder"
+        line = {"worktree": worktree, "kind": kind, **check_handoff(kind, worktree)}
+        sys.stdout.write(json.dumps(line) + "\n")
+    return 0
+
+
+def main() -> int:
+    commands = {"validate": validate_main, "batch": batch_main}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("usage: contracts.py {validate,batch} ...", file=sys.stderr)
+        return 2
+    return commands[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,72 +1,242 @@
 import argparse
+import contextlib
 import json
 import os
 import re
 import subprocess
 import sys
-from typing import Any
-
-
-def run(cmd: str, cwd: str | None = None) -> tuple[int, str, str]:
-    env = os.environ.copy()
-    proc = subprocess.run(
-        cmd,
-        shell=True,
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-        env=env,
-    )
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from foreman_state import finish_task, record_phase, safe_update
+from git_state import git_version
+from instrument import span
+from scope import checkout_dir, read_scope
+from todo_registry import mark_done
+from worktree_pool import spawn_fill
+
+RESULT_ARTIFACTS = [
+    "builder_result.json",
+    "inspector_result.json",
+    "inspector_diff.patch",
+    "inspector_diff.manifest.json",
+]
+# Keep logs on disk, but never include them in commits/PRs.
+# OpenCode writes under `.opencode/session-log/` (also exclude legacy `session-log/`).
+SESSION_LOG_DIRS = ["session-log", ".opencode/session-log"]
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+
+
+def run(cmd: List[str], cwd: str | None = None) -> tuple[int, str, str]:
+    try:
+        proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    except OSError as e:
+        # e.g. `gh` not installed; report it like the shell did (exit 127)
+        return 127, "", str(e)
     return proc.returncode, proc.stdout, proc.stderr
 
 
-def remove_builder_result(worktree: str) -> None:
-    path = os.path.join(worktree, "builder_result.json")
-    if os.path.exists(path):
-        os.remove(path)
-    # Ensure it is not staged
-    run("git rm --cached builder_result.json || true", cwd=worktree)
+class Timings:
+    """Step durations for the result JSON; each step is also emitted as a `pr.<step>` span."""
+
+    def __init__(self, task_id: Optional[str] = None) -> None:
+        self.steps: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self.task_id = task_id
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with span(f"pr.{name}", self.task_id):
+                yield
+        finally:
+            self.steps[name] = round(time.perf_counter() - start, 4)
 
+    def as_dict(self) -> Dict[str, float]:
+        return {**self.steps, "total": round(time.perf_counter() - self.started, 4)}
 
-def remove_inspector_artifacts(worktree: str) -> None:
-    for filename in ["inspector_result.json", "inspector_diff.patch"]:
+
+def remove_result_artifacts(worktree: str) -> None:
+    for filename in RESULT_ARTIFACTS:
         path = os.path.join(worktree, filename)
         if os.path.exists(path):
             os.remove(path)
-        run(f"git rm --cached {filename} || true", cwd=worktree)
+    # One index update for every artifact instead of one `git rm` per file.
+    run(
+        [
+            "git",
+            "rm",
+            "-r",
+            "--cached",
+            "--ignore-unmatch",
+            "--quiet",
+            "--",
+            *RESULT_ARTIFACTS,
+            *SESSION_LOG_DIRS,
+        ],
+        cwd=worktree,
+    )
 
 
-def remove_session_log_artifacts(worktree: str) -> None:
-    # Keep logs on disk, but never include them in commits/PRs.
-    # OpenCode writes under `.opencode/session-log/` (also remove legacy `session-log/`).
-    run("git rm -r --cached session-log .opencode/session-log || true", cwd=worktree)
-    # If they are not tracked, they can still be staged via `git add -A`.
-    # Explicitly unstage them.
-    run("git restore --staged --worktree -- session-log .opencode/session-log || true", cwd=worktree)
+def stage_changes(worktree: str, scoped: bool) -> None:
+    # Exclude session logs at staging time so `add -A` cannot pick them back up.
+    excludes = [f":(exclude){path}" for path in SESSION_LOG_DIRS]
+    # In a scoped (sparse) worktree, files created outside the cones are only
+    # staged with --sparse (git >= 2.34); they were flagged at handoff.
+    sparse = ["--sparse"] if scoped and git_version() >= (2, 34) else []
+    run(["git", "add", "-A", *sparse, "--", ".", *excludes], cwd=worktree)
 
 
-def update_todo(task_id: str, repo_root: str) -> None:
-    todo_path = os.path.join(repo_root, "docs", "TODO.md")
-    if not os.path.exists(todo_path):
-        return
+def update_todo(task_ids: List[str], worktree: str, scoped: bool) -> Dict[str, Any]:
+    """Tick the TODO.md checkboxes; a failure is reported, never raised, so the PR still goes out."""
+    todo_path = os.path.join(worktree, "docs", "TODO.md")
+    try:
+        if not os.path.exists(todo_path) and scoped:
+            # Scoped worktrees leave docs/ out of the sparse checkout.
+            checkout_dir(worktree, "docs")
+            if not os.path.exists(todo_path):
+                raise RuntimeError(f"docs/TODO.md is missing from the scoped worktree {worktree}")
+        if not os.path.exists(todo_path):
+            return {}
+        return mark_done(task_ids, todo_path)
+    except (OSError, RuntimeError) as e:
+        print(f"[create_pr] TODO.md not updated: {e}", file=sys.stderr)
+        return {"error": str(e)}
 
-    with open(todo_path, "r", encoding="utf-8") as f:
-        content = f.read()
 
-    # Pattern: - [ ] [ds9-3 · 2.2 ...] or similar
-    # We mark the first occurrence for this task id as [x]
-    pattern = rf"- \[ \] \[{re.escape(task_id)}"
-    replacement = f"- [x] [{task_id}"
+def github_repo_slug(worktree: str) -> Optional[str]:
+    if os.environ.get("GITHUB_REPOSITORY"):
+        return os.environ["GITHUB_REPOSITORY"]
+    ret, out, _ = run(["git", "remote", "get-url", "origin"], cwd=worktree)
+    if ret != 0:
+        return None
+    match = re.search(r"github\.com[:/]([^/]+/[^/]+?)(?:\.git)?/?$", out.strip())
+    return match.group(1) if match else None
+
+
+class GitHubClient:
+    """Pooled REST client so the TLS handshake is paid once (and can be paid early)."""
+
+    def __init__(self, token: str, slug: str, api_url: str = GITHUB_API_URL) -> None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.slug = slug
+        self.api_url = api_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+            }
+        )
 
-    new_content, count = re.subn(pattern, replacement, content, count=1)
-    if count:
-        with open(todo_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
+    @classmethod
+    def from_env(cls, worktree: str) -> Optional["GitHubClient"]:
+        """None means "not configured", in which case we fall back to `gh`."""
+        token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+        slug = github_repo_slug(worktree)
+        if not token or not slug:
+            return None
+        try:
+            return cls(token, slug)
+        except ImportError:
+            return None
+
+    def warm(self) -> None:
+        # Opens the pooled connection while `git push` is still running.
+        try:
+            self.session.head(self.api_url, timeout=10)
+        except Exception:
+            pass
+
+    def create_pr(self, title: str, body: str, head: str, base: str) -> tuple[int, str, str]:
+        try:
+            resp = self.session.post(
+                f"{self.api_url}/repos/{self.slug}/pulls",
+                json={"title": title, "body": body, "head": head, "base": base, "draft": True},
+                timeout=30,
+            )
+        except Exception as e:
+            return 1, "", f"GitHub API request failed: {e}"
+        if resp.status_code == 201:
+            return 0, resp.json().get("html_url", "") + "\n", ""
+        return 1, "", f"GitHub API returned {resp.status_code}: {resp.text}"
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def create_pr_via_gh(worktree: str, title: str, body: str, head: str, base: str) -> tuple[int, str, str]:
+    return run(
+        [
+            "gh",
+            "pr",
+            "create",
+            "--title",
+            title,
+            "--body",
+            body,
+            "--head",
+            head,
+            "--base",
+            base,
+            "--draft",
+        ],
+        cwd=worktree,
+    )
+
+
+def spawn_cleanup(repo_root: str, worktree: str, branch: str) -> None:
+    """Remove the worktree and branch after we have answered, then refill the pool."""
+    subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "cleanup",
+            "--worktree",
+            worktree,
+            "--branch",
+            branch,
+        ],
+        cwd=repo_root,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def cleanup_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(prog="create_pr.py cleanup")
+    parser.add_argument("--worktree", required=True)
+    parser.add_argument("--branch", required=True)
+    args = parser.parse_args(argv)
+
+    repo_root = os.getcwd()
+    run(["git", "worktree", "remove", "--force", args.worktree], cwd=repo_root)
+    run(["git", "branch", "-D", args.branch], cwd=repo_root)
+
+    # Top the worktree pool back up for the next task
+    spawn_fill()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--task-id", required=True, help="Task id, e.g. ds9-3")
+    parser.add_argument(
+        "--also-done",
+        nargs="*",
+        default=[],
+        help="Further TODO ids completed by this PR (checked off together with --task-id)",
+    )
     parser.add_argument("--title", required=True, help="PR title")
     parser.add_argument("--body", required=True, help="Task body/description for PR")
     parser.add_argument(
@@ -75,42 +245,75 @@ def main() -> None:
     parser.add_argument(
         "--branch", required=True, help="Local branch name for this task"
     )
+    parser.add_argument("--base", default="main", help="Base branch for the PR")
+    parser.add_argument(
+        "--sync-cleanup",
+        action="store_true",
+        help="Remove the worktree/branch before returning instead of in the background",
+    )
     args = parser.parse_args()
 
     repo_root = os.getcwd()
+    timings = Timings(args.task_id)
 
     # 1) Remove result artifacts from PR
-    remove_builder_result(args.worktree)
-    remove_inspector_artifacts(args.worktree)
-    remove_session_log_artifacts(args.worktree)
+    with timings.step("remove_artifacts"):
+        remove_result_artifacts(args.worktree)
 
     # 2) Update docs/TODO.md marking task as completed inside the worktree
-    update_todo(args.task_id, args.worktree)
+    scoped = read_scope(args.worktree) is not None
+    with timings.step("update_todo"):
+        todo = update_todo([args.task_id, *args.also_done], args.worktree, scoped)
 
     # 3) Commit any remaining changes in the worktree (if not already committed)
-    run("git add -A", cwd=args.worktree)
+    with timings.step("stage"):
+        stage_changes(args.worktree, scoped)
 
     # If there is nothing to commit, git commit will fail; that's fine.
-    run("git commit -m 'chore: finalize task' || true", cwd=args.worktree)
+    with timings.step("commit"):
+        run(["git", "commit", "-m", "chore: finalize task"], cwd=args.worktree)
 
-    # 4) Push branch and create PR with task body as description
-    pr_body = args.body
-    quoted_body = json.dumps(pr_body)
-
-    push_cmd = f"git push -u origin {args.branch}"
-    ret, out, err = run(push_cmd, cwd=args.worktree)
+    # 4) Push branch and create PR with task body as description.
+    # The API connection is set up on a worker thread while the push runs.
+    client = GitHubClient.from_env(args.worktree)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        warming = pool.submit(client.warm) if client is not None else None
+        with timings.step("push"):
+            ret, out, err = run(["git", "push", "-u", "origin", args.branch], cwd=args.worktree)
+        if warming is not None:
+            warming.result()
     if ret != 0:
-        print(json.dumps({"ok": False, "step": "push", "stdout": out, "stderr": err}))
+        if client is not None:
+            client.close()
+        safe_update(record_phase, args.task_id, "pr", "failed")
+        print(
+            json.dumps(
+                {
+                    "ok": False,
+                    "step": "push",
+                    "stdout": out,
+                    "stderr": err,
+                    "timings": timings.as_dict(),
+                }
+            )
+        )
         sys.exit(0)
 
-    pr_cmd = (
-        "gh pr create "
-        f"--title {json.dumps(args.title)} "
-        f"--body {quoted_body} "
-        f"--head {args.branch} "
-        "--draft"
-    )
-    ret, out, err = run(pr_cmd, cwd=args.worktree)
+    with timings.step("create_pr"):
+        via = "gh"
+        api_err = ""
+        if client is not None:
+            with contextlib.closing(client):
+                ret, out, err = client.create_pr(args.title, args.body, args.branch, args.base)
+            if ret == 0:
+                via = "api"
+            else:
+                api_err = err
+        if via == "gh":
+            ret, out, err = create_pr_via_gh(
+                args.worktree, args.title, args.body, args.branch, args.base
+            )
+            err = f"{api_err}\n{err}".strip()
 
     pr_url: Any = None
     if ret == 0:
@@ -119,19 +322,33 @@ def main() -> None:
         if lines:
             pr_url = lines[-1]
 
-    # 5) Remove worktree and local branch
-    run(f"git worktree remove {args.worktree} --force || true", cwd=repo_root)
-    run(f"git branch -D {args.branch} || true", cwd=repo_root)
+    if ret == 0:
+        safe_update(finish_task, args.task_id, "done", pr_url=pr_url)
+    else:
+        safe_update(record_phase, args.task_id, "pr", "failed")
+
+    # 5) Remove worktree and local branch (in the background unless asked not to)
+    with timings.step("cleanup"):
+        if args.sync_cleanup:
+            cleanup_main(["--worktree", args.worktree, "--branch", args.branch])
+        else:
+            spawn_cleanup(repo_root, args.worktree, args.branch)
 
     result = {
         "ok": ret == 0,
         "pr_url": pr_url,
+        "pr_via": via,
+        "todo": todo,
         "stdout": out,
         "stderr": err,
+        "timings": timings.as_dict(),
     }
     json.dump(result, sys.stdout)
     sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "cleanup":
+        cleanup_main(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import sys
+
+# command -> (module, summary). A command's module is imported only when it
+# runs, so each invocation pays for one tool; the scripts still work directly.
+COMMANDS = {
+    "runner": ("agent_runner", "Run agents: serve | submit | lease | stats | flush"),
+    "check-builder": ("check_builder_handoff", "Validate builder_result.json in the current worktree"),
+    "check-inspector": ("check_inspector_handoff", "Validate inspector_result.json in the current worktree"),
+    "review-diff": ("build_review_diff", "Write inspector_diff.patch for the Inspector"),
+    "preflight": ("preflight", "Lint, type check and unit tests before review"),
+    "create-pr": ("create_pr", "Commit, push and open the pull request (or: create-pr cleanup)"),
+    "failure-summary": ("write_foreman_failure_summary", "Write a rejection report JSON"),
+    "state": ("foreman_state", "Query and update the task state store"),
+    "contracts": ("contracts", "Check handoff contracts of many worktrees"),
+    "inspector-cache": ("inspector_cache", "Content-addressed cache of Inspector decisions"),
+    "artifacts": ("artifacts", "Fetch, list and prune archived agent output"),
+    "pool": ("worktree_pool", "Pre-installed worktree pool"),
+    "scope": ("scope", "Sparse worktrees limited to a task's path scope"),
+    "metrics": ("instrument", "Span events: run | emit | report | serve"),
+    "todo": ("todo_registry", "Indexed access to docs/TODO.md"),
+    "build-requests": ("build_requests", "Build run-foreman webhook requests from TODO.md"),
+    "queue": ("task_queue", "Shared task queue for multi-host runs: enqueue | work | stats"),
+    "session-stats": ("session_log_stats", "Where the agents spent their time"),
+}
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: foreman.py <command> [args...]", "", "commands:"]
+    lines += [f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items()]
+    lines += ["", "Run `foreman.py <command> --help` for a command's options."]
+    return "\n".join(lines)
+
+
+def main(argv: list[str]) -> int:
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"foreman.py: unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    import runpy
+
+    # Run the tool as if it were the script: its `__main__` block parses
+    # sys.argv, and argparse shows `foreman.py <command>` as the program name.
+    sys.argv = [f"foreman.py {name}", *rest]
+    runpy.run_module(COMMANDS[name][0], run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
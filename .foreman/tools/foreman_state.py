@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.environ.get("FOREMAN_STATE_DIR", os.path.join(FOREMAN_DIR, "state"))
+DB_PATH = os.environ.get("FOREMAN_STATE_DB", os.path.join(STATE_DIR, "foreman.db"))
+
+# Pipeline phases in execution order. A task resumes at the phase that
+# follows its last completed one (see NEXT_PHASE / resume_point).
+PHASES = [
+    "worktree",
+    "setup",
+    "builder",
+    "builder_handoff",
+    "preflight",
+    "diff",
+    "inspector",
+    "inspector_handoff",
+    "pr",
+]
+NEXT_PHASE = {
+    "worktree": "setup",
+    "setup": "builder",
+    "builder": "builder_handoff",
+    "builder_handoff": "preflight",
+    "preflight": "diff",
+    "diff": "inspector",
+    "inspector": "inspector_handoff",
+    "inspector_handoff": "pr",
+    "pr": "done",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'running',
+    phase TEXT,
+    builder_pass INTEGER NOT NULL DEFAULT 0,
+    inspector_pass INTEGER NOT NULL DEFAULT 0,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    transient_retry_builder INTEGER NOT NULL DEFAULT 0,
+    transient_retry_inspector INTEGER NOT NULL DEFAULT 0,
+    change_requests TEXT,
+    reason TEXT,
+    pr_url TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS passes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    pass INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    decision TEXT,
+    result TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_passes_task ON passes (task_id, agent, pass);
+
+CREATE TABLE IF NOT EXISTS phases (
+    task_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (task_id, phase)
+);
+CREATE INDEX IF NOT EXISTS idx_phases_task ON phases (task_id, finished_at);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    task_id TEXT NOT NULL,
+    pass INTEGER NOT NULL,
+    base_commit TEXT NOT NULL,
+    head_commit TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (task_id, pass)
+);
+
+CREATE TABLE IF NOT EXISTS rejections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT,
+    who TEXT NOT NULL,
+    pass INTEGER,
+    status TEXT,
+    reason TEXT NOT NULL,
+    outcome TEXT,
+    report TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rejections_task ON rejections (task_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_rejections_reason ON rejections (reason, recorded_at);
+
+-- One row per (issue, path) of a rejection; issues without paths get path NULL.
+CREATE TABLE IF NOT EXISTS rejection_issues (
+    rejection_id INTEGER NOT NULL,
+    issue INTEGER NOT NULL,
+    severity TEXT,
+    path TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rejection_issues_rejection ON rejection_issues (rejection_id);
+CREATE INDEX IF NOT EXISTS idx_rejection_issues_path ON rejection_issues (path, severity);
+CREATE INDEX IF NOT EXISTS idx_rejection_issues_severity ON rejection_issues (severity);
+"""
+
+# `state rejections --top <name>`: what to group the rejection history by.
+REJECTION_TOPS = ("paths", "tasks", "reasons", "severities")
+
+TASK_COUNTERS = (
+    "builder_pass",
+    "inspector_pass",
+    "retry_count",
+    "transient_retry_builder",
+    "transient_retry_inspector",
+)
+
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def task_id_for_worktree(worktree: str) -> str:
+    # Worktrees live at `.oc_worktrees/<task_id>` (see the workflow).
+    return os.environ.get("FOREMAN_TASK_ID") or os.path.basename(os.path.normpath(worktree))
+
+
+def ensure_task(conn: sqlite3.Connection, task_id: str) -> None:
+    now = time.time()
+    conn.execute(
+        "INSERT OR IGNORE INTO tasks (task_id, created_at, updated_at) VALUES (?, ?, ?)",
+        (task_id, now, now),
+    )
+
+
+def update_task(conn: sqlite3.Connection, task_id: str, **fields: Any) -> None:
+    ensure_task(conn, task_id)
+    fields["updated_at"] = time.time()
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    conn.execute(f"UPDATE tasks SET {columns} WHERE task_id = ?", (*fields.values(), task_id))
+
+
+def record_phase(conn: sqlite3.Connection, task_id: str, phase: str, status: str) -> None:
+    if phase not in NEXT_PHASE:
+        raise ValueError(f"unknown phase: {phase}")
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ensure_task(conn, task_id)
+        if status == "started":
+            conn.execute(
+                "INSERT INTO phases (task_id, phase, status, started_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (task_id, phase) DO UPDATE SET "
+                "status = excluded.status, started_at = excluded.started_at, finished_at = NULL",
+                (task_id, phase, status, now),
+            )
+        else:
+            conn.execute(
+                "INSERT INTO phases (task_id, phase, status, started_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_id, phase) DO UPDATE SET "
+                "status = excluded.status, finished_at = excluded.finished_at",
+                (task_id, phase, status, now, now),
+            )
+            if status == "ok":
+                update_task(conn, task_id, phase=phase)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def record_handoff(
+    conn: sqlite3.Connection, task_id: str, agent: str, handoff: Dict[str, Any]
+) -> int:
+    """Store a handoff checker result as the next pass of `agent` and advance the phase."""
+    data = handoff.get("data") or {}
+    run = data.get("run") or {}
+    work = data.get("work") or {}
+    decision = work.get("status") or run.get("status")
+    counter = f"{agent}_pass"
+    now = time.time()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ensure_task(conn, task_id)
+        row = conn.execute(
+            "SELECT COALESCE(MAX(pass), 0) + 1 FROM passes WHERE task_id = ? AND agent = ?",
+            (task_id, agent),
+        ).fetchone()
+        pass_no = int(row[0])
+        conn.execute(
+            "INSERT INTO passes (task_id, agent, pass, status, decision, result, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (task_id, agent, pass_no, handoff.get("status"), decision, json.dumps(handoff), now),
+        )
+
+        # The handoff phase only counts as completed when the pipeline can move on.
+        if handoff.get("status") == "valid" and run.get("status") == "ok":
+            phase = f"{agent}_handoff"
+            if agent == "inspector" and decision != "approved":
+                # changes_requested sends the task back to the Builder.
+                phase = "setup"
+            fields: Dict[str, Any] = {counter: pass_no, "phase": phase}
+            if agent == "inspector" and decision == "changes_requested":
+                fields["change_requests"] = json.dumps(
+                    {"issues": work.get("issues"), "next_tasks": work.get("next_tasks")}
+                )
+            update_task(conn, task_id, **fields)
+            if agent == "inspector" and decision == "changes_requested":
+                conn.execute(
+                    "UPDATE tasks SET retry_count = retry_count + 1 WHERE task_id = ?", (task_id,)
+                )
+            conn.execute(
+                "INSERT INTO phases (task_id, phase, status, started_at, finished_at) "
+                "VALUES (?, ?, 'ok', ?, ?) "
+                "ON CONFLICT (task_id, phase) DO UPDATE SET status = 'ok', finished_at = excluded.finished_at",
+                (task_id, f"{agent}_handoff", now, now),
+            )
+        else:
+            update_task(conn, task_id, **{counter: pass_no})
+            if handoff.get("status") in ("file_missing", "invalid_json"):
+                # Mirrors the workflow's transient_retry_<agent> counters.
+                conn.execute(
+                    f"UPDATE tasks SET transient_retry_{agent} = transient_retry_{agent} + 1 "
+                    "WHERE task_id = ?",
+                    (task_id,),
+                )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return pass_no
+
+
+def record_preflight(
+    conn: sqlite3.Connection, task_id: str, status: str, change_requests: Optional[str] = None
+) -> None:
+    """A failed pre-flight sends the task back to the Builder, like a rejected review.
+
+    An `error` (the checks could not run) is no verdict: the phase is recorded
+    as such and not passed, so a resumed task runs the pre-flight again.
+    """
+    if status == "error":
+        record_phase(conn, task_id, "preflight", "error")
+        return
+    if status != "failed":
+        record_phase(conn, task_id, "preflight", "ok")
+        return
+    record_phase(conn, task_id, "preflight", "failed")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        update_task(conn, task_id, phase="setup", change_requests=change_requests)
+        conn.execute("UPDATE tasks SET retry_count = retry_count + 1 WHERE task_id = ?", (task_id,))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def finish_task(
+    conn: sqlite3.Connection,
+    task_id: str,
+    status: str,
+    reason: Optional[str] = None,
+    pr_url: Optional[str] = None,
+) -> None:
+    fields: Dict[str, Any] = {"status": status}
+    if reason is not None:
+        fields["reason"] = reason
+    if pr_url is not None:
+        fields["pr_url"] = pr_url
+    if status == "done":
+        fields["phase"] = "pr"
+    update_task(conn, task_id, **fields)
+
+
+def reopen_task(conn: sqlite3.Connection, task_id: str) -> bool:
+    """Put a failed task back to `running` for a new run; returns whether it was failed.
+
+    The retry budgets start over, while the pass numbers and the last change
+    requests are kept so the rerun continues where the failed one stopped.
+    """
+    cursor = conn.execute(
+        "UPDATE tasks SET status = 'running', reason = NULL, retry_count = 0, "
+        "transient_retry_builder = 0, transient_retry_inspector = 0, updated_at = ? "
+        "WHERE task_id = ? AND status = 'failed'",
+        (time.time(), task_id),
+    )
+    return cursor.rowcount > 0
+
+
+def record_review(
+    conn: sqlite3.Connection, task_id: str, base_commit: str, head_commit: str, mode: str
+) -> int:
+    """Remember which commit the upcoming Inspector pass is shown; returns that pass number."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ensure_task(conn, task_id)
+        row = conn.execute(
+            "SELECT COALESCE(MAX(pass), 0) + 1 FROM passes WHERE task_id = ? AND agent = 'inspector'",
+            (task_id,),
+        ).fetchone()
+        pass_no = int(row[0])
+        conn.execute(
+            "INSERT INTO reviews (task_id, pass, base_commit, head_commit, mode, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (task_id, pass) DO UPDATE SET base_commit = excluded.base_commit, "
+            "head_commit = excluded.head_commit, mode = excluded.mode, recorded_at = excluded.recorded_at",
+            (task_id, pass_no, base_commit, head_commit, mode, time.time()),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return pass_no
+
+
+def record_rejection(
+    conn: sqlite3.Connection, task_id: Optional[str], who: str, report: Dict[str, Any]
+) -> int:
+    """Append a failure report to the rejection history; returns its id."""
+    work = (report.get("data") or {}).get("work") or {}
+    issues = work.get("issues") if isinstance(work.get("issues"), list) else []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        pass_no = None
+        if task_id is not None and who in ("builder", "inspector"):
+            row = conn.execute(
+                f"SELECT {who}_pass FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            pass_no = row[0] if row is not None else None
+        cursor = conn.execute(
+            "INSERT INTO rejections (task_id, who, pass, status, reason, outcome, report, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                task_id,
+                who,
+                pass_no,
+                report.get("status"),
+                report.get("reason") or "unknown",
+                (report.get("runner") or {}).get("outcome"),
+                json.dumps(report, ensure_ascii=False),
+                time.time(),
+            ),
+        )
+        rejection_id = int(cursor.lastrowid)
+        rows = []
+        for index, issue in enumerate(issues):
+            if not isinstance(issue, dict):
+                continue
+            paths = [p for p in issue.get("paths") or [] if isinstance(p, str)] or [None]
+            for path in paths:
+                rows.append(
+                    (rejection_id, index, issue.get("severity"), path, issue.get("description"))
+                )
+        conn.executemany(
+            "INSERT INTO rejection_issues (rejection_id, issue, severity, path, description) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return rejection_id
+
+
+def rejection_filters(
+    task_id: Optional[str] = None,
+    reason: Optional[str] = None,
+    severity: Optional[str] = None,
+    path: Optional[str] = None,
+    since: Optional[float] = None,
+) -> Tuple[str, List[Any]]:
+    clauses, params = [], []
+    for column, value in (("r.task_id", task_id), ("r.reason", reason)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("r.recorded_at >= ?")
+        params.append(since)
+    if severity is not None or path is not None:
+        sub = ["i.rejection_id = r.id"]
+        if severity is not None:
+            sub.append("i.severity = ?")
+            params.append(severity)
+        if path is not None:
+            sub.append("i.path = ?")
+            params.append(path)
+        clauses.append(f"EXISTS (SELECT 1 FROM rejection_issues i WHERE {' AND '.join(sub)})")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def top_rejections(
+    conn: sqlite3.Connection, by: str, limit: int = 20, **filters: Any
+) -> List[Dict[str, Any]]:
+    """Aggregate the history in SQL; reports are never loaded."""
+    where, params = rejection_filters(**filters)
+    if by == "paths":
+        sql = (
+            "SELECT i.path, COUNT(DISTINCT i.rejection_id || ':' || i.issue) AS issues, "
+            "COUNT(DISTINCT r.task_id) AS tasks, "
+            "SUM(i.severity = 'blocker') AS blocker, SUM(i.severity = 'major') AS major, "
+            "SUM(i.severity = 'minor') AS minor, MAX(r.recorded_at) AS last_seen "
+            f"FROM rejection_issues i JOIN rejections r ON r.id = i.rejection_id{where}"
+            + (" AND" if where else " WHERE")
+            + " i.path IS NOT NULL GROUP BY i.path ORDER BY issues DESC, last_seen DESC LIMIT ?"
+        )
+    elif by == "tasks":
+        sql = (
+            "SELECT r.task_id, SUM(r.reason = 'changes_requested') AS changes_requested, "
+            "COUNT(*) AS rejections, MAX(r.recorded_at) AS last_seen "
+            f"FROM rejections r{where} GROUP BY r.task_id "
+            "ORDER BY changes_requested DESC, rejections DESC LIMIT ?"
+        )
+    elif by == "reasons":
+        sql = (
+            "SELECT r.reason, COUNT(*) AS rejections, COUNT(DISTINCT r.task_id) AS tasks, "
+            f"MAX(r.recorded_at) AS last_seen FROM rejections r{where} "
+            "GROUP BY r.reason ORDER BY rejections DESC LIMIT ?"
+        )
+    elif by == "severities":
+        sql = (
+            "SELECT i.severity, COUNT(DISTINCT i.rejection_id || ':' || i.issue) AS issues, "
+            "COUNT(DISTINCT r.task_id) AS tasks "
+            f"FROM rejection_issues i JOIN rejections r ON r.id = i.rejection_id{where} "
+            "GROUP BY i.severity ORDER BY issues DESC LIMIT ?"
+        )
+    else:
+        raise ValueError(f"unknown grouping: {by}")
+    return [dict(row) for row in conn.execute(sql, (*params, limit))]
+
+
+def list_rejections(
+    conn: sqlite3.Connection, limit: int = 20, with_report: bool = False, **filters: Any
+) -> List[Dict[str, Any]]:
+    where, params = rejection_filters(**filters)
+    columns = "r.id, r.task_id, r.who, r.pass, r.status, r.reason, r.outcome, r.recorded_at"
+    rows = conn.execute(
+        f"SELECT {columns}{', r.report' if with_report else ''}, "
+        "(SELECT COUNT(DISTINCT i.issue) FROM rejection_issues i WHERE i.rejection_id = r.id) AS issues "
+        f"FROM rejections r{where} ORDER BY r.recorded_at DESC, r.id DESC LIMIT ?",
+        (*params, limit),
+    )
+    out = []
+    for row in rows:
+        entry = dict(row)
+        if with_report:
+            entry["report"] = json.loads(entry["report"])
+        out.append(entry)
+    return out
+
+
+def last_reviewed_commit(conn: sqlite3.Connection, task_id: str) -> Optional[Dict[str, Any]]:
+    """Latest diff the Inspector actually completed a review of (its handoff was valid)."""
+    row = conn.execute(
+        "SELECT r.pass, r.head_commit, r.mode FROM reviews r "
+        "JOIN passes p ON p.task_id = r.task_id AND p.agent = 'inspector' AND p.pass = r.pass "
+        "WHERE r.task_id = ? AND p.status = 'valid' "
+        "ORDER BY r.pass DESC LIMIT 1",
+        (task_id,),
+    ).fetchone()
+    return dict(row) if row is not None else None
+
+
+def change_request_text(stored: Optional[str]) -> str:
+    """Builder-prompt text for a stored change request, as the workflow's Update Retry State writes it.
+
+    Inspector rejections are stored as {"issues", "next_tasks"} JSON; pre-flight
+    failures are already text.
+    """
+    if not stored:
+        return ""
+    try:
+        data = json.loads(stored)
+    except json.JSONDecodeError:
+        return stored
+    if not isinstance(data, dict):
+        return stored
+    issues = [i for i in data.get("issues") or [] if isinstance(i, dict)]
+    lines = []
+    for index, issue in enumerate(issues, 1):
+        severity = f"[{issue['severity']}] " if issue.get("severity") else ""
+        text = f"{index}. {severity}{issue.get('description') or ''}"
+        if issue.get("paths"):
+            text += "\n  Paths: " + ", ".join(str(p) for p in issue["paths"])
+        lines.append(text.strip())
+    sections = []
+    if lines:
+        sections.append("ISSUES:\n" + "\n\n".join(lines))
+    next_tasks = data.get("next_tasks") or []
+    if next_tasks:
+        sections.append("NEXT TASKS:\n" + "\n".join(f"- {t}" for t in next_tasks))
+    return "\n\n".join(sections)
+
+
+def resume_point(conn: sqlite3.Connection, task_id: str) -> Dict[str, Any]:
+    """Where an interrupted task picks up, with what the next Builder pass needs.
+
+    `next_builder_pass` and `change_requests` let a Builder resumed after a
+    rejection start the revision pass instead of the initial one. Only a
+    `done` task is final; a failed one resumes like an interrupted one once
+    `reopen_task` has put it back to `running`.
+    """
+    row = conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+    if row is None:
+        return {
+            "task_id": task_id,
+            "known": False,
+            "next_phase": PHASES[0],
+            "next_builder_pass": 1,
+            "change_requests": "",
+        }
+
+    task = dict(row)
+    if task["status"] == "done":
+        next_phase = "done"
+    elif task["phase"] is None:
+        next_phase = PHASES[0]
+    else:
+        next_phase = NEXT_PHASE[task["phase"]]
+    return {
+        "task_id": task_id,
+        "known": True,
+        "status": task["status"],
+        "last_phase": task["phase"],
+        "next_phase": next_phase,
+        **{name: task[name] for name in TASK_COUNTERS},
+        "next_builder_pass": task["builder_pass"] + 1,
+        "change_requests": change_request_text(task["change_requests"]),
+    }
+
+
+def task_status(
+    conn: sqlite3.Connection, task_id: Optional[str] = None, status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    if task_id is not None:
+        rows = conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchall()
+    elif status is not None:
+        rows = conn.execute(
+            "SELECT * FROM tasks WHERE status = ? ORDER BY updated_at DESC", (status,)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM tasks ORDER BY updated_at DESC").fetchall()
+    return [dict(row) for row in rows]
+
+
+def safe_update(action, *args: Any, **kwargs: Any) -> Any:
+    """Run a store update from a pipeline tool without ever failing the tool itself."""
+    try:
+        conn = connect()
+        try:
+            return action(conn, *args, **kwargs)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[foreman_state] update skipped: {e}", file=sys.stderr)
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query and update the Foreman task state store.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_status = sub.add_parser("status", help="List tasks (optionally filtered)")
+    p_status.add_argument("--task-id")
+    p_status.add_argument("--status")
+
+    p_phase = sub.add_parser("phase", help="Record a phase transition")
+    p_phase.add_argument("--task-id", required=True)
+    p_phase.add_argument("--phase", required=True, choices=PHASES)
+    p_phase.add_argument("--status", required=True, choices=["started", "ok", "failed"])
+
+    p_resume = sub.add_parser("resume", help="Print where an interrupted task should resume")
+    p_resume.add_argument("--task-id", required=True)
+    p_resume.add_argument(
+        "--reopen", action="store_true", help="Start a new run of a failed task first"
+    )
+
+    p_finish = sub.add_parser("finish", help="Mark a task done or failed")
+    p_finish.add_argument("--task-id", required=True)
+    p_finish.add_argument("--status", required=True, choices=["done", "failed"])
+    p_finish.add_argument("--reason")
+    p_finish.add_argument("--pr-url")
+
+    p_rej = sub.add_parser("rejections", help="Query the rejection history")
+    p_rej.add_argument("--top", choices=REJECTION_TOPS, help="Group and rank instead of listing")
+    p_rej.add_argument("--task-id")
+    p_rej.add_argument("--reason")
+    p_rej.add_argument("--severity")
+    p_rej.add_argument("--path")
+    p_rej.add_argument("--since-hours", type=float)
+    p_rej.add_argument("--limit", type=int, default=20)
+    p_rej.add_argument("--reports", action="store_true", help="Include the full reports when listing")
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+    try:
+        if args.command == "status":
+            out: Any = task_status(conn, args.task_id, args.status)
+        elif args.command == "phase":
+            record_phase(conn, args.task_id, args.phase, args.status)
+            out = resume_point(conn, args.task_id)
+        elif args.command == "resume":
+            if args.reopen:
+                reopen_task(conn, args.task_id)
+            out = resume_point(conn, args.task_id)
+        elif args.command == "rejections":
+            filters = {
+                "task_id": args.task_id,
+                "reason": args.reason,
+                "severity": args.severity,
+                "path": args.path,
+                "since": time.time() - args.since_hours * 3600 if args.since_hours else None,
+            }
+            if args.top:
+                out = top_rejections(conn, args.top, args.limit, **filters)
+            else:
+                out = list_rejections(conn, args.limit, args.reports, **filters)
+        else:
+            finish_task(conn, args.task_id, args.status, args.reason, args.pr_url)
+            out = resume_point(conn, args.task_id)
+    finally:
+        conn.close()
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from contracts import validate
+from git_state import changed_files
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Latest checker output per task and agent; Log Rejection passes it by path.
+HANDOFF_DIR = os.environ.get(
+    "FOREMAN_HANDOFF_DIR", os.path.join(FOREMAN_DIR, ".tmp", "handoffs")
+)
+
+
+def get_changed_files(cwd: Optional[str] = None) -> List[Dict[str, str]]:
+    return changed_files(cwd)
+
+
+def check_handoff(kind: str, worktree: str) -> Dict[str, Any]:
+    """Validate `<kind>_result.json` in `worktree` and build the handoff checker output."""
+    filename = f"{kind}_result.json"
+    result_path = os.path.join(worktree, filename)
+
+    input_data: Any = None
+    errors: List[Dict[str, Any]] = []
+    status: str
+
+    try:
+        with open(result_path, "r", encoding="utf-8") as f:
+            input_data = json.load(f)
+    except FileNotFoundError:
+        status = "file_missing"
+        errors.append(
+            {
+                "path": filename,
+                "code": "file_missing",
+                "message": f"{filename} not found in worktree root",
+            }
+        )
+    except json.JSONDecodeError as e:
+        status = "invalid_json"
+        errors.append(
+            {
+                "path": filename,
+                "code": "invalid_json",
+                "message": f"{filename} is not valid JSON: {e}",
+            }
+        )
+    else:
+        validation = validate(kind, input_data)
+        if bool(validation.get("ok")):
+            status = "valid"
+        else:
+            status = "invalid_schema"
+            errors.extend(validation.get("errors", []))
+
+    data: Dict[str, Any] = {"run": None, "work": None}
+    if status == "valid" and isinstance(input_data, dict):
+        run = input_data.get("run")
+        work = input_data.get("work")
+        if isinstance(run, dict):
+            data["run"] = {
+                "status": run.get("status"),
+                "failed_step": run.get("failed_step"),
+                "error": run.get("error"),
+            }
+        if isinstance(work, dict) or work is None:
+            data["work"] = work
+
+    return {
+        "kind": kind,
+        "status": status,
+        "errors": errors,
+        "data": data,
+        "changed_files": get_changed_files(worktree),
+    }
+
+
+def output_path(kind: str, task_id: str) -> str:
+    return os.path.join(HANDOFF_DIR, f"{task_id}.{kind}.json")
+
+
+def save_output(kind: str, task_id: str, output: Dict[str, Any]) -> None:
+    path = output_path(kind, task_id)
+    try:
+        os.makedirs(HANDOFF_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[handoff] {path} not written: {e}", file=sys.stderr)
+
+
+def rejection_report(payload: Any, status: Optional[str], reason: str) -> Dict[str, Any]:
+    """Rejection history entry for a checker (or pre-flight) output."""
+    if not isinstance(payload, dict):
+        payload = {}
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        data = {}
+    return {
+        "status": status if status is not None else payload.get("status"),
+        "reason": reason,
+        "errors": payload.get("errors"),
+        "data": {
+            "run": data.get("run"),
+            "work": data.get("work"),
+        },
+        # agent_runner outcome (exit code, signal, timed_out, duration, peak RSS), when known
+        "runner": payload.get("runner"),
+    }
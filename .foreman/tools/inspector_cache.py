@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from contracts import validate
+from git_state import worktree_tree_hash
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get(
+    "FOREMAN_INSPECTOR_CACHE", os.path.join(FOREMAN_DIR, ".tmp", "inspector_cache")
+)
+MAX_BYTES = int(os.environ.get("FOREMAN_INSPECTOR_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+CACHE_VERSION = 1
+
+RESULT_NAME = "inspector_result.json"
+DIFF_NAME = "inspector_diff.patch"
+RULEBOOK_NAME = "REVIEW_RULEBOOK.md"
+# Same exclusions as the pre-flight tree hash: handoff files are outputs, not inputs.
+TREE_EXCLUDES = (
+    "builder_result.json",
+    RESULT_NAME,
+    DIFF_NAME,
+    "inspector_diff.manifest.json",
+    "session-log",
+    ".opencode/session-log",
+)
+COUNTERS = ("hits", "misses", "bypasses", "stores", "evictions")
+
+
+def objects_dir() -> str:
+    return os.path.join(CACHE_DIR, "objects")
+
+
+def object_path(key: str) -> str:
+    return os.path.join(objects_dir(), key[:2], f"{key}.json")
+
+
+def pending_path(task_id: str) -> str:
+    return os.path.join(CACHE_DIR, "pending", f"{task_id}.key")
+
+
+@contextlib.contextmanager
+def cache_lock() -> Iterator[None]:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_stats() -> Dict[str, int]:
+    try:
+        with open(os.path.join(CACHE_DIR, "stats.json"), "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        stats = {}
+    return {name: int(stats.get(name, 0)) for name in COUNTERS}
+
+
+def bump(**deltas: int) -> None:
+    with cache_lock():
+        stats = read_stats()
+        for name, delta in deltas.items():
+            stats[name] += delta
+        path = os.path.join(CACHE_DIR, "stats.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        os.replace(path + ".tmp", path)
+
+
+def read_bytes(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def cache_key(worktree: str, prompt_file: str) -> str:
+    """sha256 over everything the Inspector decides on.
+
+    The prompt file already holds the Inspector template, the task prompt and the
+    review-diff note. The worktree tree hash pins the code the Inspector checks
+    out and runs; the diff alone would not, since a delta diff can repeat.
+    """
+    digest = hashlib.sha256()
+    parts = [
+        str(CACHE_VERSION).encode("utf-8"),
+        read_bytes(os.path.join(worktree, DIFF_NAME)),
+        read_bytes(prompt_file),
+        read_bytes(os.path.join(worktree, RULEBOOK_NAME)),
+        worktree_tree_hash(worktree, TREE_EXCLUDES).encode("utf-8"),
+    ]
+    for part in parts:
+        # Length-prefix every part so moving bytes between parts changes the key.
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    path = object_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    # Touch for LRU ordering.
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return entry
+
+
+def entries() -> List[Dict[str, Any]]:
+    found = []
+    root = objects_dir()
+    if not os.path.isdir(root):
+        return found
+    for shard in os.listdir(root):
+        shard_dir = os.path.join(root, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        for name in os.listdir(shard_dir):
+            path = os.path.join(shard_dir, name)
+            with contextlib.suppress(OSError):
+                st = os.stat(path)
+                found.append({"path": path, "size": st.st_size, "used": st.st_mtime})
+    return found
+
+
+def evict(max_bytes: int) -> int:
+    """Drop least recently used entries until the store fits in `max_bytes`."""
+    with cache_lock():
+        current = sorted(entries(), key=lambda e: e["used"])
+        total = sum(e["size"] for e in current)
+        evicted = 0
+        for entry in current:
+            if total <= max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(entry["path"])
+                total -= entry["size"]
+                evicted += 1
+    return evicted
+
+
+def store(key: str, result: Dict[str, Any], task_id: Optional[str], max_bytes: int) -> bool:
+    # Only decisions that passed the contract and come from a completed run are reusable.
+    if not validate("inspector", result)["ok"] or (result.get("run") or {}).get("status") != "ok":
+        return False
+    path = object_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "task_id": task_id, "stored_at": time.time(), "result": result}, f)
+    os.replace(tmp, path)
+    evicted = evict(max_bytes)
+    bump(stores=1, evictions=evicted)
+    return True
+
+
+def store_pending(task_id: str, worktree: str, max_bytes: int = MAX_BYTES) -> Dict[str, Any]:
+    """Cache the worktree's inspector_result.json under the key computed before the run."""
+    try:
+        with open(pending_path(task_id), "r", encoding="utf-8") as f:
+            key = f.read().strip()
+    except OSError:
+        return {"stored": False, "reason": "no_pending_key"}
+    try:
+        with open(os.path.join(worktree, RESULT_NAME), "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"stored": False, "key": key, "reason": "result_unreadable"}
+    stored = store(key, result, task_id, max_bytes)
+    if stored:
+        os.remove(pending_path(task_id))
+    return {"stored": stored, "key": key, "reason": None if stored else "not_cacheable"}
+
+
+def lookup_main(args: argparse.Namespace) -> int:
+    key = cache_key(args.worktree, args.prompt_file)
+    os.makedirs(os.path.dirname(pending_path(args.task_id)), exist_ok=True)
+    with open(pending_path(args.task_id), "w", encoding="utf-8") as f:
+        f.write(key)
+
+    entry = None if args.bypass else lookup(key)
+    if args.bypass:
+        bump(bypasses=1)
+    elif entry is None:
+        bump(misses=1)
+    else:
+        bump(hits=1)
+        with open(os.path.join(args.worktree, RESULT_NAME), "w", encoding="utf-8") as f:
+            json.dump(entry["result"], f, indent=2)
+            f.write("\n")
+        os.remove(pending_path(args.task_id))
+
+    json.dump({"hit": entry is not None, "bypass": args.bypass, "key": key}, sys.stdout)
+    sys.stdout.write("\n")
+    # Exit status drives the workflow: 0 = result restored, 1 = run the Inspector.
+    return 0 if entry is not None else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Content-addressed cache of Inspector decisions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_key = sub.add_parser("key", help="Print the cache key for a worktree + prompt")
+    p_key.add_argument("--worktree", default=os.getcwd())
+    p_key.add_argument("--prompt-file", required=True)
+
+    p_lookup = sub.add_parser("lookup", help="Restore a cached inspector_result.json (exit 0 on hit)")
+    p_lookup.add_argument("--worktree", default=os.getcwd())
+    p_lookup.add_argument("--prompt-file", required=True)
+    p_lookup.add_argument("--task-id", required=True)
+    p_lookup.add_argument("--bypass", action="store_true", help="Force a fresh review")
+
+    p_store = sub.add_parser("store", help="Cache the result of the run started after `lookup`")
+    p_store.add_argument("--worktree", default=os.getcwd())
+    p_store.add_argument("--task-id", required=True)
+
+    sub.add_parser("stats", help="Show hit/miss counters and store size")
+
+    p_evict = sub.add_parser("evict", help="Shrink the store to --max-bytes")
+    p_evict.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+
+    args = parser.parse_args()
+
+    if args.command == "lookup":
+        return lookup_main(args)
+    if args.command == "key":
+        out: Any = {"key": cache_key(args.worktree, args.prompt_file)}
+    elif args.command == "store":
+        out = store_pending(args.task_id, args.worktree)
+    elif args.command == "stats":
+        current = entries()
+        stats = read_stats()
+        lookups = stats["hits"] + stats["misses"]
+        out = {
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else None,
+            "entries": len(current),
+            "bytes": sum(e["size"] for e in current),
+            "max_bytes": MAX_BYTES,
+        }
+    else:
+        evicted = evict(args.max_bytes)
+        bump(evictions=evicted)
+        out = {"evicted": evicted}
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
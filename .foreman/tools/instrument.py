@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set FOREMAN_EVENTS_FILE to an empty string to disable event recording.
+EVENTS_PATH = os.environ.get(
+    "FOREMAN_EVENTS_FILE", os.path.join(FOREMAN_DIR, ".tmp", "events.jsonl")
+)
+METRICS_PORT = int(os.environ.get("FOREMAN_METRICS_PORT", "9464"))
+
+# Histogram bucket upper bounds in seconds (agent runs take minutes, git calls milliseconds).
+BUCKETS = [0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600]
+
+
+def emit(event: Dict[str, Any], path: Optional[str] = None) -> None:
+    """Append one event line. Never raises: metrics must not fail a pipeline step."""
+    path = EVENTS_PATH if path is None else path
+    if not path:
+        return
+    line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # One write() per line keeps concurrent writers from interleaving.
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+class Span:
+    """Times a phase and emits it as one event on exit.
+
+    Child CPU/RSS come from RUSAGE_CHILDREN, i.e. children reaped while the span
+    was open; spans running concurrently in one process share that counter.
+    RUSAGE_CHILDREN only keeps the lifetime peak RSS, so child_maxrss_kb is set
+    only when a child in this span raised it, and is None otherwise.
+    """
+
+    def __init__(
+        self,
+        phase: str,
+        task_id: Optional[str] = None,
+        pass_no: Optional[int] = None,
+        **attrs: Any,
+    ) -> None:
+        self.phase = phase
+        self.task_id = task_id
+        self.pass_no = pass_no
+        self.attrs = attrs
+        self.status = "ok"
+        self.exit_code: Optional[int] = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self._self = resource.getrusage(resource.RUSAGE_SELF)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        self.duration = time.perf_counter() - self._t0
+        if exc_type is not None and self.status == "ok":
+            self.status = "error"
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        grew = children.ru_maxrss > self._children.ru_maxrss
+        emit(
+            {
+                "ts": round(self.start, 3),
+                "phase": self.phase,
+                "task_id": self.task_id,
+                "pass": self.pass_no,
+                "duration": round(self.duration, 4),
+                "status": self.status,
+                "exit_code": self.exit_code,
+                "child_utime": round(children.ru_utime - self._children.ru_utime, 4),
+                "child_stime": round(children.ru_stime - self._children.ru_stime, 4),
+                # ru_maxrss is in KiB on Linux; when it grew, the new peak is from this span.
+                "child_maxrss_kb": children.ru_maxrss if grew else None,
+                "utime": round(own.ru_utime - self._self.ru_utime, 4),
+                "stime": round(own.ru_stime - self._self.ru_stime, 4),
+                "pid": os.getpid(),
+                **self.attrs,
+            }
+        )
+        return False
+
+
+def span(phase: str, task_id: Optional[str] = None, pass_no: Optional[int] = None, **attrs: Any) -> Span:
+    return Span(phase, task_id, pass_no, **attrs)
+
+
+def record(
+    phase: str,
+    duration: float,
+    task_id: Optional[str] = None,
+    pass_no: Optional[int] = None,
+    status: str = "ok",
+    **attrs: Any,
+) -> None:
+    """Emit a span measured elsewhere (e.g. queue wait, or from a shell step)."""
+    emit(
+        {
+            "ts": round(time.time() - duration, 3),
+            "phase": phase,
+            "task_id": task_id,
+            "pass": pass_no,
+            "duration": round(duration, 4),
+            "status": status,
+            "pid": os.getpid(),
+            **attrs,
+        }
+    )
+
+
+def iter_events(f: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        if not line.endswith(b"\n"):
+            # Partially written; picked up on the next read.
+            f.seek(-len(line), os.SEEK_CUR)
+            return
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(event, dict) and isinstance(event.get("duration"), (int, float)):
+            yield event
+
+
+class Aggregate:
+    """Per (phase, status) histograms, folded in incrementally from the events file."""
+
+    def __init__(self, keep_samples: bool = False) -> None:
+        self.series: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.keep_samples = keep_samples
+        self.offset = 0
+        self.inode: Optional[int] = None
+
+    def add(self, event: Dict[str, Any]) -> None:
+        key = (str(event.get("phase")), str(event.get("status")))
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {
+                "count": 0,
+                "sum": 0.0,
+                "buckets": [0] * len(BUCKETS),
+                "child_cpu": 0.0,
+                "cpu": 0.0,
+                "child_maxrss_kb": 0,
+                "samples": [],
+            }
+        duration = float(event["duration"])
+        series["count"] += 1
+        series["sum"] += duration
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                series["buckets"][i] += 1
+        series["child_cpu"] += float(event.get("child_utime") or 0) + float(event.get("child_stime") or 0)
+        series["cpu"] += float(event.get("utime") or 0) + float(event.get("stime") or 0)
+        series["child_maxrss_kb"] = max(series["child_maxrss_kb"], int(event.get("child_maxrss_kb") or 0))
+        if self.keep_samples:
+            series["samples"].append(duration)
+
+    def refresh(self, path: str, since: Optional[float] = None) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.series.clear()
+            self.offset = 0
+            self.inode = st.st_ino
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            for event in iter_events(f):
+                if since is None or float(event.get("ts") or 0) >= since:
+                    self.add(event)
+            self.offset = f.tell()
+
+
+def label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(agg: Aggregate) -> str:
+    out = [
+        "# HELP foreman_phase_duration_seconds Wall time of Foreman pipeline phases.",
+        "# TYPE foreman_phase_duration_seconds histogram",
+    ]
+    for (phase, status), s in sorted(agg.series.items()):
+        labels = f'phase="{label(phase)}",status="{label(status)}"'
+        for bound, count in zip(BUCKETS, s["buckets"]):
+            out.append(f'foreman_phase_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        out.append(f'foreman_phase_duration_seconds_bucket{{{labels},le="+Inf"}} {s["count"]}')
+        out.append(f"foreman_phase_duration_seconds_sum{{{labels}}} {s['sum']:.4f}")
+        out.append(f"foreman_phase_duration_seconds_count{{{labels}}} {s['count']}")
+    for name, key, help_text, kind in (
+        ("foreman_phase_child_cpu_seconds_total", "child_cpu", "CPU time of child processes.", "counter"),
+        ("foreman_phase_cpu_seconds_total", "cpu", "CPU time of the tool process itself.", "counter"),
+        ("foreman_phase_child_max_rss_bytes", "child_maxrss_kb", "Largest child RSS seen.", "gauge"),
+    ):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        for (phase, status), s in sorted(agg.series.items()):
+            value = s[key] * 1024 if key == "child_maxrss_kb" else round(s[key], 4)
+            out.append(f'{name}{{phase="{label(phase)}",status="{label(status)}"}} {value}')
+    return "\n".join(out) + "\n"
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return round(ordered[index], 4)
+
+
+def report(agg: Aggregate) -> List[Dict[str, Any]]:
+    rows = []
+    for (phase, status), s in sorted(agg.series.items()):
+        rows.append(
+            {
+                "phase": phase,
+                "status": status,
+                "count": s["count"],
+                "total": round(s["sum"], 3),
+                "mean": round(s["sum"] / s["count"], 4),
+                "p50": percentile(s["samples"], 0.5),
+                "p95": percentile(s["samples"], 0.95),
+                "p99": percentile(s["samples"], 0.99),
+                "max": round(max(s["samples"]), 4) if s["samples"] else None,
+                "child_cpu": round(s["child_cpu"], 3),
+                "child_maxrss_kb": s["child_maxrss_kb"],
+            }
+        )
+    return rows
+
+
+def serve(path: str, host: str, port: int) -> None:
+    # Only `serve` needs it; every span-recording tool imports this module.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    agg = Aggregate()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            with lock:
+                agg.refresh(path)
+                body = render_prometheus(agg).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"[instrument] serving {path} on http://{host}:{port}/metrics", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def run_main(args: argparse.Namespace) -> int:
+    cmd = args.cmd[1:] if args.cmd and args.cmd[0] == "--" else args.cmd
+    if not cmd:
+        print("instrument.py run: missing command after --", file=sys.stderr)
+        return 2
+    with span(args.phase, args.task_id, args.pass_no) as s:
+        try:
+            returncode = subprocess.call(cmd)
+        except OSError as e:
+            print(f"instrument.py run: {e}", file=sys.stderr)
+            returncode = 127
+        s.exit_code = returncode
+        s.status = "ok" if returncode == 0 else "failed"
+    return returncode
+
+
+def main() -> int:
+    global EVENTS_PATH
+
+    parser = argparse.ArgumentParser(description="Foreman span events and metrics.")
+    parser.add_argument(
+        "--events", help="Events JSONL file (default: $FOREMAN_EVENTS_FILE or .foreman/.tmp/events.jsonl)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run a command and record it as a span")
+    p_run.add_argument("--phase", required=True)
+    p_run.add_argument("--task-id")
+    p_run.add_argument("--pass", dest="pass_no", type=int)
+    p_run.add_argument("cmd", nargs=argparse.REMAINDER)
+
+    p_emit = sub.add_parser("emit", help="Record a span measured elsewhere")
+    p_emit.add_argument("--phase", required=True)
+    p_emit.add_argument("--duration", type=float, required=True)
+    p_emit.add_argument("--task-id")
+    p_emit.add_argument("--pass", dest="pass_no", type=int)
+    p_emit.add_argument("--status", default="ok")
+
+    p_report = sub.add_parser("report", help="One-shot per-phase summary")
+    p_report.add_argument("--since", type=float, help="Only events after this many hours ago")
+    p_report.add_argument("--format", choices=["json", "prometheus"], default="json")
+
+    p_serve = sub.add_parser("serve", help="Serve Prometheus metrics")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=METRICS_PORT)
+
+    args = parser.parse_args()
+
+    if args.events is not None:
+        EVENTS_PATH = args.events
+
+    if args.command == "run":
+        return run_main(args)
+    if args.command == "emit":
+        record(args.phase, args.duration, args.task_id, args.pass_no, args.status)
+        return 0
+    if args.command == "serve":
+        serve(EVENTS_PATH, args.host, args.port)
+        return 0
+
+    agg = Aggregate(keep_samples=True)
+    agg.refresh(EVENTS_PATH, since=time.time() - args.since * 3600 if args.since else None)
+    if args.format == "prometheus":
+        sys.stdout.write(render_prometheus(agg))
+    else:
+        json.dump(report(agg), sys.stdout)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
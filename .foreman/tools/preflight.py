@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from foreman_state import record_preflight, record_rejection, safe_update, task_id_for_worktree
+from git_state import worktree_tree_hash
+from handoff import rejection_report, save_output
+from instrument import span
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get(
+    "FOREMAN_PREFLIGHT_CACHE", os.path.join(FOREMAN_DIR, ".tmp", "preflight")
+)
+PACKAGE_DIR = "components"
+CACHE_VERSION = 1
+MAX_ERRORS_PER_CHECK = 50
+
+# Handoff artifacts and logs do not change what the checks see.
+TREE_EXCLUDES = (
+    "builder_result.json",
+    "inspector_result.json",
+    "inspector_diff.patch",
+    "inspector_diff.manifest.json",
+    "session-log",
+    ".opencode/session-log",
+)
+
+Errors = List[Dict[str, str]]
+
+ESLINT_FILE_RE = re.compile(r"^(/\S.*)$")
+ESLINT_ROW_RE = re.compile(r"^\s+(\d+):(\d+)\s+error\s+(.*?)(?:\s{2,}(\S+))?$")
+SVELTE_CHECK_RE = re.compile(r'^\d+ ERROR "(.+?)" (\d+):(\d+) "(.*)"$')
+PRETTIER_RE = re.compile(r"^\[warn\] (?!Code style issues)(.+)$")
+
+
+def package_path(path: str, package_root: str) -> str:
+    """Report paths relative to the worktree (`components/src/...`)."""
+    if os.path.isabs(path):
+        path = os.path.relpath(path, package_root)
+    return f"{PACKAGE_DIR}/{path}"
+
+
+def parse_lint(output: str, package_root: str, report: Optional[str]) -> Errors:
+    errors: Errors = []
+    current_file: Optional[str] = None
+    for line in output.splitlines():
+        prettier = PRETTIER_RE.match(line)
+        if prettier:
+            errors.append(
+                {
+                    "path": package_path(prettier.group(1).strip(), package_root),
+                    "code": "lint.prettier",
+                    "message": "file is not formatted; run `pnpm format` in components/",
+                }
+            )
+            continue
+        file_match = ESLINT_FILE_RE.match(line)
+        if file_match:
+            current_file = file_match.group(1).strip()
+            continue
+        row = ESLINT_ROW_RE.match(line)
+        if row and current_file:
+            rule = row.group(4) or "error"
+            errors.append(
+                {
+                    "path": f"{package_path(current_file, package_root)}:{row.group(1)}:{row.group(2)}",
+                    "code": f"lint.eslint.{rule}",
+                    "message": row.group(3).strip(),
+                }
+            )
+    return errors
+
+
+def parse_check(output: str, package_root: str, report: Optional[str]) -> Errors:
+    errors: Errors = []
+    for line in output.splitlines():
+        match = SVELTE_CHECK_RE.match(line.strip())
+        if match:
+            path, line_no, col, message = match.groups()
+            errors.append(
+                {
+                    "path": f"{package_path(path, package_root)}:{line_no}:{col}",
+                    "code": "check.svelte_check",
+                    "message": message.replace('\\"', '"'),
+                }
+            )
+    return errors
+
+
+def parse_test(output: str, package_root: str, report: Optional[str]) -> Errors:
+    if not report:
+        return []
+    try:
+        with open(report, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+
+    errors: Errors = []
+    for suite in results.get("testResults") or []:
+        path = package_path(suite.get("name") or "", package_root)
+        failed = [t for t in suite.get("assertionResults") or [] if t.get("status") == "failed"]
+        for test in failed:
+            message = (test.get("failureMessages") or [""])[0].strip().splitlines()
+            errors.append(
+                {
+                    "path": path,
+                    "code": "test.failed",
+                    "message": f"{test.get('fullName') or test.get('title')}: {message[0] if message else 'failed'}",
+                }
+            )
+        if not failed and suite.get("status") == "failed":
+            errors.append(
+                {
+                    "path": path,
+                    "code": "test.suite_failed",
+                    "message": (suite.get("message") or "test file failed to run").strip()[:500],
+                }
+            )
+    return errors
+
+
+# Each check runs from components/. `{report}` is replaced by a temp file path.
+CHECKS: Dict[str, Dict[str, Any]] = {
+    "lint": {"cmd": ["pnpm", "lint"], "parse": parse_lint},
+    "check": {"cmd": ["pnpm", "check", "--output", "machine"], "parse": parse_check},
+    "test": {
+        "cmd": [
+            "pnpm",
+            "test:unit",
+            "--run",
+            "--reporter=default",
+            "--reporter=json",
+            "--outputFile.json={report}",
+        ],
+        "parse": parse_test,
+    },
+}
+# lint does not depend on the svelte-kit sync that check and the tests share, so
+# it runs alongside them; check and test stay sequential.
+LANES = [["lint"], ["check", "test"]]
+
+
+def run_check(name: str, package_root: str) -> Dict[str, Any]:
+    spec = CHECKS[name]
+    fd, report = tempfile.mkstemp(prefix=f"foreman-preflight-{name}-", suffix=".json")
+    os.close(fd)
+    cmd = [part.replace("{report}", report) for part in spec["cmd"]]
+    started = time.perf_counter()
+    with span(f"preflight.{name}") as s:
+        try:
+            proc = subprocess.run(
+                cmd,
+                cwd=package_root,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+        except OSError as e:
+            os.remove(report)
+            s.status = "error"
+            return {"name": name, "ok": False, "exit_code": None, "error": str(e), "errors": []}
+        s.exit_code = proc.returncode
+        s.status = "ok" if proc.returncode == 0 else "failed"
+
+    parse: Callable[[str, str, Optional[str]], Errors] = spec["parse"]
+    errors = parse(proc.stdout, package_root, report) if proc.returncode != 0 else []
+    os.remove(report)
+    if proc.returncode != 0 and not errors:
+        # Unknown output shape: hand the tail over verbatim rather than nothing.
+        tail = "\n".join(proc.stdout.strip().splitlines()[-20:])
+        errors = [{"path": PACKAGE_DIR, "code": f"{name}.failed", "message": tail}]
+    return {
+        "name": name,
+        "ok": proc.returncode == 0,
+        "exit_code": proc.returncode,
+        "duration": round(time.perf_counter() - started, 3),
+        "errors": errors[:MAX_ERRORS_PER_CHECK],
+    }
+
+
+def run_lane(names: List[str], package_root: str) -> List[Dict[str, Any]]:
+    return [run_check(name, package_root) for name in names]
+
+
+def config_digest(checks: List[str]) -> str:
+    spec = [(name, CHECKS[name]["cmd"]) for name in checks]
+    return hashlib.sha256(json.dumps([CACHE_VERSION, spec]).encode("utf-8")).hexdigest()[:12]
+
+
+def cache_file(tree: str, checks: List[str]) -> str:
+    return os.path.join(CACHE_DIR, f"{tree}-{config_digest(checks)}.json")
+
+
+def read_cached(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def write_cached(path: str, result: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def change_requests(errors: Errors) -> str:
+    lines = [f"{idx}. [{e['code']}] {e['path']}: {e['message']}" for idx, e in enumerate(errors, 1)]
+    return "PRE-FLIGHT FAILURES:\n" + "\n".join(lines)
+
+
+def preflight(worktree: str, checks: List[str], use_cache: bool = True) -> Dict[str, Any]:
+    started = time.perf_counter()
+    package_root = os.path.join(worktree, PACKAGE_DIR)
+    tree = worktree_tree_hash(worktree, TREE_EXCLUDES)
+    path = cache_file(tree, checks)
+
+    if use_cache:
+        cached = read_cached(path)
+        if cached is not None:
+            return {**cached, "cached": True, "duration": round(time.perf_counter() - started, 3)}
+
+    if not os.path.isdir(os.path.join(package_root, "node_modules")):
+        return {
+            "status": "error",
+            "tree": tree,
+            "cached": False,
+            "errors": [
+                {
+                    "path": f"{PACKAGE_DIR}/node_modules",
+                    "code": "missing",
+                    "message": "dependencies are not installed; run `pnpm install` in components/",
+                }
+            ],
+            "checks": [],
+            "duration": round(time.perf_counter() - started, 3),
+        }
+
+    lanes = [[name for name in lane if name in checks] for lane in LANES]
+    lanes = [lane for lane in lanes if lane]
+    with ThreadPoolExecutor(max_workers=len(lanes) or 1) as pool:
+        results = [r for lane in pool.map(lambda lane: run_lane(lane, package_root), lanes) for r in lane]
+    results.sort(key=lambda r: checks.index(r["name"]))
+
+    errors = [e for r in results for e in r["errors"]]
+    launch_failed = any(r["exit_code"] is None for r in results)
+    status = "error" if launch_failed else ("passed" if all(r["ok"] for r in results) else "failed")
+    result = {
+        "status": status,
+        "tree": tree,
+        "errors": errors,
+        "checks": [{k: v for k, v in r.items() if k != "errors"} for r in results],
+    }
+    if status == "failed":
+        result["change_requests"] = change_requests(errors)
+    if status != "error":
+        # Only cache real verdicts; a missing pnpm says nothing about the tree.
+        write_cached(path, result)
+    return {**result, "cached": False, "duration": round(time.perf_counter() - started, 3)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Run the components/ lint, type check and unit tests before the Inspector."
+    )
+    parser.add_argument("--worktree", default=os.getcwd())
+    parser.add_argument("--task-id", help="Record the outcome in the state store for this task")
+    parser.add_argument(
+        "--checks",
+        default=",".join(CHECKS),
+        help=f"Comma-separated subset of: {', '.join(CHECKS)}",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached results")
+    args = parser.parse_args()
+
+    checks = [name.strip() for name in args.checks.split(",") if name.strip()]
+    unknown = [name for name in checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+
+    task_id = args.task_id or task_id_for_worktree(args.worktree)
+    with span("preflight", task_id) as s:
+        result = preflight(args.worktree, checks, use_cache=not args.no_cache)
+        s.status = result["status"]
+        s.attrs["cached"] = result["cached"]
+    if args.task_id or os.environ.get("FOREMAN_TASK_ID"):
+        safe_update(record_preflight, task_id, result["status"], result.get("change_requests"))
+        save_output("preflight", task_id, result)
+        if result["status"] == "failed":
+            safe_update(
+                record_rejection,
+                task_id,
+                "preflight",
+                rejection_report(result, "preflight_failed", "preflight_failed"),
+            )
+
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
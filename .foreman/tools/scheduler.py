@@ -0,0 +1,177 @@
+import collections
+import itertools
+import os
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Concurrent runs per pool. Setup is `pnpm i` (I/O and CPU heavy, short); the
+# agents are long-running but mostly wait on the model.
+DEFAULT_SLOTS = {"setup": 2, "builder": 3, "inspector": 2}
+# Memory a run of each pool is expected to need; a run is only admitted while
+# MemAvailable minus what recently started runs will still claim covers it.
+DEFAULT_MEMORY_MB = {"setup": 1024, "builder": 1536, "inspector": 1024}
+# Admit while the 1-minute load average per CPU is below this.
+DEFAULT_MAX_LOAD = 1.5
+# Load and MemAvailable lag behind a freshly started run for about this long.
+RAMP_SECONDS = 60.0
+RECHECK_INTERVAL = 2.0
+WAIT_SAMPLES = 500
+
+
+def mem_available_mb() -> Optional[float]:
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def load_per_cpu() -> Optional[float]:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+class Ticket:
+    def __init__(self, pool: str, priority: int, rank: int, label: str, seq: int) -> None:
+        self.pool = pool
+        self.label = label
+        self.enqueued = time.monotonic()
+        self.started: Optional[float] = None
+        self.held = False
+        # Higher priority first, then later passes (in-flight tasks), then FIFO.
+        self.key = (-priority, -rank, seq)
+
+    @property
+    def waited(self) -> float:
+        return (self.started or time.monotonic()) - self.enqueued
+
+
+class Scheduler:
+    """Slot pools with priority queues and CPU/memory admission.
+
+    Callers block in `acquire()` until their run may start and must `release()`
+    the ticket afterwards.
+    """
+
+    def __init__(
+        self,
+        slots: Dict[str, int],
+        workers: int,
+        max_load: float = DEFAULT_MAX_LOAD,
+        memory_mb: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.slots = dict(slots)
+        self.workers = workers
+        self.max_load = max_load
+        self.memory_mb = {**DEFAULT_MEMORY_MB, **(memory_mb or {})}
+        self.cond = threading.Condition()
+        self.waiting: List[Tuple[Tuple[int, int, int], Ticket]] = []
+        self.running: List[Ticket] = []
+        self.seq = itertools.count()
+        self.completed: Dict[str, int] = collections.Counter()
+        self.waits: Dict[str, Deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=WAIT_SAMPLES)
+        )
+        self.resource_holds = 0
+
+    def pool_active(self, pool: str) -> int:
+        return sum(1 for t in self.running if t.pool == pool)
+
+    def next_ticket(self) -> Optional[Ticket]:
+        """Best waiting ticket whose pool has a free slot."""
+        if len(self.running) >= self.workers:
+            return None
+        for _, ticket in sorted(self.waiting):
+            if self.pool_active(ticket.pool) < self.slots.get(ticket.pool, 1):
+                return ticket
+        return None
+
+    def resources_ok(self, pool: str) -> bool:
+        if not self.running:
+            # Never stall an idle runner on someone else's load.
+            return True
+        load = load_per_cpu()
+        if load is not None and load >= self.max_load:
+            return False
+        available = mem_available_mb()
+        if available is None:
+            return True
+        now = time.monotonic()
+        ramping = sum(
+            self.memory_mb.get(t.pool, 0)
+            for t in self.running
+            if t.started is not None and now - t.started < RAMP_SECONDS
+        )
+        return available - ramping >= self.memory_mb.get(pool, 0)
+
+    def acquire(self, pool: str, priority: int = 0, rank: int = 0, label: str = "") -> Ticket:
+        with self.cond:
+            ticket = Ticket(pool, priority, rank, label, next(self.seq))
+            self.waiting.append((ticket.key, ticket))
+            self.cond.notify_all()
+            while True:
+                if self.next_ticket() is ticket:
+                    if self.resources_ok(pool):
+                        break
+                    if not ticket.held:
+                        ticket.held = True
+                        self.resource_holds += 1
+                # Load and memory change without notifications: re-check periodically.
+                self.cond.wait(RECHECK_INTERVAL)
+            self.waiting.remove((ticket.key, ticket))
+            ticket.started = time.monotonic()
+            self.running.append(ticket)
+            self.waits[pool].append(ticket.waited)
+            self.cond.notify_all()
+            return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        with self.cond:
+            if ticket in self.running:
+                self.running.remove(ticket)
+                self.completed[ticket.pool] += 1
+            self.cond.notify_all()
+
+    def drain(self) -> None:
+        with self.cond:
+            while self.running or self.waiting:
+                self.cond.wait(RECHECK_INTERVAL)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            now = time.monotonic()
+            pools = {}
+            for pool in sorted(set(self.slots) | {t.pool for _, t in self.waiting}):
+                waits = sorted(self.waits[pool])
+                queued = [t for _, t in self.waiting if t.pool == pool]
+                pools[pool] = {
+                    "slots": self.slots.get(pool, 1),
+                    "active": self.pool_active(pool),
+                    "queued": len(queued),
+                    "oldest_wait": round(max((now - t.enqueued for t in queued), default=0.0), 1),
+                    "completed": self.completed[pool],
+                    "wait_p50": round(waits[len(waits) // 2], 2) if waits else None,
+                    "wait_p95": round(waits[int(len(waits) * 0.95)], 2) if waits else None,
+                    "wait_max": round(waits[-1], 2) if waits else None,
+                }
+            load = load_per_cpu()
+            available = mem_available_mb()
+            return {
+                "workers": self.workers,
+                "queued": len(self.waiting),
+                "active": len(self.running),
+                "completed": sum(self.completed.values()),
+                "pools": pools,
+                "system": {
+                    "load_per_cpu": round(load, 2) if load is not None else None,
+                    "max_load": self.max_load,
+                    "mem_available_mb": round(available) if available is not None else None,
+                    "resource_holds": self.resource_holds,
+                },
+            }
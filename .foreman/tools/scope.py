@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import posixpath
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+from instrument import span
+
+BASE_REF = "main"
+# Checked out for every scoped task on top of its own scope: the OpenCode agent
+# config and the shared styles every component and route imports. Cone mode
+# also brings in the files at the repo root and directly in every parent of a
+# cone (package.json, lockfile, tsconfig, ...). Routes, e2e tests and static
+# assets are only checked out when the scope names them.
+BASE_CONES = [
+    part
+    for part in os.environ.get("FOREMAN_SCOPE_BASE", ".opencode,components/src/lib/styles").split(",")
+    if part.strip()
+]
+# The package entry re-exports the component packages. It is checked out with
+# any cone under LIB_DIR, and svelte-check then needs the packages it names.
+LIB_DIR = "components/src/lib"
+LIB_INDEX = f"{LIB_DIR}/index.ts"
+# Lives in the worktree's own git dir, so it moves with `git worktree move`
+# and never shows up in `git status`.
+SCOPE_FILE = "foreman_scope.json"
+# Foreman's own files are never out of scope.
+IGNORED_PATHS = [
+    "builder_result.json",
+    "inspector_result.json",
+    "inspector_diff.patch",
+    "inspector_diff.manifest.json",
+    "session-log",
+    ".opencode/session-log",
+]
+
+
+def git(*args: str, cwd: str) -> str:
+    proc = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def parse_scope(value: Union[str, List[str], None]) -> List[str]:
+    """Normalise `a/b, c` or ["a/b/", "./c"] to repo-relative paths."""
+    if not value:
+        return []
+    items = value if isinstance(value, list) else re.split(r"[,\s]+", value)
+    paths = []
+    for item in items:
+        path = str(item).strip().strip("`'\"")
+        if not path:
+            continue
+        path = posixpath.normpath(path).strip("/")
+        if posixpath.isabs(str(item).strip()) or path == ".." or path.startswith("../"):
+            raise ValueError(f"scope must be a path inside the repository: {item}")
+        if path != ".":
+            paths.append(path)
+    return sorted(set(paths))
+
+
+def covers(scope: List[str], path: str) -> bool:
+    return any(path == entry or path.startswith(entry + "/") for entry in scope)
+
+
+def cone_dirs(worktree: str, scope: List[str]) -> List[str]:
+    # Cones are directories: a file in the scope is checked out with its directory.
+    listing = git("ls-tree", "-z", BASE_REF, "--", *scope, cwd=worktree) if scope else ""
+    files = {
+        entry.split("\t", 1)[1]
+        for entry in listing.split("\0")
+        if "\t" in entry and entry.split(" ", 2)[1] == "blob"
+    }
+    wanted = {posixpath.dirname(path) if path in files else path for path in scope}
+    wanted |= set(parse_scope(BASE_CONES))
+    if any(covers([LIB_DIR], d) for d in wanted):
+        wanted |= set(lib_exports(worktree))
+    dirs = sorted(d for d in wanted if d)
+    return [d for d in dirs if not covers([other for other in dirs if other != d], d)]
+
+
+def lib_exports(worktree: str) -> List[str]:
+    """The package directories LIB_INDEX re-exports (`export * from './buttons'`)."""
+    proc = subprocess.run(
+        ["git", "show", f"{BASE_REF}:{LIB_INDEX}"], cwd=worktree, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return []
+    names = set(re.findall(r"""from\s+['"]\./([^'"/]+)['"]""", proc.stdout))
+    listing = git("ls-tree", "-z", "-d", "--name-only", BASE_REF, "--", f"{LIB_DIR}/", cwd=worktree)
+    return sorted(path for path in listing.split("\0") if posixpath.basename(path) in names)
+
+
+def git_dir(worktree: str) -> str:
+    # A linked worktree's `.git` is a `gitdir: <path>` file; reading it saves a
+    # git process in the handoff check and create-pr, which run for every task.
+    dotgit = os.path.join(worktree, ".git")
+    if os.path.isdir(dotgit):
+        return dotgit
+    try:
+        with open(dotgit, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+    except OSError:
+        content = ""
+    if not content.startswith("gitdir:"):
+        raise RuntimeError(f"{worktree} is not the root of a git worktree")
+    return os.path.join(worktree, content[len("gitdir:"):].strip())
+
+
+def scope_file(worktree: str) -> str:
+    return os.path.join(git_dir(worktree), SCOPE_FILE)
+
+
+def read_scope(worktree: str) -> Optional[Dict[str, Any]]:
+    """The scope `apply` recorded, or None for a full (unscoped) worktree."""
+    try:
+        with open(scope_file(worktree), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, RuntimeError, json.JSONDecodeError):
+        return None
+
+
+def checkout_dir(worktree: str, path: str) -> None:
+    """Add `path` to a scoped worktree's cones, e.g. docs/ for the TODO.md checkbox."""
+    git("sparse-checkout", "add", "--", path, cwd=worktree)
+
+
+def apply(worktree: str, scope: List[str], task_id: Optional[str] = None) -> Dict[str, Any]:
+    """Narrow an existing worktree to the scope's sparse-checkout cones."""
+    cones = cone_dirs(worktree, scope)
+    with span("worktree.sparse_checkout", task_id, cones=len(cones)):
+        git("sparse-checkout", "set", "--cone", "--", *cones, cwd=worktree)
+    state = {"scope": scope, "cones": cones}
+    with open(scope_file(worktree), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    return state
+
+
+def create(
+    repo: str, worktree: str, branch: str, scope: List[str], task_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """`git worktree add` that only ever writes the scope's cones to disk."""
+    with span("worktree.create", task_id, sparse=True):
+        git("worktree", "add", "--no-checkout", "-b", branch, worktree, BASE_REF, cwd=repo)
+        state = apply(worktree, scope, task_id)
+        git("checkout", "-q", branch, cwd=worktree)
+    return state
+
+
+def changed_paths(worktree: str) -> List[str]:
+    """Paths changed since the branch left main: commits, staged, unstaged, untracked."""
+    merge_base = git("merge-base", BASE_REF, "HEAD", cwd=worktree).strip()
+    changed = git("diff", "--name-only", "-z", merge_base, cwd=worktree).split("\0")
+    untracked = git("ls-files", "-z", "--others", "--exclude-standard", cwd=worktree).split("\0")
+    return sorted({path for path in changed + untracked if path})
+
+
+def check(worktree: str) -> Optional[Dict[str, Any]]:
+    """None for unscoped worktrees, else the declared scope and the paths outside it."""
+    state = read_scope(worktree)
+    if state is None:
+        return None
+    outside = [
+        path
+        for path in changed_paths(worktree)
+        if not covers(state["scope"], path) and not covers(IGNORED_PATHS, path)
+    ]
+    return {"scope": state["scope"], "cones": state["cones"], "out_of_scope": outside}
+
+
+def describe(report: Optional[Dict[str, Any]]) -> str:
+    """Markdown note for the Inspector prompt; empty when nothing left the scope."""
+    if not report or not report["out_of_scope"]:
+        return ""
+    lines = [
+        "Declared scope: " + ", ".join(f"`{path}`" for path in report["scope"]),
+        "Changed outside the declared scope (confirm each change is needed for the task):",
+    ]
+    lines += [f"- `{path}`" for path in report["out_of_scope"]]
+    return "\n".join(lines) + "\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Sparse-checkout worktrees limited to a task's declared path scope."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_create = sub.add_parser("create", help="Create a sparse worktree on a new branch")
+    p_create.add_argument("--repo", default=os.environ.get("FOREMAN_REPO", os.getcwd()))
+    p_create.add_argument("--worktree", required=True)
+    p_create.add_argument("--branch", required=True, help="Branch to create, e.g. feature/ds9-3")
+
+    p_apply = sub.add_parser("apply", help="Narrow an existing (e.g. pooled) worktree")
+    p_apply.add_argument("--worktree", required=True)
+
+    for p in (p_create, p_apply):
+        p.add_argument("--scope", required=True, help="Comma-separated paths, e.g. components/src/lib/buttons")
+        p.add_argument("--task-id")
+
+    p_check = sub.add_parser("check", help="List changes outside the worktree's declared scope")
+    p_check.add_argument("--worktree", default=os.getcwd())
+    p_check.add_argument("--describe", action="store_true", help="Print a markdown note instead of JSON")
+
+    args = parser.parse_args()
+
+    if args.command in ("create", "apply"):
+        try:
+            scope = parse_scope(args.scope)
+        except ValueError as e:
+            parser.error(str(e))
+        if not scope:
+            parser.error("--scope is empty")
+        try:
+            if args.command == "create":
+                out: Any = create(
+                    args.repo, os.path.abspath(args.worktree), args.branch, scope, args.task_id
+                )
+            else:
+                out = apply(args.worktree, scope, args.task_id)
+        except RuntimeError as e:
+            print(f"[scope] {e}", file=sys.stderr)
+            return 1
+    else:
+        out = check(args.worktree)
+        if args.describe:
+            sys.stdout.write(describe(out))
+            return 0
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
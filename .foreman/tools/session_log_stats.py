@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.environ.get(
+    "FOREMAN_SESSION_STATS_DIR", os.path.join(FOREMAN_DIR, ".tmp", "session_stats")
+)
+DEFAULT_LOG_DIR = os.path.join(".opencode", "session-log")
+SESSIONS_INDEX = "sessions.jsonl"
+INDEX_VERSION = 2
+CHUNK_SIZE = 64 * 1024
+TOP_N = 10
+# A line longer than this is skipped (and counted as bad) instead of buffered.
+MAX_LINE_BYTES = 1024 * 1024
+# Read signatures kept per session; the least recently seen one is dropped first.
+MAX_READ_SIGNATURES = 2048
+
+# Upper bounds (seconds) of the inter-call gap histogram buckets.
+GAP_BUCKETS = [1, 5, 30, 120, 600]
+# Calls that only read state; repeating one with identical arguments is wasted work.
+READ_TOOLS = {"read", "grep", "glob", "list"}
+
+
+def parse_ts(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def new_session() -> Dict[str, Any]:
+    return {
+        "session_id": None,
+        "calls": 0,
+        "first_ts": None,
+        "last_ts": None,
+        "last_call": None,
+        "tool_counts": {},
+        "gap_count": 0,
+        "gap_total": 0.0,
+        "gap_max": 0.0,
+        "gap_histogram": [0] * (len(GAP_BUCKETS) + 1),
+        "slowest": [],
+        "reads": {},
+        "evicted_wasted": 0,
+        "bad_lines": 0,
+    }
+
+
+def call_preview(event: Dict[str, Any]) -> str:
+    args = event.get("argsPreview")
+    if not isinstance(args, dict):
+        return ""
+    shown = {k: v for k, v in sorted(args.items()) if v is not None}
+    return json.dumps(shown, sort_keys=True, ensure_ascii=False)[:300]
+
+
+def apply_event(session: Dict[str, Any], event: Dict[str, Any]) -> None:
+    if event.get("type") != "tool.execute.before":
+        return
+    ts = parse_ts(event.get("ts"))
+    if ts is None:
+        session["bad_lines"] += 1
+        return
+    tool = str(event.get("tool") or "unknown")
+    preview = call_preview(event)
+
+    session["session_id"] = session["session_id"] or event.get("sessionId")
+    session["calls"] += 1
+    session["tool_counts"][tool] = session["tool_counts"].get(tool, 0) + 1
+    if session["first_ts"] is None:
+        session["first_ts"] = ts
+
+    # A call's phase lasts until the next call starts (tool time + model time).
+    previous = session["last_call"]
+    if previous is not None:
+        gap = max(0.0, ts - previous["ts"])
+        session["gap_count"] += 1
+        session["gap_total"] += gap
+        session["gap_max"] = max(session["gap_max"], gap)
+        bucket = next((i for i, limit in enumerate(GAP_BUCKETS) if gap < limit), len(GAP_BUCKETS))
+        session["gap_histogram"][bucket] += 1
+        slowest = session["slowest"]
+        if len(slowest) < TOP_N or gap > slowest[-1]["seconds"]:
+            slowest.append({**previous, "seconds": round(gap, 3)})
+            slowest.sort(key=lambda phase: phase["seconds"], reverse=True)
+            del slowest[TOP_N:]
+
+    session["last_ts"] = ts
+    session["last_call"] = {"ts": ts, "tool": tool, "args": preview}
+
+    if tool in READ_TOOLS:
+        signature = hashlib.sha1(f"{tool}\0{preview}".encode("utf-8")).hexdigest()[:16]
+        reads = session["reads"]
+        seen = reads.pop(signature, None)
+        if seen is None:
+            seen = {"tool": tool, "args": preview, "count": 0}
+            if len(reads) >= MAX_READ_SIGNATURES:
+                # Dicts keep insertion order, so the first key is the least recent.
+                evicted = reads.pop(next(iter(reads)))
+                session["evicted_wasted"] += evicted["count"] - 1
+        seen["count"] += 1
+        reads[signature] = seen
+
+
+def iter_new_lines(f: IO[bytes], offset: int) -> Iterator[Tuple[Optional[bytes], int]]:
+    """Yield complete lines after `offset` with the offset just past each one.
+
+    A trailing line without a newline is still being written and is left for the
+    next run. A line over MAX_LINE_BYTES is yielded as None once its newline shows
+    up; until then its bytes are dropped rather than buffered.
+    """
+    f.seek(offset)
+    pending = b""
+    position = offset
+    skipped = 0
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if skipped:
+                position += skipped + len(line) + 1
+                skipped = 0
+                yield None, position
+                continue
+            position += len(line) + 1
+            yield (line if len(line) <= MAX_LINE_BYTES else None), position
+        if skipped or len(pending) > MAX_LINE_BYTES:
+            skipped += len(pending)
+            pending = b""
+
+
+def index_path(log_dir: str) -> str:
+    key = hashlib.sha256(os.path.abspath(log_dir).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f"{key}.json")
+
+
+def load_index(log_dir: str) -> Dict[str, Any]:
+    try:
+        with open(index_path(log_dir), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, json.JSONDecodeError):
+        pass
+    return {"version": INDEX_VERSION, "log_dir": os.path.abspath(log_dir), "files": {}}
+
+
+def save_index(log_dir: str, index: Dict[str, Any]) -> None:
+    path = index_path(log_dir)
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+def update(log_dir: str, index: Dict[str, Any]) -> int:
+    """Fold new bytes of every session file into the index; returns bytes read."""
+    read = 0
+    names = sorted(
+        name
+        for name in os.listdir(log_dir)
+        if name.endswith(".jsonl") and name != SESSIONS_INDEX
+    )
+    files = index["files"]
+    for name in set(files) - set(names):
+        del files[name]
+
+    for name in names:
+        path = os.path.join(log_dir, name)
+        st = os.stat(path)
+        entry = files.get(name)
+        if entry is None or entry["inode"] != st.st_ino or st.st_size < entry["offset"]:
+            # New, replaced or truncated file: start over.
+            entry = files[name] = {"inode": st.st_ino, "offset": 0, "session": new_session()}
+        if st.st_size == entry["offset"]:
+            continue
+        with open(path, "rb") as f:
+            start = entry["offset"]
+            for line, position in iter_new_lines(f, start):
+                entry["offset"] = position
+                if line is None:
+                    entry["session"]["bad_lines"] += 1
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    entry["session"]["bad_lines"] += 1
+                    continue
+                if isinstance(event, dict):
+                    apply_event(entry["session"], event)
+            read += entry["offset"] - start
+    return read
+
+
+def session_report(name: str, session: Dict[str, Any], top: int) -> Dict[str, Any]:
+    repeated = sorted(
+        (read for read in session["reads"].values() if read["count"] > 1),
+        key=lambda read: read["count"],
+        reverse=True,
+    )
+    histogram_labels = [f"<{limit}s" for limit in GAP_BUCKETS] + [f">={GAP_BUCKETS[-1]}s"]
+    duration = (
+        session["last_ts"] - session["first_ts"] if session["first_ts"] is not None else 0.0
+    )
+    return {
+        "session_id": session["session_id"] or name[: -len(".jsonl")],
+        "file": name,
+        "calls": session["calls"],
+        "started_at": session["first_ts"],
+        "duration": round(duration, 3),
+        "tool_counts": dict(sorted(session["tool_counts"].items(), key=lambda kv: -kv[1])),
+        "gaps": {
+            "count": session["gap_count"],
+            "mean": round(session["gap_total"] / session["gap_count"], 3)
+            if session["gap_count"]
+            else None,
+            "max": round(session["gap_max"], 3),
+            "histogram": dict(zip(histogram_labels, session["gap_histogram"])),
+        },
+        "slowest": session["slowest"][:top],
+        "repeated_reads": repeated[:top],
+        "wasted_calls": session["evicted_wasted"] + sum(read["count"] - 1 for read in repeated),
+        "bad_lines": session["bad_lines"],
+    }
+
+
+def report(index: Dict[str, Any], session_id: Optional[str], top: int) -> Dict[str, Any]:
+    sessions = [
+        session_report(name, entry["session"], top)
+        for name, entry in index["files"].items()
+        if entry["session"]["calls"]
+    ]
+    if session_id:
+        sessions = [s for s in sessions if s["session_id"] == session_id]
+    sessions.sort(key=lambda s: s["started_at"] or 0)
+
+    tool_counts: Dict[str, int] = {}
+    for s in sessions:
+        for tool, count in s["tool_counts"].items():
+            tool_counts[tool] = tool_counts.get(tool, 0) + count
+    return {
+        "totals": {
+            "sessions": len(sessions),
+            "calls": sum(s["calls"] for s in sessions),
+            "wasted_calls": sum(s["wasted_calls"] for s in sessions),
+            "tool_counts": dict(sorted(tool_counts.items(), key=lambda kv: -kv[1])),
+        },
+        "sessions": sessions,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Where did the agents spend their time? Streams .opencode/session-log JSONL."
+    )
+    parser.add_argument(
+        "log_dirs",
+        nargs="*",
+        default=[DEFAULT_LOG_DIR],
+        help="Session log directories (default: ./.opencode/session-log)",
+    )
+    parser.add_argument("--session", help="Only report this session id")
+    parser.add_argument("--top", type=int, default=TOP_N, help="Entries per top-N list")
+    parser.add_argument("--totals", action="store_true", help="Only print the totals")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Ignore the offset index and re-read everything"
+    )
+    args = parser.parse_args()
+
+    out: Dict[str, Any] = {"log_dirs": [], "bytes_read": 0}
+    for log_dir in args.log_dirs:
+        if not os.path.isdir(log_dir):
+            print(f"[session_log_stats] skipping missing {log_dir}", file=sys.stderr)
+            continue
+        index = (
+            {"version": INDEX_VERSION, "log_dir": os.path.abspath(log_dir), "files": {}}
+            if args.rebuild
+            else load_index(log_dir)
+        )
+        read = update(log_dir, index)
+        save_index(log_dir, index)
+
+        result = report(index, args.session, args.top)
+        out["bytes_read"] += read
+        entry: Dict[str, Any] = {"log_dir": log_dir, "bytes_read": read, "totals": result["totals"]}
+        if not args.totals:
+            entry["sessions"] = result["sessions"]
+        out["log_dirs"].append(entry)
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from foreman_state import DB_PATH, connect as connect_state
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Claims rely on SQLite's file locks, which are only sound on a local disk:
+# NFS/SMB locking is unreliable and two hosts can lease the same task. Keep the
+# file on one host and have the others reach it through `queue serve`
+# (FOREMAN_QUEUE_URL), which makes that host the queue's only writer.
+QUEUE_DB = os.environ.get("FOREMAN_QUEUE_DB", os.path.join(FOREMAN_DIR, "state", "queue.db"))
+QUEUE_URL = os.environ.get("FOREMAN_QUEUE_URL")
+# Sent as a bearer token to `queue serve`, which rejects requests without it when set.
+QUEUE_TOKEN = os.environ.get("FOREMAN_QUEUE_TOKEN", "")
+# Stable per host, so a restarted worker adopts its own unexpired leases.
+HOST_ID = os.environ.get("FOREMAN_HOST_ID") or socket.gethostname()
+WEBHOOK_URL = os.environ.get("FOREMAN_WEBHOOK_URL")
+LEASE_SECONDS = 300.0
+HEARTBEAT_INTERVAL = 30.0
+MAX_ATTEMPTS = 3
+# A claimed task whose local state never reaches done/failed is failed once
+# its n8n execution ends; if the worker lost track of the execution (it was
+# restarted), it is given up after this long.
+MAX_RUN_SECONDS = 6 * 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    task_id TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    owner TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    claimed_at REAL,
+    finished_at REAL,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_ready ON queue (status, priority DESC, enqueued_at);
+CREATE INDEX IF NOT EXISTS idx_queue_leases ON queue (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_queue_owner ON queue (owner, status);
+"""
+
+
+def connect(path: str = QUEUE_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def row_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["body"] = json.loads(entry["body"])
+    return entry
+
+
+def enqueue(
+    conn: sqlite3.Connection,
+    body: Dict[str, Any],
+    priority: int = 0,
+    max_attempts: int = MAX_ATTEMPTS,
+    force: bool = False,
+) -> str:
+    """Add a run-foreman request body; returns queued / exists / requeued."""
+    task_id = body.get("task_id")
+    if not task_id:
+        raise ValueError("request body has no task_id")
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT status FROM queue WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO queue (task_id, body, priority, max_attempts, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task_id, json.dumps(body, ensure_ascii=False), priority, max_attempts, now),
+            )
+            result = "queued"
+        elif force and row["status"] in ("done", "failed"):
+            conn.execute(
+                "UPDATE queue SET body = ?, status = 'queued', priority = ?, attempts = 0, "
+                "max_attempts = ?, owner = NULL, lease_expires = NULL, last_error = NULL, "
+                "finished_at = NULL, enqueued_at = ? WHERE task_id = ?",
+                (json.dumps(body, ensure_ascii=False), priority, max_attempts, now, task_id),
+            )
+            result = "requeued"
+        else:
+            result = "exists"
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return result
+
+
+def requeue_expired(conn: sqlite3.Connection) -> List[str]:
+    """Return tasks whose lease ran out (dead or partitioned host) to the queue."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT task_id, owner, attempts, max_attempts FROM queue "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now,),
+        ).fetchall()
+        for row in rows:
+            exhausted = row["attempts"] >= row["max_attempts"]
+            conn.execute(
+                "UPDATE queue SET status = ?, owner = NULL, lease_expires = NULL, last_error = ?, "
+                "finished_at = ? WHERE task_id = ?",
+                (
+                    "failed" if exhausted else "queued",
+                    f"lease expired on {row['owner']}",
+                    now if exhausted else None,
+                    row["task_id"],
+                ),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [row["task_id"] for row in rows]
+
+
+def claim(
+    conn: sqlite3.Connection, owner: str, lease_seconds: float = LEASE_SECONDS
+) -> Optional[Dict[str, Any]]:
+    """Lease the highest-priority queued task to `owner`, or None."""
+    requeue_expired(conn)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT task_id FROM queue WHERE status = 'queued' "
+            "ORDER BY priority DESC, enqueued_at LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE queue SET status = 'leased', owner = ?, lease_expires = ?, heartbeat_at = ?, "
+                "claimed_at = ?, attempts = attempts + 1 WHERE task_id = ?",
+                (owner, now + lease_seconds, now, now, row["task_id"]),
+            )
+            row = conn.execute("SELECT * FROM queue WHERE task_id = ?", (row["task_id"],)).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row_dict(row)
+
+
+def heartbeat(
+    conn: sqlite3.Connection, task_id: str, owner: str, lease_seconds: float = LEASE_SECONDS
+) -> bool:
+    """Extend a lease; False means it was lost (expired and requeued or finished)."""
+    now = time.time()
+    cursor = conn.execute(
+        "UPDATE queue SET lease_expires = ?, heartbeat_at = ? "
+        "WHERE task_id = ? AND owner = ? AND status = 'leased'",
+        (now + lease_seconds, now, task_id, owner),
+    )
+    return cursor.rowcount == 1
+
+
+def complete(
+    conn: sqlite3.Connection, task_id: str, owner: str, status: str, error: Optional[str] = None
+) -> bool:
+    if status not in ("done", "failed"):
+        raise ValueError(f"unknown final status: {status}")
+    cursor = conn.execute(
+        "UPDATE queue SET status = ?, lease_expires = NULL, finished_at = ?, last_error = ? "
+        "WHERE task_id = ? AND owner = ? AND status = 'leased'",
+        (status, time.time(), error, task_id, owner),
+    )
+    return cursor.rowcount == 1
+
+
+def release(
+    conn: sqlite3.Connection,
+    task_id: str,
+    owner: str,
+    error: Optional[str] = None,
+    refund: bool = False,
+) -> bool:
+    """Give a leased task back to the queue. With `refund` the claim does not
+    count as an attempt (the host, not the task, was at fault)."""
+    cursor = conn.execute(
+        "UPDATE queue SET attempts = attempts - ?, "
+        "status = CASE WHEN attempts - ? >= max_attempts THEN 'failed' ELSE 'queued' END, "
+        "owner = NULL, lease_expires = NULL, last_error = ? "
+        "WHERE task_id = ? AND owner = ? AND status = 'leased'",
+        (int(refund), int(refund), error, task_id, owner),
+    )
+    return cursor.rowcount == 1
+
+
+def leased_by(conn: sqlite3.Connection, owner: str) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT * FROM queue WHERE owner = ? AND status = 'leased' ORDER BY claimed_at", (owner,)
+    ).fetchall()
+    return [row_dict(row) for row in rows]
+
+
+def queue_status(conn: sqlite3.Connection, task_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    columns = (
+        "task_id, status, priority, attempts, max_attempts, owner, lease_expires, "
+        "heartbeat_at, claimed_at, finished_at, last_error, enqueued_at"
+    )
+    if task_id is not None:
+        rows = conn.execute(f"SELECT {columns} FROM queue WHERE task_id = ?", (task_id,)).fetchall()
+    else:
+        rows = conn.execute(
+            f"SELECT {columns} FROM queue ORDER BY status, priority DESC, enqueued_at"
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def queue_stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    now = time.time()
+    counts = {
+        row["status"]: row["n"]
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM queue GROUP BY status")
+    }
+    hosts = {
+        row["owner"]: row["n"]
+        for row in conn.execute(
+            "SELECT owner, COUNT(*) AS n FROM queue WHERE status = 'leased' GROUP BY owner"
+        )
+    }
+    oldest = conn.execute("SELECT MIN(enqueued_at) FROM queue WHERE status = 'queued'").fetchone()[0]
+    expired = conn.execute(
+        "SELECT COUNT(*) FROM queue WHERE status = 'leased' AND lease_expires < ?", (now,)
+    ).fetchone()[0]
+    return {
+        "queued": counts.get("queued", 0),
+        "leased": counts.get("leased", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "expired_leases": expired,
+        "oldest_queued_wait": round(now - oldest, 1) if oldest else None,
+        "leases_by_host": hosts,
+    }
+
+
+# Operations `queue serve` runs for remote workers, by name.
+QUEUE_OPS = {
+    "enqueue": enqueue,
+    "claim": claim,
+    "heartbeat": heartbeat,
+    "complete": complete,
+    "release": release,
+    "requeue_expired": requeue_expired,
+    "leased_by": leased_by,
+    "status": queue_status,
+    "stats": queue_stats,
+}
+
+
+class LocalQueue:
+    """Queue operations on the SQLite file, for the host that owns it."""
+
+    def __init__(self, path: str = QUEUE_DB) -> None:
+        self.conn = connect(path)
+
+    def call(self, op: str, **kwargs: Any) -> Any:
+        return QUEUE_OPS[op](self.conn, **kwargs)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class RemoteQueue:
+    """Queue operations through `queue serve` on the host that owns the file."""
+
+    def __init__(self, url: str, token: str = QUEUE_TOKEN) -> None:
+        import requests
+
+        self.url = url
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def call(self, op: str, **kwargs: Any) -> Any:
+        resp = self.session.post(self.url, json={"op": op, "args": kwargs}, timeout=30)
+        try:
+            answer = resp.json()
+        except ValueError:
+            raise RuntimeError(f"queue server answered HTTP {resp.status_code}") from None
+        if not answer.get("ok"):
+            raise RuntimeError(f"queue server: {answer.get('error')}")
+        return answer["result"]
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def open_queue(queue_db: str, queue_url: Optional[str]) -> Any:
+    return RemoteQueue(queue_url) if queue_url else LocalQueue(queue_db)
+
+
+def serve(queue_db: str, host: str, port: int, token: str = QUEUE_TOKEN) -> None:
+    """Answer queue operations over HTTP. One request at a time: this process
+    is the only writer, so claims never depend on network-filesystem locks."""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    queue = LocalQueue(queue_db)
+
+    class Handler(BaseHTTPRequestHandler):
+        timeout = 30
+
+        def do_POST(self) -> None:
+            if token and self.headers.get("Authorization") != f"Bearer {token}":
+                return self.answer(401, {"ok": False, "error": "unauthorized"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if request.get("op") not in QUEUE_OPS:
+                    raise ValueError(f"unknown op: {request.get('op')}")
+                result = queue.call(request["op"], **(request.get("args") or {}))
+            except (ValueError, TypeError, sqlite3.Error) as e:
+                return self.answer(400, {"ok": False, "error": str(e)})
+            self.answer(200, {"ok": True, "result": result})
+
+        def answer(self, status: int, payload: Dict[str, Any]) -> None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = HTTPServer((host, port), Handler)
+    print(f"[queue] serving {queue_db} on http://{host}:{server.server_address[1]}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.close()
+
+
+def local_outcome(task_id: str, since: Optional[float], state_db: str) -> Optional[str]:
+    """done / failed once this host's state store finished the task after `since`.
+
+    `since` is a timestamp of this host's clock (the queue host's `claimed_at`
+    may be skewed against it); None accepts any finished row.
+    """
+    try:
+        conn = connect_state(state_db)
+        try:
+            row = conn.execute(
+                "SELECT status, updated_at FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"[queue] state store unreadable: {e}", file=sys.stderr)
+        return None
+    if row is None or row["status"] not in ("done", "failed"):
+        return None
+    if since is not None and row["updated_at"] < since:
+        return None
+    return row["status"]
+
+
+class Run:
+    """The run-foreman request of one claimed task, held open until n8n answers."""
+
+    def __init__(self, url: str, body: Dict[str, Any], connect_timeout: float) -> None:
+        # Local clock: finished rows from an earlier run of the task are older.
+        self.started_at = time.time()
+        self.error: Optional[str] = None
+        self.ended = threading.Event()
+        threading.Thread(
+            target=self.post, args=(url, body, connect_timeout), daemon=True
+        ).start()
+
+    def post(self, url: str, body: Dict[str, Any], connect_timeout: float) -> None:
+        import requests
+
+        try:
+            resp = requests.post(url, json=body, timeout=(connect_timeout, None))
+            if not resp.ok:
+                self.error = f"HTTP {resp.status_code}: {resp.text[:200]}"
+        except requests.RequestException as e:
+            self.error = str(e)
+        finally:
+            self.ended.set()
+
+
+def start_run(
+    url: str, body: Dict[str, Any], connect_timeout: float, start_wait: float
+) -> Tuple[Optional[str], Run]:
+    """POST the request to this host's run-foreman webhook; returns (error, run).
+
+    The webhook answers when the whole workflow ends (`responseMode: lastNode`),
+    so no answer within `start_wait` means n8n accepted the request and is
+    running it. `run.ended` is set once the execution is over, however it ended.
+    """
+    run = Run(url, body, connect_timeout)
+    if run.ended.wait(start_wait):
+        return run.error, run
+    return None, run
+
+
+def work(args: argparse.Namespace) -> int:
+    """Claim up to --slots tasks, start each through the local workflow, and keep
+    their leases alive until the local state store reports them done or failed."""
+    stopping = False
+
+    def stop(*_: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    queue = open_queue(args.queue_db, args.queue_url)
+    backoff, paused_until = 0.0, 0.0
+    active: Optional[Dict[str, Dict[str, Any]]] = None
+    # n8n executions this worker started; adopted leases have none.
+    runs: Dict[str, Run] = {}
+    try:
+        while True:
+            try:
+                if active is None:
+                    # Adopt what this host held before a restart; n8n may still be running them.
+                    active = {task["task_id"]: task for task in queue.call("leased_by", owner=args.owner)}
+                    for task in active.values():
+                        task["local_started_at"] = time.time()
+                    if active:
+                        print(f"[queue] {args.owner} resuming {', '.join(active)}", file=sys.stderr)
+                poll(queue, args, active, runs)
+                backoff, paused_until = claim_more(queue, args, active, runs, stopping, backoff, paused_until)
+                if stopping and not active:
+                    return 0
+                if args.drain and not active and queue.call("stats")["queued"] == 0:
+                    return 0
+            except (OSError, RuntimeError, sqlite3.Error) as e:
+                # Queue server or shared file unreachable: keep the runs going
+                # and try again; leases only expire if this lasts.
+                print(f"[queue] queue unavailable: {e}", file=sys.stderr)
+                if stopping and not active:
+                    return 1
+            # Waking early on SIGTERM is fine: leases are only released by expiry.
+            time.sleep(args.interval)
+    finally:
+        queue.close()
+
+
+def poll(queue: Any, args: argparse.Namespace, active: Dict[str, Any], runs: Dict[str, Run]) -> None:
+    """Complete finished tasks and renew the leases of the others."""
+    for task_id, task in list(active.items()):
+        run = runs.get(task_id)
+        # An adopted lease has no start time here; a new run reopens a row
+        # left failed by an earlier one first thing (state resume --reopen).
+        outcome = local_outcome(task_id, run.started_at if run is not None else None, args.state_db)
+        error = None
+        if outcome is None and run is not None and run.ended.is_set():
+            # A done task answers at once without touching its row (Task
+            # Already Finished); anything else never marked the task finished:
+            # a node failed, create-pr could not push, or n8n stopped the run.
+            if local_outcome(task_id, None, args.state_db) == "done":
+                outcome = "done"
+            else:
+                outcome = "failed"
+                error = f"workflow ended without finishing the task: {run.error or 'no error reported'}"
+        elif outcome is None and time.time() - task["local_started_at"] > args.max_run_seconds:
+            outcome, error = "failed", "run timeout"
+        if outcome is not None:
+            queue.call("complete", task_id=task_id, owner=args.owner, status=outcome, error=error)
+            print(f"[queue] {task_id} {outcome}{f': {error}' if error else ''}", file=sys.stderr)
+        elif queue.call("heartbeat", task_id=task_id, owner=args.owner, lease_seconds=args.lease):
+            continue
+        else:
+            print(f"[queue] lost the lease on {task_id}", file=sys.stderr)
+        del active[task_id]
+        runs.pop(task_id, None)
+
+
+def claim_more(
+    queue: Any,
+    args: argparse.Namespace,
+    active: Dict[str, Any],
+    runs: Dict[str, Run],
+    stopping: bool,
+    backoff: float,
+    paused_until: float,
+) -> Tuple[float, float]:
+    """Claim and start tasks until the slots are full; returns the new backoff state."""
+    while not stopping and len(active) < args.slots and time.time() >= paused_until:
+        task = queue.call("claim", owner=args.owner, lease_seconds=args.lease)
+        if task is None:
+            break
+        error, run = start_run(args.webhook, task["body"], args.timeout, args.start_wait)
+        if error is not None:
+            # This host's n8n refused the run (down, misconfigured, HTTP
+            # error): nothing started, so hand the task to another host
+            # and stop claiming for a while.
+            queue.call("release", task_id=task["task_id"], owner=args.owner, error=error, refund=True)
+            backoff = min(max(backoff * 2, args.interval), 300.0)
+            paused_until = time.time() + backoff
+            print(
+                f"[queue] could not start {task['task_id']}: {error}; pausing {backoff:.0f}s",
+                file=sys.stderr,
+            )
+            break
+        backoff = 0.0
+        print(f"[queue] {args.owner} started {task['task_id']}", file=sys.stderr)
+        task["local_started_at"] = run.started_at
+        active[task["task_id"]] = task
+        runs[task["task_id"]] = run
+    return backoff, paused_until
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Shared task queue with leases for multi-host Foreman.")
+    parser.add_argument("--queue-db", default=QUEUE_DB)
+    parser.add_argument(
+        "--queue-url", default=QUEUE_URL, help="Use `queue serve` on another host ($FOREMAN_QUEUE_URL)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="Queue run-foreman request bodies (JSONL on stdin)")
+    p_enqueue.add_argument("--priority", type=int, default=0)
+    p_enqueue.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    p_enqueue.add_argument("--force", action="store_true", help="Re-queue tasks that already finished")
+
+    for name, help_text in (
+        ("claim", "Lease the next task (exit 1 if none)"),
+        ("heartbeat", "Extend a lease (exit 1 if it was lost)"),
+        ("complete", "Finish a leased task"),
+        ("release", "Return a leased task to the queue"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--owner", default=HOST_ID)
+        if name != "claim":
+            p.add_argument("--task-id", required=True)
+        if name in ("claim", "heartbeat"):
+            p.add_argument("--lease", type=float, default=LEASE_SECONDS)
+        if name == "complete":
+            p.add_argument("--status", required=True, choices=["done", "failed"])
+        if name in ("complete", "release"):
+            p.add_argument("--error")
+        if name == "release":
+            p.add_argument("--refund", action="store_true", help="Do not count the claim as an attempt")
+
+    sub.add_parser("requeue-expired", help="Return tasks with expired leases to the queue")
+    p_status = sub.add_parser("status", help="List queue entries")
+    p_status.add_argument("--task-id")
+    sub.add_parser("stats", help="Counts by status, expired leases and leases per host")
+
+    p_serve = sub.add_parser("serve", help="Serve the queue file to other hosts' workers")
+    p_serve.add_argument("--host", default="0.0.0.0")
+    p_serve.add_argument("--port", type=int, default=int(os.environ.get("FOREMAN_QUEUE_PORT", "8765")))
+
+    p_work = sub.add_parser("work", help="Run this host's worker loop")
+    p_work.add_argument("--webhook", default=WEBHOOK_URL, help="Local run-foreman URL ($FOREMAN_WEBHOOK_URL)")
+    p_work.add_argument("--owner", default=HOST_ID, help="Lease owner ($FOREMAN_HOST_ID or the hostname)")
+    p_work.add_argument("--slots", type=int, default=int(os.environ.get("FOREMAN_QUEUE_SLOTS", "3")))
+    p_work.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    p_work.add_argument("--interval", type=float, default=HEARTBEAT_INTERVAL)
+    p_work.add_argument("--max-run-seconds", type=float, default=MAX_RUN_SECONDS)
+    p_work.add_argument("--timeout", type=float, default=10.0, help="Webhook connect timeout")
+    p_work.add_argument(
+        "--start-wait",
+        type=float,
+        default=5.0,
+        help="Seconds to wait for the webhook to reject a run; after that it counts as started",
+    )
+    p_work.add_argument("--state-db", default=DB_PATH, help="This host's state store")
+    p_work.add_argument("--drain", action="store_true", help="Exit once the queue is empty and idle")
+
+    args = parser.parse_args()
+
+    if args.command == "work":
+        if not args.webhook:
+            parser.error("work needs --webhook or FOREMAN_WEBHOOK_URL")
+        if args.interval * 2 >= args.lease:
+            parser.error("--interval must be under half of --lease")
+        return work(args)
+
+    if args.command == "serve":
+        if not QUEUE_TOKEN and args.host not in ("127.0.0.1", "localhost", "::1"):
+            # Queued requests become agent runs: never take them from anyone on the network.
+            parser.error("serving beyond localhost needs FOREMAN_QUEUE_TOKEN")
+        serve(args.queue_db, args.host, args.port)
+        return 0
+
+    queue = open_queue(args.queue_db, args.queue_url)
+    code = 0
+    try:
+        if args.command == "enqueue":
+            out: Any = {"queued": 0, "exists": 0, "requeued": 0}
+            for line in sys.stdin:
+                if line.strip():
+                    result = queue.call(
+                        "enqueue",
+                        body=json.loads(line),
+                        priority=args.priority,
+                        max_attempts=args.max_attempts,
+                        force=args.force,
+                    )
+                    out[result] += 1
+        elif args.command == "claim":
+            out = queue.call("claim", owner=args.owner, lease_seconds=args.lease)
+            code = 0 if out is not None else 1
+        elif args.command == "heartbeat":
+            out = {
+                "ok": queue.call(
+                    "heartbeat", task_id=args.task_id, owner=args.owner, lease_seconds=args.lease
+                )
+            }
+            code = 0 if out["ok"] else 1
+        elif args.command == "complete":
+            out = {
+                "ok": queue.call(
+                    "complete",
+                    task_id=args.task_id,
+                    owner=args.owner,
+                    status=args.status,
+                    error=args.error,
+                )
+            }
+            code = 0 if out["ok"] else 1
+        elif args.command == "release":
+            out = {
+                "ok": queue.call(
+                    "release",
+                    task_id=args.task_id,
+                    owner=args.owner,
+                    error=args.error,
+                    refund=args.refund,
+                )
+            }
+            code = 0 if out["ok"] else 1
+        elif args.command == "requeue-expired":
+            out = {"requeued": queue.call("requeue_expired")}
+        elif args.command == "status":
+            out = queue.call("status", task_id=args.task_id)
+        else:
+            out = queue.call("stats")
+    finally:
+        queue.close()
+
+    json.dump(out, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
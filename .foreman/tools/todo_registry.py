@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+FOREMAN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get(
+    "FOREMAN_TODO_INDEX_DIR", os.path.join(FOREMAN_DIR, ".tmp", "todo_index")
+)
+TODO_PATH = os.path.join(
+    os.environ.get("FOREMAN_REPO", os.getcwd()), "docs", "TODO.md"
+)
+INDEX_VERSION = 2
+
+# `### 1.1 [ds9-1] Inventory Existing LCARS Tokens & Primitives`
+HEADER_RE = re.compile(rb"^### (\S+) \[([\w.-]+)\] (.*?)\s*$")
+# `  - [ ] [ds9-18 · 5.3 Create ...](#53-...)` in the overview tree
+CHECKBOX_RE = re.compile(rb"^\s*- \[([ xX])\] \[([\w.-]+)[ \]]")
+TITLE_PREFIX = b"- **Title**:"
+DESCRIPTION_PREFIX = b"- **Description**:"
+# `- **Scope**: `components/src/lib/buttons`, `docs``: paths the task may touch
+SCOPE_PREFIX = b"- **Scope**:"
+
+
+def iter_lines(content: bytes) -> Iterator[tuple[int, bytes]]:
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        yield offset, line.rstrip(b"\r\n")
+        offset += len(line)
+
+
+def is_block_end(line: bytes) -> bool:
+    # A task block runs until the next heading or `---` separator.
+    return line.startswith(b"#") or line.strip() == b"---"
+
+
+def clean_title(raw: str) -> str:
+    return raw.replace("`", "").strip()
+
+
+def clean_description(lines: List[str]) -> str:
+    # Markdown bullets become one paragraph, as docs/build_foreman_request.sh did.
+    parts = [re.sub(r"^\s*-\s*", "", line).strip().replace("`", "") for line in lines]
+    return re.sub(r"\s+", " ", " ".join(parts)).strip()
+
+
+def clean_scope(raw: str) -> List[str]:
+    return [part for part in re.split(r"[,\s]+", raw.replace("`", "")) if part]
+
+
+def parse(content: bytes) -> Dict[str, Dict[str, Any]]:
+    """Build {task_id: {section, heading, header_offset, title, description, scope, done, checkbox_offset}}."""
+    tasks: Dict[str, Dict[str, Any]] = {}
+    checkboxes: Dict[str, tuple[int, bool]] = {}
+    current: Optional[Dict[str, Any]] = None
+    description: Optional[List[str]] = None
+
+    def close_block() -> None:
+        if current is not None and description is not None:
+            current["description"] = clean_description(description)
+
+    for offset, line in iter_lines(content):
+        header = HEADER_RE.match(line)
+        if header:
+            close_block()
+            section, task_id, heading = (part.decode("utf-8") for part in header.groups())
+            description = None
+            current = None
+            if task_id in tasks:
+                continue
+            current = tasks[task_id] = {
+                "section": section,
+                "heading": heading,
+                "header_offset": offset,
+                "title": None,
+                "description": None,
+                "scope": None,
+            }
+            continue
+
+        box = CHECKBOX_RE.match(line)
+        if box and box.group(2).decode("utf-8") not in checkboxes:
+            # Offset of the character between the brackets.
+            checkboxes[box.group(2).decode("utf-8")] = (
+                offset + line.index(b"[") + 1,
+                box.group(1) != b" ",
+            )
+
+        if current is None:
+            continue
+        if is_block_end(line):
+            close_block()
+            current = None
+            description = None
+        elif line.startswith(TITLE_PREFIX) and current["title"] is None:
+            current["title"] = clean_title(line[len(TITLE_PREFIX):].decode("utf-8"))
+        elif line.startswith(SCOPE_PREFIX):
+            # Checked before the description so a Scope line never lands in the prompt.
+            current["scope"] = clean_scope(line[len(SCOPE_PREFIX):].decode("utf-8"))
+        elif line.startswith(DESCRIPTION_PREFIX) and description is None:
+            description = []
+        elif description is not None:
+            description.append(line.decode("utf-8"))
+    close_block()
+
+    for task_id, task in tasks.items():
+        checkbox_offset, done = checkboxes.get(task_id, (None, False))
+        task["checkbox_offset"] = checkbox_offset
+        task["done"] = done
+    return tasks
+
+
+def cache_path(todo_path: str) -> str:
+    key = hashlib.sha256(os.path.abspath(todo_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def file_key(stat: os.stat_result) -> List[int]:
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_cache(todo_path: str, stat: os.stat_result) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        with open(cache_path(todo_path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if cached.get("version") != INDEX_VERSION or cached.get("key") != file_key(stat):
+        return None
+    return cached["tasks"]
+
+
+def write_cache(todo_path: str, stat: os.stat_result, tasks: Dict[str, Dict[str, Any]]) -> None:
+    path = cache_path(todo_path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "key": file_key(stat), "tasks": tasks}, f)
+        os.replace(tmp, path)
+    except OSError:
+        # The cache is an optimisation only.
+        pass
+
+
+def load_index(todo_path: str = TODO_PATH) -> Dict[str, Dict[str, Any]]:
+    stat = os.stat(todo_path)
+    tasks = read_cache(todo_path, stat)
+    if tasks is None:
+        with open(todo_path, "rb") as f:
+            tasks = parse(f.read())
+        write_cache(todo_path, stat, tasks)
+    return tasks
+
+
+def get_task(task_id: str, todo_path: str = TODO_PATH) -> Optional[Dict[str, Any]]:
+    task = load_index(todo_path).get(task_id)
+    return {"task_id": task_id, **task} if task is not None else None
+
+
+def task_prompt(task: Dict[str, Any]) -> str:
+    return f"{task['title']}. {task['description']}"
+
+
+@contextlib.contextmanager
+def locked(todo_path: str) -> Iterator[Any]:
+    with open(todo_path, "r+b") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def mark_done(task_ids: List[str], todo_path: str = TODO_PATH) -> Dict[str, List[str]]:
+    """Tick the overview checkbox of every id in place; only the changed bytes are written."""
+    result: Dict[str, List[str]] = {"marked": [], "already_done": [], "missing": []}
+    with locked(todo_path) as f:
+        stat = os.fstat(f.fileno())
+        tasks = read_cache(todo_path, stat)
+        if tasks is None:
+            f.seek(0)
+            tasks = parse(f.read())
+
+        for task_id in dict.fromkeys(task_ids):
+            task = tasks.get(task_id)
+            offset = task.get("checkbox_offset") if task else None
+            if offset is None:
+                result["missing"].append(task_id)
+                continue
+            f.seek(offset - 1)
+            current = f.read(3)
+            if current not in (b"[ ]", b"[x]", b"[X]"):
+                # The file changed under a stale index; fall back to a fresh parse.
+                f.seek(0)
+                tasks = parse(f.read())
+                task = tasks.get(task_id)
+                offset = task.get("checkbox_offset") if task else None
+                if offset is None:
+                    result["missing"].append(task_id)
+                    continue
+                f.seek(offset - 1)
+                current = f.read(3)
+            if current != b"[ ]":
+                result["already_done"].append(task_id)
+                continue
+            f.seek(offset)
+            f.write(b"x")
+            tasks[task_id]["done"] = True
+            result["marked"].append(task_id)
+
+        f.flush()
+        os.fsync(f.fileno())
+        write_cache(todo_path, os.fstat(f.fileno()), tasks)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Indexed access to the docs/TODO.md task list.")
+    parser.add_argument("--todo", default=TODO_PATH, help="Path to TODO.md")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="List indexed tasks")
+    p_list.add_argument("--pending", action="store_true", help="Only tasks not yet checked off")
+
+    p_show = sub.add_parser("show", help="Show one task, including its webhook prompt")
+    p_show.add_argument("task_id")
+
+    p_done = sub.add_parser("done", help="Mark one or more tasks as completed")
+    p_done.add_argument("task_ids", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        out: Any = [
+            {"task_id": task_id, **task}
+            for task_id, task in load_index(args.todo).items()
+            if not (args.pending and task["done"])
+        ]
+    elif args.command == "show":
+        task = get_task(args.task_id, args.todo)
+        if task is None:
+            print(f"Error: Task ID '{args.task_id}' not found in {args.todo}", file=sys.stderr)
+            return 1
+        out = {**task, "prompt": task_prompt(task)}
+    else:
+        out = mark_done(args.task_ids, args.todo)
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from instrument import span
+
+REPO = os.environ.get("FOREMAN_REPO", os.getcwd())
+POOL_DIR = os.environ.get("FOREMAN_POOL_DIR", os.path.join(REPO, ".oc_worktrees", ".pool"))
+PNPM_STORE = os.environ.get(
+    "FOREMAN_PNPM_STORE", os.path.join(REPO, ".oc_worktrees", ".pnpm-store")
+)
+# Opt-in: with no slots configured nothing is pre-installed in the background.
+POOL_SIZE = int(os.environ.get("FOREMAN_POOL_SIZE", "0"))
+BASE_REF = "main"
+PACKAGE_DIR = "components"
+LOCKFILE = f"{PACKAGE_DIR}/pnpm-lock.yaml"
+
+
+def git(*args: str, cwd: str = REPO, check: bool = True) -> str:
+    proc = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if check and proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {proc.stderr.strip()}")
+    return proc.stdout.strip()
+
+
+def lockfile_hash(ref: str = BASE_REF) -> str:
+    # The blob id changes exactly when the lockfile content changes.
+    return git("rev-parse", f"{ref}:{LOCKFILE}", check=False) or "none"
+
+
+def slot_path(name: str) -> str:
+    return os.path.join(POOL_DIR, name)
+
+
+def meta_path(name: str) -> str:
+    # Metadata lives next to (not inside) the slot so it never shows up in `git status`.
+    return os.path.join(POOL_DIR, f"{name}.json")
+
+
+def read_meta(name: str) -> Dict[str, Any]:
+    try:
+        with open(meta_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def write_meta(name: str, **fields: Any) -> None:
+    meta = {**read_meta(name), **fields, "updated_at": time.time()}
+    tmp = meta_path(name) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path(name))
+
+
+def list_slots() -> List[str]:
+    if not os.path.isdir(POOL_DIR):
+        return []
+    names = set()
+    for entry in os.listdir(POOL_DIR):
+        if not entry.startswith("slot-") or entry.endswith(".tmp"):
+            continue
+        names.add(entry[: -len(".json")] if entry.endswith(".json") else entry)
+    return sorted(names)
+
+
+@contextlib.contextmanager
+def pool_lock() -> Iterator[None]:
+    os.makedirs(POOL_DIR, exist_ok=True)
+    with open(os.path.join(POOL_DIR, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def install(worktree: str) -> None:
+    with span("pool.pnpm_install", slot=os.path.basename(worktree)) as s:
+        proc = subprocess.run(
+            ["pnpm", "install", "--frozen-lockfile", "--prefer-offline", "--store-dir", PNPM_STORE],
+            cwd=os.path.join(worktree, PACKAGE_DIR),
+            capture_output=True,
+            text=True,
+        )
+        s.exit_code = proc.returncode
+        s.status = "ok" if proc.returncode == 0 else "failed"
+    if proc.returncode != 0:
+        raise RuntimeError(f"pnpm install failed: {proc.stderr.strip()[-2000:]}")
+
+
+def reset_to_base(worktree: str) -> None:
+    git("checkout", "--detach", "--force", BASE_REF, cwd=worktree)
+    git("reset", "--hard", BASE_REF, cwd=worktree)
+    # Keep installed dependencies; drop everything else the last task left behind.
+    git("clean", "-fdx", "-e", "node_modules", cwd=worktree)
+
+
+def prepare_slot(name: str) -> None:
+    """Bring one slot to a clean `main` checkout with matching node_modules."""
+    path = slot_path(name)
+    if not os.path.isdir(path):
+        git("worktree", "add", "--detach", path, BASE_REF)
+    else:
+        reset_to_base(path)
+
+    wanted = lockfile_hash()
+    if read_meta(name).get("lockfile") != wanted or not os.path.isdir(
+        os.path.join(path, PACKAGE_DIR, "node_modules")
+    ):
+        install(path)
+    write_meta(name, state="ready", lockfile=wanted, commit=git("rev-parse", "HEAD", cwd=path))
+
+
+def fill(size: int) -> Dict[str, Any]:
+    wanted = lockfile_hash()
+    todo: List[str] = []
+    with pool_lock():
+        existing = list_slots()
+        for name in existing:
+            meta = read_meta(name)
+            if meta.get("state") == "ready" and meta.get("lockfile") == wanted:
+                continue
+            if meta.get("state") == "filling" and time.time() - meta.get("updated_at", 0) < 1800:
+                continue
+            todo.append(name)
+        missing = size - len(existing)
+        index = 1
+        while missing > 0:
+            name = f"slot-{index}"
+            index += 1
+            if name not in existing:
+                todo.append(name)
+                missing -= 1
+        for name in todo:
+            write_meta(name, state="filling")
+
+    prepared: List[str] = []
+    failed: Dict[str, str] = {}
+    for name in todo:
+        try:
+            prepare_slot(name)
+            prepared.append(name)
+        except Exception as e:
+            write_meta(name, state="broken", error=str(e))
+            failed[name] = str(e)
+    return {"prepared": prepared, "failed": failed}
+
+
+def spawn_fill(size: Optional[int] = None) -> None:
+    """Refill the pool in a detached background process (a no-op while the pool is off)."""
+    if (POOL_SIZE if size is None else size) <= 0:
+        return
+    cmd = [sys.executable, os.path.abspath(__file__), "fill"]
+    if size is not None:
+        cmd += ["--size", str(size)]
+    subprocess.Popen(
+        cmd,
+        cwd=REPO,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def branch_exists(branch: str) -> bool:
+    return bool(git("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}", check=False))
+
+
+def branch_checked_out(branch: str) -> bool:
+    listing = git("worktree", "list", "--porcelain")
+    return f"branch refs/heads/{branch}" in listing.splitlines()
+
+
+def acquire(worktree: str, branch: str) -> Optional[str]:
+    # A rerun keeps the commits already on its branch; a branch that another
+    # worktree has checked out is left to the `git worktree add` fallback to report.
+    existing = branch_exists(branch)
+    if existing and branch_checked_out(branch):
+        return None
+    wanted = lockfile_hash()
+    with pool_lock():
+        for name in list_slots():
+            meta = read_meta(name)
+            if meta.get("state") != "ready" or meta.get("lockfile") != wanted:
+                continue
+            os.makedirs(os.path.dirname(os.path.abspath(worktree)), exist_ok=True)
+            git("worktree", "move", slot_path(name), worktree)
+            os.remove(meta_path(name))
+            break
+        else:
+            return None
+
+    try:
+        if existing:
+            git("checkout", branch, cwd=worktree)
+        else:
+            # Pick up any commits that landed on main since the slot was filled.
+            git("checkout", "-b", branch, BASE_REF, cwd=worktree)
+    except RuntimeError as e:
+        give_back(name, worktree, str(e))
+        return None
+    return name
+
+
+def give_back(name: str, worktree: str, error: str) -> None:
+    """Return a slot whose checkout failed, marked broken so `fill` redoes it;
+    the task then falls back to `git worktree add` at `worktree`."""
+    print(f"[pool] {name}: {error}", file=sys.stderr)
+    with pool_lock():
+        try:
+            git("worktree", "move", worktree, slot_path(name))
+        except RuntimeError:
+            git("worktree", "remove", "--force", worktree, check=False)
+            return
+        write_meta(name, state="broken", error=error)
+
+
+def status() -> List[Dict[str, Any]]:
+    wanted = lockfile_hash()
+    return [
+        {"slot": name, **read_meta(name), "current": read_meta(name).get("lockfile") == wanted}
+        for name in list_slots()
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Keep pre-installed worktrees at main ready for new Foreman tasks."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_fill = sub.add_parser("fill", help="Create/refresh slots up to --size")
+    p_fill.add_argument("--size", type=int, default=POOL_SIZE)
+
+    p_acquire = sub.add_parser("acquire", help="Hand a ready slot to a task")
+    p_acquire.add_argument("--worktree", required=True, help="Target worktree path for the task")
+    p_acquire.add_argument("--branch", required=True, help="Branch to create, e.g. feature/ds9-3")
+    p_acquire.add_argument(
+        "--no-refill", action="store_true", help="Do not start a background refill"
+    )
+
+    sub.add_parser("status", help="Show slot states")
+
+    args = parser.parse_args()
+
+    if args.command == "fill":
+        out: Any = fill(args.size)
+    elif args.command == "acquire":
+        with span("pool.acquire", os.path.basename(os.path.normpath(args.worktree))) as s:
+            slot = acquire(args.worktree, args.branch)
+            s.status = "ok" if slot is not None else "miss"
+        if not args.no_refill:
+            spawn_fill()
+        out = {"ok": slot is not None, "slot": slot, "worktree": args.worktree}
+        json.dump(out, sys.stdout)
+        sys.stdout.write("\n")
+        # Non-zero tells the caller to fall back to `git worktree add`.
+        return 0 if slot is not None else 3
+    else:
+        out = status()
+
+    json.dump(out, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
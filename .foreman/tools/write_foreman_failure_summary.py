@@ -2,30 +2,62 @@
 
 import argparse
 import json
+import sys
+
+from foreman_state import finish_task, record_rejection, safe_update
+from handoff import rejection_report
+
+
+def read_payload(args: argparse.Namespace) -> object:
+    # --raw-json is kept for old callers; large results belong on stdin or in a file.
+    try:
+        if args.raw_json is not None:
+            return json.loads(args.raw_json)
+        if args.input in (None, "-"):
+            return json.load(sys.stdin)
+        with open(args.input, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[failure_summary] unreadable handoff JSON: {e}", file=sys.stderr)
+        return None
+
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Write a Foreman rejection report JSON.")
-    parser.add_argument("--status", required=True)
+    parser.add_argument("--status", help="Default: the handoff's own status")
     parser.add_argument("--reason", required=True)
-    parser.add_argument("--raw-json", required=True)
+    parser.add_argument("--input", help="Handoff JSON file (default: stdin)")
+    parser.add_argument(
+        "--runner",
+        help="agent_runner outcome JSON file ('-' for stdin), when the handoff does not carry it",
+    )
+    parser.add_argument("--raw-json", help="Handoff JSON inline (deprecated: argv size and quoting limits)")
+    parser.add_argument("--task-id", help="Also mark the task failed in the state store")
+    parser.add_argument(
+        "--who",
+        choices=["builder", "inspector", "preflight"],
+        help="Append the report to the rejection history under this role",
+    )
     args = parser.parse_args()
+    if args.who and not args.task_id:
+        parser.error("--who requires --task-id")
 
-    try:
-        payload = json.loads(args.raw_json)
-    except Exception:
-        payload = None
-
-    data = (payload.get("data") if isinstance(payload, dict) else None) or {}
-
-    out = {
-        "status": args.status,
-        "reason": args.reason,
-        "errors": payload.get("errors") if isinstance(payload, dict) else None,
-        "data": {
-            "run": data.get("run"),
-            "work": data.get("work"),
-        },
-    }
+    payload = read_payload(args)
+    out = rejection_report(payload, args.status, args.reason)
+    if args.runner and out["runner"] is None:
+        try:
+            if args.runner == "-":
+                out["runner"] = json.load(sys.stdin)
+            else:
+                with open(args.runner, "r", encoding="utf-8") as f:
+                    out["runner"] = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[failure_summary] unreadable runner JSON: {e}", file=sys.stderr)
+
+    if args.who:
+        safe_update(record_rejection, args.task_id, args.who, out)
+    if args.task_id:
+        safe_update(finish_task, args.task_id, "failed", reason=args.reason)
 
     print(json.dumps(out, ensure_ascii=False))
     return 0
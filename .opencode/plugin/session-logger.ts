@@ -1,9 +1,10 @@
 import type { Plugin } from "@opencode-ai/plugin";
+import { appendFileSync, existsSync, mkdirSync, readFileSync } from "fs";
+import { open, type FileHandle } from "fs/promises";
 
-type Shell = (
-  strings: TemplateStringsArray,
-  ...values: unknown[]
-) => Promise<unknown>
+// Flush once this much is buffered, or after FLUSH_INTERVAL_MS, whichever comes first.
+const FLUSH_BYTES = 64 * 1024
+const FLUSH_INTERVAL_MS = 1000
 
 function isRecord(value: unknown): value is Record<string, unknown> {
   return typeof value === "object" && value !== null
@@ -101,30 +102,104 @@ function safeShallow(value: unknown): unknown {
   return String(value)
 }
 
-export const SessionLoggerPlugin: Plugin = async ({ directory, $ }) => {
-  const logDir = `${directory}/.opencode/session-log`
-  const sessionsIndexPath = `${logDir}/sessions.jsonl`
-  const sh = $ as unknown as Shell
+/**
+ * Buffers JSONL lines per file and appends them through long-lived file
+ * handles, instead of spawning a shell for every line.
+ */
+class BufferedLogWriter {
+  private buffers = new Map<string, string[]>()
+  private handles = new Map<string, FileHandle>()
+  private bufferedBytes = 0
+  private timer: ReturnType<typeof setTimeout> | null = null
+  private flushing: Promise<void> = Promise.resolve()
+
+  constructor(dir: string) {
+    mkdirSync(dir, { recursive: true })
+    // Anything still buffered when the process goes away is written synchronously.
+    process.once("beforeExit", () => void this.flush())
+    process.once("exit", () => this.flushSync())
+  }
 
-  function toSafeFilename(value: string) {
-    return value.replaceAll(/[^a-zA-Z0-9_.-]/g, "_")
+  append(filePath: string, line: string) {
+    const lines = this.buffers.get(filePath)
+    if (lines) lines.push(line)
+    else this.buffers.set(filePath, [line])
+    this.bufferedBytes += line.length + 1
+
+    if (this.bufferedBytes >= FLUSH_BYTES) {
+      void this.flush()
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => void this.flush(), FLUSH_INTERVAL_MS)
+      // Never keep the process alive just to flush logs.
+      this.timer.unref?.()
+    }
   }
 
-  async function appendLine(filePath: string, line: string) {
-    await sh`mkdir -p ${logDir}`
+  private take(): Map<string, string[]> {
+    if (this.timer) {
+      clearTimeout(this.timer)
+      this.timer = null
+    }
+    const pending = this.buffers
+    this.buffers = new Map()
+    this.bufferedBytes = 0
+    return pending
+  }
+
+  flush(): Promise<void> {
+    const pending = this.take()
+    // Chain flushes so lines for the same file are never written out of order.
+    this.flushing = this.flushing.then(async () => {
+      for (const [filePath, lines] of pending) {
+        try {
+          let handle = this.handles.get(filePath)
+          if (!handle) {
+            handle = await open(filePath, "a")
+            this.handles.set(filePath, handle)
+          }
+          await handle.write(lines.join("\n") + "\n")
+        } catch {
+          // Logging must never break a tool call.
+        }
+      }
+    })
+    return this.flushing
+  }
 
-    // Try to avoid quoting issues by passing the payload via env vars.
-    // eslint-disable-next-line @typescript-eslint/no-explicit-any
-    const bash: any = sh`bash -lc 'printf "%s\\n" "$LINE" >> "$LOG_PATH"'`
+  flushSync() {
+    for (const [filePath, lines] of this.take()) {
+      try {
+        appendFileSync(filePath, lines.join("\n") + "\n")
+      } catch {
+        // Best effort at shutdown.
+      }
+    }
+  }
+}
 
-    if (typeof bash?.env === "function") {
-      // eslint-disable-next-line @typescript-eslint/no-explicit-any
-      await bash.env({ LINE: line, LOG_PATH: filePath } as any)
-      return
+function readIndexedSessions(indexPath: string): Set<string> {
+  const seen = new Set<string>()
+  if (!existsSync(indexPath)) return seen
+  try {
+    for (const line of readFileSync(indexPath, "utf8").split("\n")) {
+      if (!line) continue
+      const entry = JSON.parse(line) as { sessionId?: unknown }
+      if (typeof entry.sessionId === "string") seen.add(entry.sessionId)
     }
+  } catch {
+    // A damaged index only means a session may be listed twice.
+  }
+  return seen
+}
+
+export const SessionLoggerPlugin: Plugin = async ({ directory }) => {
+  const logDir = `${directory}/.opencode/session-log`
+  const sessionsIndexPath = `${logDir}/sessions.jsonl`
+  const writer = new BufferedLogWriter(logDir)
+  const indexedSessions = readIndexedSessions(sessionsIndexPath)
 
-    // Fallback: best-effort quoting.
-    await sh`bash -lc 'printf "%s\\n" "${line}" >> "${filePath}"'`
+  function toSafeFilename(value: string) {
+    return value.replaceAll(/[^a-zA-Z0-9_.-]/g, "_")
   }
 
   return {
@@ -145,14 +220,17 @@ export const SessionLoggerPlugin: Plugin = async ({ directory, $ }) => {
         },
       }
 
-      await appendLine(sessionFilePath, JSON.stringify(payload))
+      writer.append(sessionFilePath, JSON.stringify(payload))
 
-      const indexLine = {
-        ts: payload.ts,
-        sessionId,
+      // One index line per session (its first tool call), not per call.
+      if (!indexedSessions.has(sessionId)) {
+        indexedSessions.add(sessionId)
+        const indexLine = {
+          ts: payload.ts,
+          sessionId,
+        }
+        writer.append(sessionsIndexPath, JSON.stringify(indexLine))
       }
-
-      await appendLine(sessionsIndexPath, JSON.stringify(indexLine))
     },
   }
 }